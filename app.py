@@ -3,32 +3,251 @@ Development Diary - Servidor Flask
 Versión web con interfaz moderna
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Request, Response, g, render_template, request, jsonify, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_cors import CORS
 from datetime import datetime
 from pathlib import Path
-import requests
 import os
 import signal
 import json
 import wave
+import re
+import shutil
+import time
+import zipfile
 import tempfile
-from vosk import Model, KaldiRecognizer
-import speech_recognition as sr
-from pydub import AudioSegment
-import io
-from diary.pdf_generator import PDFGenerator
-import tempfile
+import threading
+import hmac
+import logging
+from contextlib import ExitStack
+from functools import wraps
+from diary.pdf_cache import PDFCache
+from core.diary_logic import EntryIndex, INDEX_DIRNAME, parse_frontmatter, read_entry
+from core.jobs import JobQueue, DONE
+from core.llm_cache import LLMCache
+from core.vector_store import VectorStore
+from core.ollama_client import OllamaClient, OllamaError
+from core.search_index import extract_keywords
+from core.transcription import (
+    ModelLoader, ParallelDecoder, RecognizerPool, RecognizerBusyError, SessionClosedError,
+    TranscriptionSessions, LOADING, join_sentences, recognize_pcm
+)
+from core.audio import prepare_for_recognition
+from core.server import RequestTracker, GracefulServer
+from core.process_pool import ProcessPool
+from core.logs import configure_logging, log_event
+from core.metrics import METRICS, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from core.profiling import Profiler, phase
+
+
+class DiaryRequest(Request):
+    """Request que mantiene en memoria los archivos subidos hasta AUDIO_SPOOL_BYTES"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        # Werkzeug vuelca a disco a partir de 500KB, es decir, casi cualquier
+        # grabación; por encima del umbral se usa un temporal anónimo
+        return tempfile.SpooledTemporaryFile(max_size=AUDIO_SPOOL_BYTES, mode='rb+')
+
 
 app = Flask(__name__)
+app.request_class = DiaryRequest
 CORS(app)
 
+# Peticiones en curso (el cierre ordenado espera a que terminen)
+REQUEST_TRACKER = RequestTracker(app.wsgi_app)
+app.wsgi_app = REQUEST_TRACKER
+
 # Configuración
-OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_HOST = os.environ.get("DIARY_OLLAMA_HOST", "http://localhost:11434")
 OLLAMA_MODEL = "llama3.1:8b"
-BASE_PATH = Path("Development Diary")
-BASE_PATH.mkdir(exist_ok=True)
-VOSK_MODEL = None
+OLLAMA_MAX_IN_FLIGHT = 2  # Generaciones simultáneas contra Ollama
+OLLAMA_MAX_RETRIES = 2
+LLM_CACHE_MAX_ENTRIES = 1000
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024
+LLM_CACHE_TTL = 7 * 24 * 3600  # 7 días
+EMBED_MODEL = "nomic-embed-text"  # ollama pull nomic-embed-text
+SEMANTIC_SEARCH = True  # Combinar búsqueda por palabras con embeddings
+SEMANTIC_WEIGHT = 0.5  # Peso de la similitud semántica al fusionar (0-1)
+SEMANTIC_MIN_SCORE = 0.3  # Similitud coseno mínima para considerar una entrada
+EMBED_CHUNK_CHARS = 1500  # Tamaño aproximado de cada fragmento embebido
+IMPROVE_OPTIONS = {
+    "temperature": 0.5,
+    "num_predict": 1536,
+    "top_k": 30,
+    "top_p": 0.85
+}
+ASSISTANT_OPTIONS = {
+    "temperature": 0.6,
+    "num_predict": 2048,
+    "top_k": 40,
+    "top_p": 0.9
+}
+BASE_PATH = Path(os.environ.get("DIARY_BASE_PATH", "Development Diary"))
+BASE_PATH.mkdir(parents=True, exist_ok=True)
+USE_INOTIFY = True  # Detectar cambios hechos a mano en BASE_PATH (Linux)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+AI_WORKERS = 2  # Mejoras con IA y exportaciones simultáneas (los embeddings tienen su propio hilo)
+JOBS_RETENTION_DAYS = 7  # Los trabajos terminados se borran de la base pasado este tiempo
+VOSK_SAMPLE_RATE = 16000  # Frecuencia con la que se entrenó el modelo
+AUDIO_PREPROCESS = True  # Mono, 16kHz, ganancia y recorte de silencios antes de Vosk
+VOSK_MODEL_PATHS = [
+    ("vosk-model-es-0.42", "Grande (1.4GB) - Alta precisión"),
+    ("vosk-model-small-es-0.42", "Pequeño (50MB) - Precisión básica")
+]
+WORKER_PROCESSES = 2  # Procesos para decodificar grabaciones largas y maquetar ramas largas (1 = en serie)
+PARALLEL_DECODE_MIN_SECONDS = 60  # Voz mínima para repartir la grabación entre procesos
+PARALLEL_DECODE_TIMEOUT = 60  # Margen (s) sobre la duración de la voz antes de abandonar el paralelo
+MAX_SEGMENT_SECONDS = 30  # Tramos más largos se parten en el silencio más cercano
+VOSK_POOL_SIZE = 4  # Transcripciones con Vosk simultáneas
+VOSK_WAIT_SECONDS = 30  # Espera máxima si el modelo aún se está cargando
+VOSK_POOL_TIMEOUT = 10  # Espera máxima por un reconocedor libre
+MAX_AUDIO_BYTES = 100 * 1024 * 1024  # Tamaño máximo de un audio subido
+AUDIO_SPOOL_BYTES = 16 * 1024 * 1024  # Audio subido en memoria hasta este tamaño
+PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024
+PDF_SPOOL_BYTES = 8 * 1024 * 1024  # PDFs más grandes se renderizan a disco
+PARALLEL_PDF_MIN_ENTRIES = 50  # Entradas mínimas para repartirlas entre procesos
+EXPORT_MAX_AGE_HOURS = 24  # Los ZIP exportados se borran pasado este tiempo
+WARMUP_DELAY_SECONDS = 2  # Precarga de voz y PDFs tras arrancar (None = solo al primer uso)
+SERVER_HOST = '0.0.0.0'
+SERVER_PORT = 5000
+SERVER_THREADS = 8  # Peticiones simultáneas (las del asistente ocupan un hilo hasta 180 s)
+SERVER_CHANNEL_TIMEOUT = 200  # Conexiones inactivas; por encima de la generación más larga de Ollama
+SHUTDOWN_DRAIN_SECONDS = 30  # Espera máxima a las peticiones y dictados en curso al detener el servidor
+STREAM_IDLE_TIMEOUT = 120  # Segundos sin audio antes de descartar un dictado
+STREAM_MAX_CHUNK_BYTES = 1024 * 1024  # Tamaño máximo de cada trozo de PCM
+LOG_FORMAT = os.environ.get("DIARY_LOG_FORMAT", "text")  # 'json' = una línea JSON por evento
+LOG_LEVEL = os.environ.get("DIARY_LOG_LEVEL", "INFO")  # 'DEBUG' añade una línea por petición HTTP
+PROFILING_TOKEN = os.environ.get("DIARY_PROFILING_TOKEN")  # Perfilado por petición (sin token = desactivado)
+PROFILES_MAX = 50  # Perfiles guardados como máximo
+
+configure_logging(LOG_FORMAT, LOG_LEVEL)
+
+# Ninguna petición legítima (el audio es lo más grande) supera este tamaño
+app.config['MAX_CONTENT_LENGTH'] = MAX_AUDIO_BYTES
+
+# Índice persistente de metadatos de entradas (se prepara en start_background)
+ENTRY_INDEX = EntryIndex(BASE_PATH)
+
+# Cliente compartido de Ollama (pool de conexiones + límite de concurrencia)
+OLLAMA_CLIENT = OllamaClient(
+    OLLAMA_HOST,
+    max_in_flight=OLLAMA_MAX_IN_FLIGHT,
+    max_retries=OLLAMA_MAX_RETRIES
+)
+
+# Caché de respuestas del LLM (evita regenerar lo mismo)
+LLM_CACHE = LLMCache(
+    BASE_PATH / INDEX_DIRNAME / 'llm_cache.db',
+    max_entries=LLM_CACHE_MAX_ENTRIES,
+    max_bytes=LLM_CACHE_MAX_BYTES,
+    ttl=LLM_CACHE_TTL
+)
+
+# Embeddings de las entradas (matriz float32 mapeada en memoria)
+VECTOR_STORE = VectorStore(BASE_PATH / INDEX_DIRNAME / 'vectors')
+
+# Generador de PDFs compartido: se crea al primer uso (ver get_pdf_generator)
+_pdf_generator = None
+_pdf_generator_lock = threading.Lock()
+
+# PDFs ya renderizados, por hash del contenido de las entradas
+PDF_CACHE = PDFCache(BASE_PATH / INDEX_DIRNAME / 'pdf_cache', max_bytes=PDF_CACHE_MAX_BYTES)
+
+# ZIP de las exportaciones de proyectos completos (trabajos en segundo plano)
+EXPORTS_PATH = BASE_PATH / INDEX_DIRNAME / 'exports'
+
+# Perfiles de peticiones concretas (ver profiled)
+PROFILER = Profiler(BASE_PATH / INDEX_DIRNAME / 'profiles', max_profiles=PROFILES_MAX)
+
+# Servidor de producción (lo crea main(); None con el de desarrollo o gunicorn)
+SERVER = None
+
+# Modelo de Vosk (se carga en segundo plano al arrancar) y pool de
+# reconocedores; las funciones se definen más abajo
+VOSK_LOADER = ModelLoader(lambda: load_vosk_model())
+RECOGNIZER_POOL = RecognizerPool(lambda sample_rate: create_recognizer(sample_rate),
+                                 size=VOSK_POOL_SIZE)
+
+# Procesos de trabajo compartidos (se crean en start_background, antes que
+# ningún hilo): grabaciones largas y ramas largas en PDF
+WORKER_POOL = ProcessPool(processes=WORKER_PROCESSES,
+                          preload=['core.transcription', 'diary.pdf_generator'])
+PARALLEL_DECODER = ParallelDecoder(WORKER_POOL)
+
+# Dictados en streaming en curso (cada uno tiene un reconocedor del pool)
+TRANSCRIPTION_SESSIONS = TranscriptionSessions(
+    idle_timeout=STREAM_IDLE_TIMEOUT,
+    on_expire=lambda session: release_recognizer(session)
+)
+
+
+def stream_request_session(environ):
+    """Si la petición es un trozo, el final o la cancelación de un dictado abierto"""
+    parts = environ.get('PATH_INFO', '').strip('/').split('/')
+    if parts[:3] != ['api', 'transcribe', 'stream'] or len(parts) not in (4, 5):
+        return False
+    if len(parts) == 5 and parts[4] != 'finish':
+        return False
+    return TRANSCRIPTION_SESSIONS.get(parts[3]) is not None
+
+
+# Al cerrar, los dictados abiertos pueden seguir mandando trozos hasta
+# terminar, y el cierre los espera (hasta SHUTDOWN_DRAIN_SECONDS)
+REQUEST_TRACKER.keep_open = stream_request_session
+REQUEST_TRACKER.pending = lambda: len(TRANSCRIPTION_SESSIONS)
+
+# Cola persistente de trabajos en segundo plano (mejora con IA, ...)
+JOB_QUEUE = JobQueue(BASE_PATH / INDEX_DIRNAME / 'jobs.db', workers=AI_WORKERS,
+                     retention_days=JOBS_RETENTION_DAYS)
+
+
+def profiling_token_ok(token):
+    """Si el token da acceso al perfilado (siempre False si está desactivado)"""
+    return bool(PROFILING_TOKEN) and bool(token) and hmac.compare_digest(token, PROFILING_TOKEN)
+
+
+def profiled(view):
+    """
+    Permite perfilar el endpoint a petición: con la cabecera 'X-Profile'
+    o el parámetro '?profile=' con el token de DIARY_PROFILING_TOKEN, la
+    petición se ejecuta bajo cProfile y el resultado (ver /api/profiles)
+    se identifica en la cabecera 'X-Profile-Id' de la respuesta
+
+    Si la respuesta se genera mientras se envía (streaming), el perfil
+    sigue abierto hasta que el servidor la cierra, para incluir esa parte.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = request.headers.get('X-Profile') or request.args.get('profile')
+        if token is None or not PROFILING_TOKEN:
+            return view(*args, **kwargs)
+
+        if not profiling_token_ok(token):
+            return jsonify({
+                'success': False,
+                'message': 'Token de perfilado no válido'
+            }), 403
+
+        with ExitStack() as stack:
+            profile = stack.enter_context(
+                PROFILER.profile(request.endpoint, method=request.method, path=request.path)
+            )
+            response = app.make_response(view(*args, **kwargs))
+
+            # Un archivo (send_file) ya está hecho: solo queda enviarlo
+            if response.is_streamed and not response.direct_passthrough:
+                response.call_on_close(stack.pop_all().close)
+
+        if profile is not None:
+            response.headers['X-Profile-Id'] = profile.id
+        else:
+            response.headers['X-Profile-Skipped'] = 'Ya se está perfilando otra petición'
+        return response
+
+    return wrapper
 
 
 @app.route('/')
@@ -51,17 +270,14 @@ def assistant_page():
 
 @app.route('/api/projects', methods=['GET'])
 def get_projects():
-    """Obtiene lista de proyectos existentes"""
+    """Obtiene lista de proyectos existentes (también los que aún no tienen entradas)"""
     try:
-        projects = []
-        if BASE_PATH.exists():
-            for item in BASE_PATH.iterdir():
-                if item.is_dir() and item.name != '.gitkeep':
-                    projects.append(item.name)
+        ENTRY_INDEX.refresh_if_stale()
 
         return jsonify({
             'success': True,
-            'projects': sorted(projects)
+            'projects': ENTRY_INDEX.scan_projects(),
+            'generation': ENTRY_INDEX.generation
         })
     except Exception as e:
         return jsonify({
@@ -74,24 +290,12 @@ def get_projects():
 def get_branches(project):
     """Obtiene lista de ramas de un proyecto"""
     try:
-        branches = set()
-        project_path = BASE_PATH / project / "entries"
-
-        if project_path.exists():
-            # Leer archivos markdown y extraer ramas del frontmatter
-            for md_file in project_path.glob("*.md"):
-                with open(md_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Buscar la rama en el frontmatter
-                    for line in content.split('\n'):
-                        if line.startswith('rama:'):
-                            branch = line.replace('rama:', '').strip()
-                            if branch and branch.lower() not in ['', 'nada']:
-                                branches.add(branch)
+        ENTRY_INDEX.refresh_if_stale()
 
         return jsonify({
             'success': True,
-            'branches': sorted(list(branches))
+            'branches': ENTRY_INDEX.list_branches(project),
+            'generation': ENTRY_INDEX.generation
         })
     except Exception as e:
         return jsonify({
@@ -122,13 +326,6 @@ def save_entry():
                 'message': 'No hay contenido para guardar'
             }), 400
 
-        # Mejorar con IA si está activado
-        if use_ai:
-            print("🤖 Mejorando texto con IA...")
-            improved_notes = improve_with_ai(data)
-        else:
-            improved_notes = notes
-
         # Crear carpeta del proyecto
         project_path = BASE_PATH / project / "entries"
         project_path.mkdir(parents=True, exist_ok=True)
@@ -143,23 +340,49 @@ def save_entry():
         filename = f"{timestamp}_{branch_clean}.md"
         filepath = project_path / filename
 
-        # Generar contenido Markdown
-        markdown_content = generate_markdown(data, improved_notes, timestamp)
+        # Generar contenido Markdown (primero con las notas tal cual)
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        markdown_content = generate_markdown(data, notes, timestamp, fecha)
 
         # Guardar archivo
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(markdown_content)
 
-        print(f"✅ Entrada guardada: {filepath}")
+        # Actualizar índice
+        ENTRY_INDEX.index_file(project, filepath, markdown_content)
+
+        log_event('entry_saved', f"✅ Entrada guardada: {filepath}", project=project, filename=filename)
+
+        # Mejorar con IA en segundo plano si está activado
+        job_id = None
+        if use_ai:
+            job_id = JOB_QUEUE.submit('enrich', {
+                'data': {
+                    'author': author,
+                    'project': project,
+                    'branch': branch,
+                    'commit_problem': commit_problem,
+                    'notes': notes
+                },
+                'project': project,
+                'filename': filename,
+                'timestamp': timestamp,
+                'fecha': fecha,
+                # Si el archivo cambia antes de que acabe la IA, no se pisa
+                'signature': file_signature(filepath)
+            })
+            log_event('enrich_queued', f"🤖 Mejora con IA encolada ({job_id[:8]})", job_id=job_id)
 
         return jsonify({
             'success': True,
             'message': '¡Entrada guardada exitosamente!',
-            'filepath': str(filepath)
+            'filepath': str(filepath),
+            'job_id': job_id
         })
 
     except Exception as e:
-        print(f"❌ Error guardando entrada: {e}")
+        log_event('entry_save_error', f"❌ Error guardando entrada: {e}",
+                  level=logging.ERROR, exc_info=True, error=str(e))
         return jsonify({
             'success': False,
             'message': f'Error: {str(e)}'
@@ -169,50 +392,80 @@ def save_entry():
 @app.route('/api/entries', methods=['GET'])
 def get_entries():
     """
-    Obtiene todas las entradas del diario
-    Opcionalmente filtrar por proyecto
+    Obtiene una página de entradas del diario (más recientes primero)
+    Parámetros opcionales:
+        project, branch, author, date_from, date_to, q: filtros
+        limit: tamaño de página (por defecto 50, máximo 200)
+        after: cursor 'next_cursor' de la página anterior
+        fields: 'full' para incluir el contenido completo de cada entrada
     """
     try:
-        project_filter = request.args.get('project', None)
-        entries = []
+        try:
+            limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'Parámetro limit no válido'
+            }), 400
 
-        # Determinar qué proyectos buscar
-        if project_filter:
-            projects_to_scan = [project_filter]
-        else:
-            projects_to_scan = [p.name for p in BASE_PATH.iterdir() if p.is_dir()]
+        ENTRY_INDEX.refresh_if_stale()
 
-        # Escanear entradas
-        for project_name in projects_to_scan:
-            entries_path = BASE_PATH / project_name / "entries"
+        try:
+            entries, next_cursor = ENTRY_INDEX.query_entries(
+                project=request.args.get('project') or None,
+                branch=request.args.get('branch') or None,
+                author=request.args.get('author') or None,
+                date_from=request.args.get('date_from') or None,
+                date_to=request.args.get('date_to') or None,
+                text=request.args.get('q') or None,
+                after=request.args.get('after') or None,
+                limit=limit
+            )
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
 
-            if not entries_path.exists():
-                continue
+        # Contenido completo solo si se pide (el visor usa /api/entry)
+        if request.args.get('fields') == 'full':
+            for entry_data in entries:
+                filepath = ENTRY_INDEX.entry_path(entry_data['project'], entry_data['filename'])
+                entry_data['content'] = read_entry(filepath)
 
-            for md_file in sorted(entries_path.glob("*.md"), reverse=True):
-                # Leer archivo
-                with open(md_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
+        return jsonify({
+            'success': True,
+            'entries': entries,
+            'count': len(entries),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'generation': ENTRY_INDEX.generation
+        })
 
-                # Parsear frontmatter
-                entry_data = parse_frontmatter(content)
-                entry_data['filename'] = md_file.name
-                entry_data['project'] = project_name
-                entry_data['content'] = content
+    except Exception as e:
+        log_event('entries_error', f"❌ Error obteniendo entradas: {e}",
+                  level=logging.ERROR, exc_info=True, error=str(e))
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
 
-                entries.append(entry_data)
 
-        # Ordenar por fecha (más reciente primero)
-        entries.sort(key=lambda x: x.get('fecha', ''), reverse=True)
+@app.route('/api/index/status', methods=['GET'])
+def index_status():
+    """
+    Estado del índice de entradas
+    'generation' cambia con cada alta, edición o borrado detectado, así que
+    sirve para saber si un resultado cacheado sigue siendo válido
+    """
+    try:
+        ENTRY_INDEX.refresh_if_stale()
 
         return jsonify({
             'success': True,
-            'entries': entries,
-            'total': len(entries)
+            **ENTRY_INDEX.status()
         })
-
     except Exception as e:
-        print(f"❌ Error obteniendo entradas: {e}")
         return jsonify({
             'success': False,
             'message': str(e)
@@ -231,8 +484,7 @@ def get_entry_content(project, filename):
                 'message': 'Entrada no encontrada'
             }), 404
 
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = read_entry(filepath)
 
         # Extraer solo el contenido después del frontmatter
         parts = content.split('---', 2)
@@ -255,6 +507,7 @@ def get_entry_content(project, filename):
 
 
 @app.route('/api/assistant', methods=['POST'])
+@profiled
 def assistant():
     """
     Asistente inteligente que ayuda con problemas
@@ -273,7 +526,8 @@ def assistant():
             }), 400
 
         # Obtener contexto del historial
-        context = get_relevant_context(question, project, mode)
+        with phase('context'):
+            context = get_relevant_context(question, project, mode)
 
         # Generar respuesta con IA
         response = generate_assistant_response(question, context, mode)
@@ -289,21 +543,269 @@ def assistant():
         })
 
     except Exception as e:
-        print(f"❌ Error en asistente: {e}")
+        log_event('assistant_error', f"❌ Error en asistente: {e}",
+                  level=logging.ERROR, exc_info=True, error=str(e))
         return jsonify({
             'success': False,
             'message': str(e)
         }), 500
 
 
+@app.route('/api/assistant/stream', methods=['POST'])
+@profiled
+def assistant_stream():
+    """
+    Variante en streaming del asistente (Server-Sent Events)
+    Eventos: 'token' con cada fragmento de texto, 'done' al final con
+    referenced_files y context_used, o 'error' si algo falla
+    """
+    data = request.json or {}
+    question = data.get('question', '')
+    project = data.get('project', '')
+    mode = data.get('mode', 'search')
+
+    if not question:
+        return jsonify({
+            'success': False,
+            'message': 'No hay pregunta'
+        }), 400
+
+    def generate():
+        try:
+            # Obtener contexto del historial
+            context = get_relevant_context(question, project, mode)
+            referenced_files = extract_file_references(context)
+
+            response_length = 0
+            for token in stream_assistant_response(question, context, mode):
+                response_length += len(token)
+                yield sse_event('token', {'token': token})
+
+            log_event('assistant_streamed', f"✅ Respuesta generada en streaming ({response_length} caracteres)",
+                      mode=mode, characters=response_length, context_entries=len(context.get('entries', [])))
+
+            yield sse_event('done', {
+                'context_used': len(context.get('entries', [])),
+                'referenced_files': referenced_files
+            })
+
+        except Exception as e:
+            log_event('assistant_error', f"❌ Error en asistente (stream): {e}",
+                      level=logging.ERROR, exc_info=True, error=str(e), stream=True)
+            yield sse_event('error', {'message': str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Aciertos, fallos y ocupación de las cachés (respuestas del LLM, PDFs y markdown parseado)"""
+    return jsonify({
+        'success': True,
+        'llm_cache': LLM_CACHE.stats(),
+        'pdf_cache': PDF_CACHE.stats(),
+        'markdown_cache': _pdf_generator.markdown_cache.stats() if _pdf_generator else None
+    })
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Estado de un trabajo en segundo plano (pending, running, done, error)"""
+    job = JOB_QUEUE.get(job_id)
+
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'Trabajo no encontrado'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
+
 @app.route('/api/shutdown', methods=['POST'])
 def shutdown():
-    """Detiene el servidor Flask"""
-    print("🛑 Deteniendo servidor...")
-    os.kill(os.getpid(), signal.SIGINT)
+    """
+    Detiene el servidor de forma ordenada: primero se responde y terminan
+    las peticiones en curso, después se para el servidor
+    """
+    if SERVER is not None:
+        SERVER.request_stop()
+    else:
+        # Servidor de desarrollo de Flask: no hay cierre ordenado
+        log_event('server_stopping', "🛑 Deteniendo servidor...")
+        threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGINT)).start()
+
     return jsonify({'success': True, 'message': 'Servidor detenido'})
 
 
+# ==================== MÉTRICAS ====================
+
+HTTP_SECONDS = METRICS.histogram(
+    'diary_http_request_seconds', 'Duración de las peticiones HTTP (hasta terminar de enviar la respuesta)',
+    ['method', 'endpoint', 'status']
+)
+HTTP_IN_FLIGHT = METRICS.gauge('diary_http_requests_in_flight', 'Peticiones HTTP en curso')
+VOSK_AUDIO_SECONDS = METRICS.counter('diary_vosk_audio_seconds_total', 'Segundos de audio transcritos con Vosk',
+                                     ['mode'])
+VOSK_DECODE_SECONDS = METRICS.counter('diary_vosk_decode_seconds_total', 'Segundos dedicados a decodificar con Vosk',
+                                      ['mode'])
+VOSK_REAL_TIME_FACTOR = METRICS.histogram(
+    'diary_vosk_real_time_factor',
+    'Segundos de decodificación por segundo de audio (menos de 1 = más rápido que tiempo real)',
+    ['mode'], buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+)
+GOOGLE_SECONDS = METRICS.histogram('diary_google_speech_seconds', 'Duración de las transcripciones con Google')
+JOBS = METRICS.gauge('diary_jobs', 'Trabajos en segundo plano por estado', ['status'])
+INDEX_ENTRIES = METRICS.gauge('diary_index_entries', 'Entradas en el índice')
+TRANSCRIPTION_STREAMS = METRICS.gauge('diary_transcription_streams', 'Dictados en streaming abiertos')
+CACHE_LOOKUPS = METRICS.counter('diary_cache_lookups_total', 'Consultas a las cachés', ['cache', 'result'])
+CACHE_ENTRIES = METRICS.gauge('diary_cache_entries', 'Elementos guardados en cada caché', ['cache'])
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    """
+    Mide la petición cuando el servidor termina de enviar la respuesta,
+    así que las respuestas en streaming (asistente) cuentan entera su duración
+    """
+    start = g.pop('request_start', None)
+    if start is None:
+        return response
+
+    method = request.method
+    path = request.path
+    # La ruta con sus variables (/api/entry/<project>/<filename>): pocas series distintas
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    status = response.status_code
+
+    def observe():
+        seconds = time.perf_counter() - start
+        HTTP_SECONDS.observe(seconds, method=method, endpoint=endpoint, status=status)
+        log_event('http_request', f"{method} {path} {status} ({seconds * 1000:.0f} ms)", level=logging.DEBUG,
+                  method=method, path=path, endpoint=endpoint, status=status, ms=round(seconds * 1000, 1))
+
+    if response.direct_passthrough:
+        # Archivos (send_file): Werkzeug no avisa al cerrarlos; se mide hasta aquí
+        observe()
+    else:
+        response.call_on_close(observe)
+    return response
+
+
+@METRICS.collector
+def collect_state():
+    """Gauges y totales que llevan otros objetos, leídos al publicar las métricas"""
+    HTTP_IN_FLIGHT.set(REQUEST_TRACKER.in_flight)
+    INDEX_ENTRIES.set(ENTRY_INDEX.status()['entries'])
+    TRANSCRIPTION_STREAMS.set(len(TRANSCRIPTION_SESSIONS))
+
+    counts = JOB_QUEUE.counts()
+    for status in ('pending', 'running', 'done', 'error'):
+        JOBS.set(counts.get(status, 0), status=status)
+
+    caches = {'llm': LLM_CACHE.stats(), 'pdf': PDF_CACHE.stats()}
+    if _pdf_generator is not None:
+        caches['markdown'] = _pdf_generator.markdown_cache.stats()
+
+    for name, stats in caches.items():
+        CACHE_LOOKUPS.set_total(stats['hits'], cache=name, result='hit')
+        CACHE_LOOKUPS.set_total(stats['misses'], cache=name, result='miss')
+        CACHE_ENTRIES.set(stats['entries'], cache=name)
+
+
+def record_transcription(mode, audio_seconds, decode_seconds):
+    """Audio procesado y factor de tiempo real de una transcripción con Vosk"""
+    VOSK_AUDIO_SECONDS.inc(audio_seconds, mode=mode)
+    VOSK_DECODE_SECONDS.inc(decode_seconds, mode=mode)
+    if audio_seconds > 0:
+        VOSK_REAL_TIME_FACTOR.observe(decode_seconds / audio_seconds, mode=mode)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Métricas en formato de texto de Prometheus (para scrapear)"""
+    return Response(METRICS.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+# ==================== PERFILADO ====================
+
+def profiles_forbidden():
+    """Respuesta de error si la petición no puede ver los perfiles (None si puede)"""
+    if not PROFILING_TOKEN:
+        return jsonify({
+            'success': False,
+            'message': 'El perfilado está desactivado (define DIARY_PROFILING_TOKEN)'
+        }), 404
+
+    if not profiling_token_ok(request.headers.get('X-Profile') or request.args.get('profile')):
+        return jsonify({
+            'success': False,
+            'message': 'Token de perfilado no válido'
+        }), 403
+
+    return None
+
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    """Perfiles guardados, del más reciente al más antiguo"""
+    error = profiles_forbidden()
+    if error:
+        return error
+
+    return jsonify({
+        'success': True,
+        'profiles': PROFILER.list()
+    })
+
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """
+    Desglose de un perfil: tiempo por fase y funciones más costosas
+    Con ?format=pstats descarga el .prof (python -m pstats, snakeviz...)
+    """
+    from flask import send_file
+
+    error = profiles_forbidden()
+    if error:
+        return error
+
+    raw = request.args.get('format') == 'pstats'
+    path = PROFILER.path(profile_id, '.prof' if raw else '.json')
+
+    if path is None:
+        return jsonify({
+            'success': False,
+            'message': 'Perfil no encontrado'
+        }), 404
+
+    if raw:
+        return send_file(path.resolve(), mimetype='application/octet-stream',
+                         as_attachment=True, download_name=path.name)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return jsonify({
+            'success': True,
+            'profile': json.load(f)
+        })
+
+
 # ==================== FUNCIONES AUXILIARES ====================
 
 
@@ -355,46 +857,25 @@ Responde SOLO con el texto en Markdown mejorado, sin introducciones ni meta-come
 RESUMEN VISUAL:"""
 
     try:
-        print(f"🧠 Consultando a {OLLAMA_MODEL}...")
-
-        resp = requests.post(
-            OLLAMA_URL,
-            json={
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.5,
-                    "num_predict": 1536,
-                    "top_k": 30,
-                    "top_p": 0.85
-                }
-            },
-            timeout=120
-        )
+        log_event('enrich_started', f"🧠 Consultando a {OLLAMA_MODEL}...", model=OLLAMA_MODEL)
 
-        if resp.status_code == 200:
-            result = resp.json()
-            improved = result.get("response", "").strip()
+        improved = cached_generate(prompt, IMPROVE_OPTIONS, timeout=120)
 
-            if improved:
-                print(f"✅ Texto mejorado ({len(improved)} caracteres)")
-                return improved
-            else:
-                print("⚠️ IA devolvió respuesta vacía")
-                return data['notes']
+        if improved:
+            log_event('enrich_done', f"✅ Texto mejorado ({len(improved)} caracteres)", characters=len(improved))
+            return improved
         else:
-            print(f"❌ Error HTTP {resp.status_code}")
+            log_event('enrich_empty', "⚠️ IA devolvió respuesta vacía", level=logging.WARNING)
             return data['notes']
 
     except Exception as e:
-        print(f"❌ Error con IA: {e}")
+        log_event('enrich_error', f"❌ Error con IA: {e}", level=logging.ERROR, error=str(e))
         return data['notes']
 
 
-def generate_markdown(data, improved_notes, timestamp):
+def generate_markdown(data, improved_notes, timestamp, fecha=None):
     """Genera el contenido Markdown"""
-    fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    fecha = fecha or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     frontmatter = f"""---
 autor: {data['author'] or 'Anónimo'}
@@ -424,21 +905,146 @@ fecha: {fecha}
     return frontmatter + body
 
 
-def parse_frontmatter(content):
-    """Extrae datos del frontmatter YAML"""
-    data = {}
+# ==================== TRABAJOS EN SEGUNDO PLANO ====================
 
-    if content.startswith('---'):
-        parts = content.split('---', 2)
-        if len(parts) >= 2:
-            frontmatter = parts[1].strip()
 
-            for line in frontmatter.split('\n'):
-                if ':' in line:
-                    key, value = line.split(':', 1)
-                    data[key.strip()] = value.strip()
+def file_signature(filepath):
+    """Firma 'tamaño-mtime' de un archivo (None si no existe)"""
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def enrich_entry_job(job_id, payload):
+    """
+    Mejora con IA una entrada ya guardada y reescribe su cuerpo
+    (el frontmatter y la fecha originales se conservan)
+
+    Si la entrada se editó a mano después de guardarla (su firma ya no es
+    la del guardado) no se reescribe y el resultado lleva 'edited'; si la
+    IA no mejoró nada, lleva 'unchanged'.
+    """
+    data = payload['data']
+    filepath = ENTRY_INDEX.entry_path(payload['project'], payload['filename'])
+    result = {'project': payload['project'], 'filename': payload['filename']}
+
+    def edited():
+        # Los trabajos encolados antes de guardar la firma no la comprueban
+        return 'signature' in payload and file_signature(filepath) != payload['signature']
+
+    if not filepath.exists():
+        raise FileNotFoundError(f'La entrada {payload["filename"]} ya no existe')
+
+    if edited():
+        log_event('enrich_skipped', f"✋ La entrada {payload['filename']} se editó; no se mejora con IA",
+                  job_id=job_id, filename=payload['filename'])
+        return {**result, 'edited': True}
+
+    log_event('enrich_job_started', f"🤖 Mejorando texto con IA ({job_id[:8]})...", job_id=job_id)
+    improved_notes = improve_with_ai(data)
+
+    if improved_notes == data['notes']:
+        return {**result, 'unchanged': True}
+
+    markdown_content = generate_markdown(data, improved_notes, payload['timestamp'], payload['fecha'])
+
+    # Escritura atómica: el visor nunca ve un archivo a medias
+    temp_path = filepath.with_suffix('.md.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(markdown_content)
+
+    # La IA tarda: se vuelve a mirar justo antes de sustituir el archivo
+    if edited():
+        os.remove(temp_path)
+        log_event('enrich_skipped', f"✋ La entrada {payload['filename']} se editó mientras se mejoraba; "
+                  "se conserva la edición", job_id=job_id, filename=payload['filename'])
+        return {**result, 'edited': True}
+
+    os.replace(temp_path, filepath)
+
+    ENTRY_INDEX.index_file(payload['project'], filepath, markdown_content)
+    log_event('entry_enriched', f"✅ Entrada mejorada: {filepath}",
+              project=payload['project'], filename=payload['filename'])
+
+    return {**result, 'characters': len(improved_notes)}
+
+
+def embed_entry(project, filename, signature=None, persist=True):
+    """
+    Calcula y guarda los embeddings de una entrada (por fragmentos)
+    Se salta las entradas que no han cambiado desde el último embedding
+
+    Returns:
+        True si se recalcularon los embeddings
+    """
+    key = entry_key(project, filename)
+    if signature is None:
+        signature = ENTRY_INDEX.signatures().get((project, filename))
+
+    if signature is not None and VECTOR_STORE.content_hash(key) == signature:
+        return False
+
+    filepath = ENTRY_INDEX.entry_path(project, filename)
+    content = read_entry(filepath)
+
+    parts = content.split('---', 2)
+    body = parts[2].strip() if len(parts) >= 3 else content
+    metadata = parse_frontmatter(content)
+
+    # El título ayuda a relacionar fragmentos sueltos con su problema
+    title = metadata.get('commit_problema', '')
+    chunks = [f"{title}\n{chunk}" if title else chunk
+              for chunk in split_into_chunks(body, EMBED_CHUNK_CHARS)]
+
+    vectors = [OLLAMA_CLIENT.embed(EMBED_MODEL, chunk) for chunk in chunks]
+    VECTOR_STORE.upsert(key, vectors, content_hash=signature, persist=persist)
+    return True
+
 
-    return data
+def embed_entry_job(job_id, payload):
+    """Trabajo: embeddings de una entrada (los encolaban versiones anteriores)"""
+    if not ENTRY_INDEX.entry_path(payload['project'], payload['filename']).exists():
+        return {'skipped': True}
+
+    updated = embed_entry(payload['project'], payload['filename'])
+    return {'updated': updated}
+
+
+def embed_backfill_job(job_id, payload):
+    """Trabajo: embeddings de todas las entradas que aún no los tienen"""
+    signatures = ENTRY_INDEX.signatures()
+    updated = 0
+
+    for (project, filename), signature in signatures.items():
+        if embed_entry(project, filename, signature, persist=False):
+            updated += 1
+            if updated % 50 == 0:
+                VECTOR_STORE.persist()
+                log_event('embed_progress', f"🧭 Embeddings calculados: {updated}", updated=updated)
+
+    # Entradas que ya no existen
+    for key in VECTOR_STORE.keys():
+        project, filename = key.split('/', 1)
+        if (project, filename) not in signatures:
+            VECTOR_STORE.remove(key)
+
+    VECTOR_STORE.persist()
+    return {'updated': updated, 'total': len(signatures)}
+
+
+def on_index_change(project, filename, deleted):
+    """
+    Mantiene los embeddings al día con el índice de entradas
+
+    Los cambios se juntan en un único repaso pendiente (solo recalcula lo
+    que cambió), así que un cambio masivo no llena la cola de trabajos
+    """
+    if deleted:
+        VECTOR_STORE.remove(entry_key(project, filename))
+    else:
+        JOB_QUEUE.submit('embed_backfill', {}, unique=True)
 
 
 def get_relevant_context(question, project_filter, mode):
@@ -457,100 +1063,132 @@ def get_relevant_context(question, project_filter, mode):
         question_lower = question.lower()
         keywords = extract_keywords(question_lower)
 
-        # Palabras clave de errores comunes
-        error_keywords = ['error', 'bug', 'fallo', 'problema', 'excepción', 'exception',
-                         'crash', 'no funciona', 'roto', 'broken']
+        # Limitar según el modo
+        limit = 10 if mode == 'analyze' else 5
 
-        # Buscar en TODOS los proyectos
-        all_projects = [p.name for p in BASE_PATH.iterdir() if p.is_dir()]
+        with phase('index_refresh'):
+            ENTRY_INDEX.refresh_if_stale()
 
-        for project_name in all_projects:
-            entries_path = BASE_PATH / project_name / "entries"
+        use_semantic = SEMANTIC_SEARCH and len(VECTOR_STORE) > 0
 
-            if not entries_path.exists():
-                continue
+        # Buscar en TODOS los proyectos (índice BM25), priorizando el actual
+        with phase('keyword_search'):
+            entries = ENTRY_INDEX.search_entries(
+                keywords,
+                project_filter=project_filter,
+                boost_errors=mode in ['search', 'suggest'],
+                limit=limit * 3 if use_semantic else limit
+            )
 
-            for md_file in entries_path.glob("*.md"):
-                with open(md_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
+        # Añadir coincidencias por significado (paráfrasis, sinónimos...)
+        if use_semantic:
+            entries = fuse_semantic_results(question, entries, limit)
 
-                content_lower = content.lower()
+        # Leer solo las entradas seleccionadas
+        for entry_data in entries:
+            filepath = ENTRY_INDEX.entry_path(entry_data['project'], entry_data['filename'])
+            with phase('read_entries'):
+                content = read_entry(filepath)
 
-                # Calcular relevancia
-                relevance_score = 0
+            entry_data['content'] = content
+            entry_data['content_preview'] = content[:800]
 
-                # Boost si coincide con el proyecto actual
-                if project_filter and project_name.lower() == project_filter.lower():
-                    relevance_score += 10
+            context['entries'].append(entry_data)
+            context['projects'].add(entry_data['project'])
 
-                # Buscar keywords
-                for keyword in keywords:
-                    if keyword in content_lower:
-                        relevance_score += content_lower.count(keyword) * 2
+            if entry_data.get('rama'):
+                context['branches'].add(entry_data['rama'])
 
-                # Detectar si contiene errores
-                is_error_entry = any(err in content_lower for err in error_keywords)
-                if is_error_entry and mode in ['search', 'suggest']:
-                    relevance_score += 5
+        # Convertir sets a listas
+        context['projects'] = list(context['projects'])
+        context['branches'] = list(context['branches'])
 
-                # Si es relevante, incluir
-                if relevance_score > 0:
-                    entry_data = parse_frontmatter(content)
-                    entry_data['content'] = content
-                    entry_data['content_preview'] = content[:800]
-                    entry_data['relevance'] = relevance_score
-                    entry_data['project'] = project_name
-                    entry_data['filename'] = md_file.name
-                    entry_data['is_error'] = is_error_entry
+    except Exception as e:
+        log_event('context_error', f"⚠️ Error obteniendo contexto: {e}",
+                  level=logging.WARNING, exc_info=True, error=str(e))
 
-                    context['entries'].append(entry_data)
-                    context['projects'].add(project_name)
+    return context
 
-                    if entry_data.get('rama'):
-                        context['branches'].add(entry_data['rama'])
 
-        # Ordenar por relevancia
-        context['entries'].sort(key=lambda x: x.get('relevance', 0), reverse=True)
+def fuse_semantic_results(question, keyword_entries, limit):
+    """
+    Fusiona los resultados BM25 con los más parecidos por embeddings
 
-        # Limitar según el modo
-        limit = 10 if mode == 'analyze' else 5
-        context['entries'] = context['entries'][:limit]
+    La puntuación final es una media ponderada de la puntuación BM25
+    normalizada (0-1) y la similitud coseno. Si Ollama no puede calcular
+    el embedding de la pregunta, se devuelven los resultados BM25.
+    """
+    try:
+        with phase('ollama_embed'):
+            question_vector = OLLAMA_CLIENT.embed(EMBED_MODEL, question)
+    except OllamaError as e:
+        log_event('semantic_unavailable', f"⚠️ Búsqueda semántica no disponible: {e}",
+                  level=logging.WARNING, error=str(e))
+        return keyword_entries[:limit]
+
+    with phase('semantic_search'):
+        semantic_hits = VECTOR_STORE.query(question_vector, k=limit * 3, min_score=SEMANTIC_MIN_SCORE)
+
+    max_keyword = max((entry['relevance'] for entry in keyword_entries), default=0) or 1.0
+    combined = {}
+
+    for entry in keyword_entries:
+        key = entry_key(entry['project'], entry['filename'])
+        entry['keyword_score'] = entry['relevance'] / max_keyword
+        entry['semantic_score'] = 0.0
+        combined[key] = entry
+
+    for key, similarity in semantic_hits:
+        entry = combined.get(key)
+        if entry is None:
+            project, filename = key.split('/', 1)
+            entry = ENTRY_INDEX.get_entry(project, filename)
+            if entry is None:
+                continue
+            entry['keyword_score'] = 0.0
+            entry['is_error'] = False
+            combined[key] = entry
+        entry['semantic_score'] = similarity
+
+    for entry in combined.values():
+        entry['relevance'] = round(
+            (1 - SEMANTIC_WEIGHT) * entry['keyword_score'] + SEMANTIC_WEIGHT * entry['semantic_score'], 3
+        )
 
-        # Convertir sets a listas
-        context['projects'] = list(context['projects'])
-        context['branches'] = list(context['branches'])
+    results = sorted(combined.values(), key=lambda e: e['relevance'], reverse=True)
+    return results[:limit]
 
-    except Exception as e:
-        print(f"⚠️ Error obteniendo contexto: {e}")
 
-    return context
+def entry_key(project, filename):
+    """Clave de una entrada en el almacén de vectores"""
+    return f"{project}/{filename}"
 
 
-def extract_keywords(text):
-    """Extrae palabras clave de la pregunta"""
-    stop_words = {'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'ser', 'se', 'no', 'haber',
-                  'por', 'con', 'su', 'para', 'como', 'estar', 'tener', 'le', 'lo', 'todo',
-                  'pero', 'más', 'hacer', 'o', 'poder', 'decir', 'este', 'ir', 'otro', 'ese',
-                  'si', 'me', 'ya', 'ver', 'porque', 'dar', 'cuando', 'él', 'muy', 'sin',
-                  'vez', 'mucho', 'saber', 'qué', 'sobre', 'mi', 'alguno', 'mismo', 'yo',
-                  'también', 'hasta', 'año', 'dos', 'querer', 'entre', 'así', 'primero',
-                  'desde', 'grande', 'eso', 'ni', 'nos', 'llegar', 'pasar', 'tiempo', 'ella',
-                  'tengo', 'he', 'ha', 'sido', 'cómo', 'hay', 'puedo', 'puede', 'los', 'las',
-                  'una', 'unos', 'unas', 'del'}
+def split_into_chunks(text, max_chars):
+    """Divide un texto en fragmentos de ~max_chars respetando párrafos"""
+    chunks = []
+    current = ''
 
-    # Extraer palabras
-    words = text.lower().split()
-    keywords = []
+    for paragraph in text.split('\n\n'):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
 
-    for word in words:
-        # Limpiar puntuación
-        word = word.strip('.,;:!?¿¡()[]{}"\'-')
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            chunks.append(current)
+            current = ''
 
-        # Filtrar
-        if len(word) > 3 and word not in stop_words:
-            keywords.append(word)
+        # Párrafos enormes (p. ej. bloques de código) se cortan a trozos
+        while len(paragraph) > max_chars:
+            chunks.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
 
-    return keywords
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+
+    if current:
+        chunks.append(current)
+
+    return chunks or [text[:max_chars]]
 
 
 def extract_file_references(context):
@@ -573,9 +1211,9 @@ def extract_file_references(context):
     return files
 
 
-def generate_assistant_response(question, context, mode):
+def build_assistant_prompt(question, context, mode):
     """
-    Genera respuesta del asistente usando IA con contexto del historial
+    Construye el prompt del asistente con el contexto del historial
     """
     # Preparar información del contexto
     context_text = ""
@@ -709,213 +1347,513 @@ def generate_assistant_response(question, context, mode):
 **RESPUESTA:**"""
     }
 
-    prompt = prompts.get(mode, prompts['search'])
+    return prompts.get(mode, prompts['search'])
+
+
+def generate_assistant_response(question, context, mode):
+    """
+    Genera respuesta del asistente usando IA con contexto del historial
+    """
+    with phase('prompt'):
+        prompt = build_assistant_prompt(question, context, mode)
 
     try:
-        print(f"🤖 Asistente ({mode}): Procesando pregunta...")
-
-        resp = requests.post(
-            OLLAMA_URL,
-            json={
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.6,
-                    "num_predict": 2048,
-                    "top_k": 40,
-                    "top_p": 0.9
-                }
-            },
-            timeout=180
-        )
+        log_event('assistant_started', f"🤖 Asistente ({mode}): Procesando pregunta...", mode=mode)
 
-        if resp.status_code == 200:
-            result = resp.json()
-            response = result.get("response", "").strip()
+        # Las respuestas dependen del diario: se invalidan cuando cambia
+        with phase('ollama_generate'):
+            response = cached_generate(prompt, ASSISTANT_OPTIONS, timeout=180,
+                                       tag=ENTRY_INDEX.generation)
 
-            if response:
-                print(f"✅ Respuesta generada ({len(response)} caracteres)")
-                return response
-            else:
-                return "⚠️ No pude generar una respuesta. Intenta reformular tu pregunta."
+        if response:
+            log_event('assistant_done', f"✅ Respuesta generada ({len(response)} caracteres)",
+                      mode=mode, characters=len(response), context_entries=len(context.get('entries', [])))
+            return response
         else:
-            return f"❌ Error al contactar con la IA (HTTP {resp.status_code})"
+            return "⚠️ No pude generar una respuesta. Intenta reformular tu pregunta."
+
+    except OllamaError as e:
+        log_event('assistant_error', f"❌ Error generando respuesta: {e}", level=logging.ERROR, error=str(e))
+        return f"❌ Error al contactar con la IA ({e})"
 
     except Exception as e:
-        print(f"❌ Error generando respuesta: {e}")
+        log_event('assistant_error', f"❌ Error generando respuesta: {e}",
+                  level=logging.ERROR, exc_info=True, error=str(e))
         return f"❌ Error: {str(e)}"
 
 
+def stream_assistant_response(question, context, mode):
+    """
+    Genera la respuesta del asistente token a token
+
+    Consume el stream NDJSON de Ollama y va devolviendo cada fragmento de
+    texto. Si el cliente se desconecta, al cerrar el generador se corta
+    también la conexión con Ollama y se detiene la generación.
+    """
+    prompt = build_assistant_prompt(question, context, mode)
+    cache_key = LLMCache.make_key(OLLAMA_MODEL, prompt, ASSISTANT_OPTIONS)
+    generation = ENTRY_INDEX.generation
+
+    log_event('assistant_started', f"🤖 Asistente ({mode}, stream): Procesando pregunta...", mode=mode, stream=True)
+
+    cached = LLM_CACHE.get(cache_key, tag=generation)
+    if cached is not None:
+        log_event('assistant_cached', f"⚡ Respuesta desde caché ({len(cached)} caracteres)",
+                  characters=len(cached))
+        yield cached
+        return
+
+    def log_stats(stats):
+        log_event('ollama_stream_done', f"✅ Stream terminado ({stats['eval_tokens']} tokens a "
+                  f"{stats['tokens_per_second']} tok/s, espera {stats['queue_seconds']}s)", **stats)
+
+    tokens = []
+    for token in OLLAMA_CLIENT.stream_generate(
+        OLLAMA_MODEL,
+        prompt,
+        ASSISTANT_OPTIONS,
+        timeout=(10, 180),
+        on_stats=log_stats
+    ):
+        tokens.append(token)
+        yield token
+
+    # Solo se cachea una respuesta completa (no si el cliente cortó antes)
+    response = ''.join(tokens).strip()
+    if response:
+        LLM_CACHE.put(cache_key, response, tag=generation)
+
+
+def cached_generate(prompt, options, timeout, tag=None):
+    """
+    Genera con Ollama pasando por la caché de respuestas
+
+    Args:
+        tag: Etiqueta de validez (p. ej. la generación del índice)
+
+    Returns:
+        Texto generado ('' si Ollama devolvió una respuesta vacía)
+    """
+    cache_key = LLMCache.make_key(OLLAMA_MODEL, prompt, options)
+
+    def compute():
+        result = OLLAMA_CLIENT.generate(OLLAMA_MODEL, prompt, options, timeout=timeout)
+        stats = result['stats']
+        log_event('ollama_generate_done', f"🧠 {stats['eval_tokens']} tokens a {stats['tokens_per_second']} tok/s "
+                  f"(espera {stats['queue_seconds']}s, {stats['attempts']} intento(s))", **stats)
+        return result['text']
+
+    return LLM_CACHE.get_or_compute(cache_key, compute, tag=tag) or ''
+
+
+def sse_event(event, data):
+    """Formatea un evento Server-Sent Events con datos JSON"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def find_vosk_model():
+    """
+    Primer modelo de Vosk instalado (prioriza modelo grande, fallback a pequeño)
+
+    Returns:
+        (ruta, descripción) o (None, None)
+    """
+    for path, name in VOSK_MODEL_PATHS:
+        if os.path.exists(path):
+            return path, name
+
+    return None, None
+
+
 def load_vosk_model():
-    """Carga el modelo de Vosk una sola vez (prioriza modelo grande)"""
-    global VOSK_MODEL
-
-    if VOSK_MODEL is None:
-        # Priorizar modelo grande (mejor precisión), fallback a pequeño
-        model_paths = [
-            ("vosk-model-es-0.42", "Grande (1.4GB) - Alta precisión"),
-            ("vosk-model-small-es-0.42", "Pequeño (50MB) - Precisión básica")
-        ]
-
-        model_path = None
-        model_name = None
-
-        for path, name in model_paths:
-            if os.path.exists(path):
-                model_path = path
-                model_name = name
-                break
-
-        if model_path is None:
-            print("=" * 60)
-            print("⚠️  MODELO DE VOSK NO ENCONTRADO")
-            print("=" * 60)
-            print("\n💡 Descarga uno de estos modelos:")
-            print("\n   Recomendado (mejor precisión):")
-            print("   → https://alphacephei.com/vosk/models/vosk-model-es-0.42.zip")
-            print("   → Descomprime en la raíz del proyecto")
-            print("\n   Alternativa (más rápido):")
-            print("   → https://alphacephei.com/vosk/models/vosk-model-small-es-0.42.zip")
-            print("=" * 60)
-            return None
+    """
+    Carga el modelo de Vosk (prioriza modelo grande)
 
-        try:
-            print("=" * 60)
-            print(f"📂 Cargando modelo de Vosk...")
-            print(f"   Modelo: {model_name}")
-            print(f"   Ruta: {model_path}")
-            print("   ⏳ Esto puede tardar unos segundos...")
+    No se llama directamente: VOSK_LOADER la ejecuta una vez en segundo
+    plano al arrancar. Devuelve None si no hay ningún modelo instalado.
+    """
+    model_path, model_name = find_vosk_model()
+
+    if model_path is None:
+        log_event('vosk_model_missing', "\n".join([
+            "=" * 60,
+            "⚠️  MODELO DE VOSK NO ENCONTRADO",
+            "=" * 60,
+            "\n💡 Descarga uno de estos modelos:",
+            "\n   Recomendado (mejor precisión):",
+            "   → https://alphacephei.com/vosk/models/vosk-model-es-0.42.zip",
+            "   → Descomprime en la raíz del proyecto",
+            "\n   Alternativa (más rápido):",
+            "   → https://alphacephei.com/vosk/models/vosk-model-small-es-0.42.zip",
+            "=" * 60
+        ]), level=logging.WARNING)
+        return None
 
-            VOSK_MODEL = Model(model_path)
+    try:
+        log_event('vosk_model_loading', f"📂 Cargando modelo de Vosk en segundo plano: {model_name} ({model_path})",
+                  model=model_name, path=str(model_path))
+        start = time.perf_counter()
 
-            print(f"✅ Modelo cargado exitosamente: {model_name}")
-            print("=" * 60)
+        from vosk import Model
 
-        except Exception as e:
-            print(f"❌ Error cargando modelo de Vosk: {e}")
-            print("💡 Verifica que la carpeta del modelo esté completa")
-            return None
+        model = Model(model_path)
+
+        log_event('vosk_model_loaded', f"✅ Modelo cargado exitosamente: {model_name}",
+                  model=model_name, seconds=round(time.perf_counter() - start, 1))
+
+        return model
+
+    except Exception as e:
+        log_event('vosk_model_error', f"❌ Error cargando modelo de Vosk: {e}\n"
+                  "💡 Verifica que la carpeta del modelo esté completa", level=logging.ERROR, error=str(e))
+        raise
+
+
+def create_recognizer(sample_rate):
+    """Reconocedor nuevo con la configuración de precisión (lo usa el pool)"""
+    from vosk import KaldiRecognizer
+
+    rec = KaldiRecognizer(VOSK_LOADER.model, sample_rate)
+    rec.SetWords(True)  # Incluir info de palabras
+    rec.SetPartialWords(True)  # Mejor reconocimiento parcial
+    return rec
+
+
+def release_recognizer(session):
+    """Devuelve al pool el reconocedor de un dictado en streaming"""
+    RECOGNIZER_POOL.release(session.sample_rate, session.recognizer)
+
+
+def vosk_unavailable():
+    """
+    Respuesta de error si el modelo de Vosk no está listo
+
+    Returns:
+        None si el modelo está disponible; si no, (respuesta, status)
+    """
+    if VOSK_LOADER.get(timeout=VOSK_WAIT_SECONDS) is not None:
+        return None
+
+    if VOSK_LOADER.state == LOADING:
+        return jsonify({
+            'success': False,
+            'loading': True,
+            'message': 'El modelo de Vosk se está cargando; inténtalo en unos segundos.'
+        }), 503
 
-    return VOSK_MODEL
+    return jsonify({
+        'success': False,
+        'message': 'Modelo de Vosk no disponible. Descarga el modelo desde la documentación.'
+    }), 500
+
+
+def get_audio_upload():
+    """
+    Archivo de audio subido en el campo 'audio', listo para leer
+
+    Returns:
+        (stream, None) o (None, respuesta de error)
+    """
+    try:
+        audio_file = request.files.get('audio')
+    except RequestEntityTooLarge:
+        return None, (jsonify({
+            'success': False,
+            'message': f'El audio supera el tamaño máximo ({MAX_AUDIO_BYTES // (1024 * 1024)} MB)'
+        }), 413)
+
+    if audio_file is None:
+        return None, (jsonify({
+            'success': False,
+            'message': 'No se recibió archivo de audio'
+        }), 400)
+
+    audio_file.stream.seek(0)
+    return audio_file.stream, None
+
+
+def transcription_response(full_transcription):
+    """Respuesta JSON de una transcripción con Vosk terminada"""
+    if full_transcription:
+        log_event('transcription_done', f"✅ Transcripción completada ({len(full_transcription)} caracteres)",
+                  characters=len(full_transcription))
+        return jsonify({
+            'success': True,
+            'transcription': full_transcription,
+            'method': 'vosk'
+        })
+
+    log_event('transcription_empty', "⚠️ No se detectó voz en el audio")
+    return jsonify({
+        'success': True,
+        'transcription': '',
+        'message': 'No se detectó voz clara en la grabación'
+    })
+
+
+def recognizer_busy(error):
+    """Respuesta cuando no queda ningún reconocedor libre"""
+    return jsonify({
+        'success': False,
+        'message': str(error)
+    }), 503
+
+
+@app.route('/api/transcribe/status', methods=['GET'])
+def transcribe_status():
+    """Estado del modelo de Vosk (carga en segundo plano) y del pool"""
+    return jsonify({
+        'success': True,
+        'vosk': VOSK_LOADER.status(),
+        'pool': RECOGNIZER_POOL.stats(),
+        'streams': len(TRANSCRIPTION_SESSIONS),
+        'parallel_decode': PARALLEL_DECODER.status()
+    })
 
 
 @app.route('/api/transcribe', methods=['POST'])
 def transcribe_audio():
     """
     Transcribe audio usando Vosk con optimizaciones para mejor precisión
+
+    El WAV se lee directamente de la subida (en memoria, o en un archivo
+    temporal anónimo si supera AUDIO_SPOOL_BYTES)
     """
     try:
-        if 'audio' not in request.files:
-            return jsonify({
-                'success': False,
-                'message': 'No se recibió archivo de audio'
-            }), 400
+        audio_stream, error = get_audio_upload()
+        if error is not None:
+            return error
 
-        audio_file = request.files['audio']
+        # Modelo de Vosk (cargado en segundo plano al arrancar)
+        unavailable = vosk_unavailable()
+        if unavailable is not None:
+            return unavailable
 
-        # Cargar modelo de Vosk
-        model = load_vosk_model()
-        if model is None:
-            return jsonify({
-                'success': False,
-                'message': 'Modelo de Vosk no disponible. Descarga el modelo desde la documentación.'
-            }), 500
-
-        # Guardar audio temporalmente
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
-            audio_file.save(temp_audio.name)
-            temp_audio_path = temp_audio.name
+        with wave.open(audio_stream, "rb") as wf:
+            sample_rate = wf.getframerate()
+            channels = wf.getnchannels()
+            sample_width = wf.getsampwidth()
+
+            audio_seconds = wf.getnframes() / sample_rate
+            log_event('transcription_started', f"🎤 Procesando audio: {sample_rate} Hz, {channels} canal(es), "
+                      f"{audio_seconds:.1f}s", sample_rate=sample_rate, channels=channels,
+                      audio_seconds=round(audio_seconds, 2))
+
+            frames = wf.readframes(wf.getnframes())
+
+        if AUDIO_PREPROCESS:
+            # Mono a 16kHz con volumen normalizado y solo los tramos con voz
+            prepared = prepare_for_recognition(frames, sample_rate, channels, sample_width,
+                                               target_rate=VOSK_SAMPLE_RATE,
+                                               max_segment_seconds=MAX_SEGMENT_SECONDS)
+            segments = prepared['segments']
+            sample_rate = prepared['sample_rate']
+            log_event('audio_prepared', f"   - Voz detectada: {prepared['voiced_seconds']:.1f}s "
+                      f"en {len(segments)} tramo(s)", voiced_seconds=round(prepared['voiced_seconds'], 2),
+                      segments=len(segments))
+        else:
+            prepared = None
+            segments = [frames]
+
+        # Grabaciones largas: cada tramo se decodifica en otro núcleo
+        if (prepared is not None and PARALLEL_DECODER.available and len(segments) > 1
+                and prepared['voiced_seconds'] >= PARALLEL_DECODE_MIN_SECONDS):
+            log_event('transcription_parallel', f"   ⏳ Transcribiendo {len(segments)} tramos en "
+                      f"{WORKER_PROCESSES} procesos...", segments=len(segments), processes=WORKER_PROCESSES)
+
+            # Límite holgado: ni en serie se tarda más que la duración de la voz
+            start = time.perf_counter()
+            transcription_parts = PARALLEL_DECODER.decode(
+                find_vosk_model()[0], segments, sample_rate,
+                timeout=PARALLEL_DECODE_TIMEOUT + prepared['voiced_seconds']
+            )
+            if transcription_parts is not None:
+                record_transcription('parallel', audio_seconds, time.perf_counter() - start)
+                return transcription_response(join_sentences(transcription_parts))
+
+        # En serie con un reconocedor del pool (también si falló el paralelo;
+        # se devuelve reiniciado al terminar)
+        try:
+            rec = RECOGNIZER_POOL.acquire(sample_rate, timeout=VOSK_POOL_TIMEOUT)
+        except RecognizerBusyError as e:
+            return recognizer_busy(e)
 
         try:
-            # Abrir archivo de audio
-            wf = wave.open(temp_audio_path, "rb")
+            start = time.perf_counter()
 
-            sample_rate = wf.getframerate()
+            # Cada tramo se decodifica por separado (chunks grandes = mejor contexto)
+            transcription_parts = []
+            for segment in segments:
+                for text in recognize_pcm(rec, segment):
+                    transcription_parts.append(text)
+                    log_event('transcription_fragment', f"   📝 Fragmento: {text[:50]}...", level=logging.DEBUG)
+        finally:
+            RECOGNIZER_POOL.release(sample_rate, rec)
 
-            print(f"🎤 Procesando audio:")
-            print(f"   - Sample Rate: {sample_rate} Hz")
-            print(f"   - Canales: {wf.getnchannels()}")
-            print(f"   - Duración: {wf.getnframes() / sample_rate:.1f}s")
+        record_transcription('file', audio_seconds, time.perf_counter() - start)
 
-            # Crear reconocedor con configuración mejorada
-            rec = KaldiRecognizer(model, sample_rate)
-            rec.SetWords(True)  # Incluir info de palabras
-            rec.SetPartialWords(True)  # Mejor reconocimiento parcial
+        # Unir frases con puntuación
+        return transcription_response(join_sentences(transcription_parts))
 
-            # Procesar audio en chunks
-            transcription_parts = []
-            chunk_size = 8000  # Chunks más grandes = mejor contexto
-
-            print("   ⏳ Transcribiendo...")
-
-            while True:
-                data = wf.readframes(chunk_size)
-                if len(data) == 0:
-                    break
-
-                if rec.AcceptWaveform(data):
-                    result = json.loads(rec.Result())
-                    text = result.get('text', '').strip()
-
-                    if text:
-                        # Capitalizar primera letra de cada frase
-                        text = text[0].upper() + text[1:] if text else text
-                        transcription_parts.append(text)
-                        print(f"   📝 Fragmento: {text[:50]}...")
-
-            # Procesar resultado final
-            final_result = json.loads(rec.FinalResult())
-            final_text = final_result.get('text', '').strip()
-
-            if final_text:
-                final_text = final_text[0].upper() + final_text[1:] if final_text else final_text
-                transcription_parts.append(final_text)
-                print(f"   📝 Final: {final_text[:50]}...")
-
-            # Unir frases con puntuación
-            if transcription_parts:
-                full_transcription = '. '.join(transcription_parts)
-                # Asegurar punto final
-                if not full_transcription.endswith('.'):
-                    full_transcription += '.'
-            else:
-                full_transcription = ''
-
-            # Limpiar archivo temporal
-            wf.close()
-            os.unlink(temp_audio_path)
-
-            if full_transcription:
-                print(f"✅ Transcripción completada ({len(full_transcription)} caracteres)")
-                return jsonify({
-                    'success': True,
-                    'transcription': full_transcription,
-                    'method': 'vosk'
-                })
-            else:
-                print("⚠️ No se detectó voz en el audio")
-                return jsonify({
-                    'success': True,
-                    'transcription': '',
-                    'message': 'No se detectó voz clara en la grabación'
-                })
+    except (wave.Error, EOFError) as e:
+        log_event('audio_invalid', f"❌ Audio no válido: {e}", level=logging.WARNING, error=str(e))
+        return jsonify({
+            'success': False,
+            'message': f'El audio debe ser WAV PCM: {str(e)}'
+        }), 400
 
-        except Exception as e:
-            # Limpiar en caso de error
-            if os.path.exists(temp_audio_path):
-                os.unlink(temp_audio_path)
-            raise e
+    except Exception as e:
+        log_event('transcription_error', f"❌ Error en transcripción: {e}",
+                  level=logging.ERROR, exc_info=True, error=str(e))
+        return jsonify({
+            'success': False,
+            'message': f'Error al transcribir: {str(e)}'
+        }), 500
+
+
+@app.route('/api/transcribe/stream', methods=['POST'])
+def start_transcription_stream():
+    """
+    Abre un dictado en streaming con Vosk
+
+    Body JSON: {"sample_rate": 16000}. Después el navegador envía el PCM
+    (16 bits, mono) en trozos a /api/transcribe/stream/<id> mientras graba.
+    """
+    data = request.get_json(silent=True) or {}
+
+    try:
+        sample_rate = int(data.get('sample_rate', 16000))
+    except (TypeError, ValueError):
+        sample_rate = 0
+
+    if not 8000 <= sample_rate <= 48000:
+        return jsonify({
+            'success': False,
+            'message': 'sample_rate debe estar entre 8000 y 48000'
+        }), 400
+
+    unavailable = vosk_unavailable()
+    if unavailable is not None:
+        return unavailable
+
+    # El reconocedor queda reservado para el dictado hasta que se cierre
+    try:
+        rec = RECOGNIZER_POOL.acquire(sample_rate, timeout=VOSK_POOL_TIMEOUT)
+    except RecognizerBusyError as e:
+        return recognizer_busy(e)
 
+    session_id = TRANSCRIPTION_SESSIONS.create(rec, sample_rate)
+    log_event('stream_started', f"🎙️ Dictado en streaming iniciado ({session_id[:8]}, {sample_rate} Hz)",
+              session_id=session_id, sample_rate=sample_rate)
+
+    return jsonify({
+        'success': True,
+        'session_id': session_id
+    })
+
+
+@app.route('/api/transcribe/stream/<session_id>', methods=['POST'])
+def feed_transcription_stream(session_id):
+    """
+    Recibe un trozo de PCM crudo (application/octet-stream) y devuelve
+    las frases que se han cerrado y el resultado parcial actual
+    """
+    session = TRANSCRIPTION_SESSIONS.get(session_id)
+    if session is None:
+        return jsonify({
+            'success': False,
+            'message': 'Sesión de dictado no encontrada o caducada'
+        }), 404
+
+    if (request.content_length or 0) > STREAM_MAX_CHUNK_BYTES:
+        return jsonify({
+            'success': False,
+            'message': 'Trozo de audio demasiado grande'
+        }), 413
+
+    try:
+        result = session.feed(request.get_data(cache=False))
+    except SessionClosedError:
+        # Terminado, cancelado o caducado mientras llegaba este trozo
+        return jsonify({
+            'success': False,
+            'message': 'Sesión de dictado no encontrada o caducada'
+        }), 404
     except Exception as e:
-        print(f"❌ Error en transcripción: {e}")
-        import traceback
-        traceback.print_exc()
+        log_event('stream_error', f"❌ Error en dictado {session_id[:8]}: {e}",
+                  level=logging.ERROR, exc_info=True, session_id=session_id, error=str(e))
+        if TRANSCRIPTION_SESSIONS.close(session_id) is not None and session.close():
+            release_recognizer(session)
         return jsonify({
             'success': False,
             'message': f'Error al transcribir: {str(e)}'
         }), 500
 
+    return jsonify({
+        'success': True,
+        'final': result['final'],
+        'partial': result['partial']
+    })
+
+
+@app.route('/api/transcribe/stream/<session_id>/finish', methods=['POST'])
+def finish_transcription_stream(session_id):
+    """Cierra un dictado y devuelve la transcripción completa"""
+    session = TRANSCRIPTION_SESSIONS.close(session_id)
+    if session is None:
+        return jsonify({
+            'success': False,
+            'message': 'Sesión de dictado no encontrada o caducada'
+        }), 404
+
+    # finish() cierra la sesión bajo su lock (también si falla): un trozo que
+    # llegue a la vez recibe 404 y el reconocedor vuelve al pool sin nadie usándolo
+    try:
+        transcription = session.finish()
+    except SessionClosedError:
+        return jsonify({
+            'success': False,
+            'message': 'Sesión de dictado no encontrada o caducada'
+        }), 404
+    except Exception as e:
+        log_event('stream_error', f"❌ Error cerrando dictado {session_id[:8]}: {e}",
+                  level=logging.ERROR, exc_info=True, session_id=session_id, error=str(e))
+        release_recognizer(session)
+        return jsonify({
+            'success': False,
+            'message': f'Error al transcribir: {str(e)}'
+        }), 500
+
+    release_recognizer(session)
+
+    record_transcription('stream', session.duration, session.decode_seconds)
+    log_event('stream_done', f"✅ Dictado {session_id[:8]} completado ({session.duration:.1f}s de audio, "
+              f"{len(transcription)} caracteres)", session_id=session_id,
+              audio_seconds=round(session.duration, 2), decode_seconds=round(session.decode_seconds, 3),
+              characters=len(transcription))
+
+    if not transcription:
+        return jsonify({
+            'success': True,
+            'transcription': '',
+            'message': 'No se detectó voz clara en la grabación'
+        })
+
+    return jsonify({
+        'success': True,
+        'transcription': transcription,
+        'method': 'vosk'
+    })
+
+
+@app.route('/api/transcribe/stream/<session_id>', methods=['DELETE'])
+def cancel_transcription_stream(session_id):
+    """Descarta un dictado sin transcribir lo que quede"""
+    session = TRANSCRIPTION_SESSIONS.close(session_id)
+    if session is not None and session.close():
+        release_recognizer(session)
+    return jsonify({'success': True})
+
 
 @app.route('/api/transcribe_google', methods=['POST'])
 def transcribe_google():
@@ -923,69 +1861,58 @@ def transcribe_google():
     Transcribe audio usando Google Speech API (online)
     Mejor precisión y vocabulario actualizado
     """
-    try:
-        if 'audio' not in request.files:
-            return jsonify({
-                'success': False,
-                'message': 'No se recibió archivo de audio'
-            }), 400
+    import speech_recognition as sr
 
-        audio_file = request.files['audio']
-
-        print("🌐 Transcribiendo con Google Speech API...")
+    try:
+        audio_stream, error = get_audio_upload()
+        if error is not None:
+            return error
 
-        # Guardar audio temporalmente
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
-            audio_file.save(temp_audio.name)
-            temp_audio_path = temp_audio.name
+        log_event('google_started', "🌐 Transcribiendo con Google Speech API...")
 
-        try:
-            # Usar SpeechRecognition
-            recognizer = sr.Recognizer()
+        # Usar SpeechRecognition
+        recognizer = sr.Recognizer()
 
-            # Ajustar para ruido ambiental (mejora precisión)
-            recognizer.energy_threshold = 4000
-            recognizer.dynamic_energy_threshold = True
+        # Ajustar para ruido ambiental (mejora precisión)
+        recognizer.energy_threshold = 4000
+        recognizer.dynamic_energy_threshold = True
 
-            with sr.AudioFile(temp_audio_path) as source:
-                # Ajustar según ruido ambiental
-                recognizer.adjust_for_ambient_noise(source, duration=0.5)
+        # SpeechRecognition acepta el archivo subido tal cual (sin copia a disco)
+        with sr.AudioFile(audio_stream) as source:
+            # Ajustar según ruido ambiental
+            recognizer.adjust_for_ambient_noise(source, duration=0.5)
 
-                # Grabar audio
-                audio_data = recognizer.record(source)
+            # Grabar audio
+            audio_data = recognizer.record(source)
 
-                print("   ⏳ Enviando a Google Cloud Speech...")
+            start = time.perf_counter()
 
-                # Transcribir con Google (español de España)
-                text = recognizer.recognize_google(
-                    audio_data,
-                    language='es-ES',
-                    show_all=False  # Solo mejor resultado
-                )
+            # Transcribir con Google (español de España)
+            text = recognizer.recognize_google(
+                audio_data,
+                language='es-ES',
+                show_all=False  # Solo mejor resultado
+            )
 
-                # Capitalizar primera letra
-                text = text.strip()
-                if text:
-                    text = text[0].upper() + text[1:]
-                    # Añadir punto final si no tiene
-                    if not text.endswith(('.', '!', '?')):
-                        text += '.'
+            # Capitalizar primera letra
+            text = text.strip()
+            if text:
+                text = text[0].upper() + text[1:]
+                # Añadir punto final si no tiene
+                if not text.endswith(('.', '!', '?')):
+                    text += '.'
 
-                print(f"✅ Google transcripción: {text[:80]}...")
+            GOOGLE_SECONDS.observe(time.perf_counter() - start)
+            log_event('google_done', f"✅ Google transcripción: {text[:80]}...", characters=len(text))
 
-                return jsonify({
-                    'success': True,
-                    'transcription': text,
-                    'method': 'google'
-                })
-
-        finally:
-            # Limpiar archivo temporal
-            if os.path.exists(temp_audio_path):
-                os.unlink(temp_audio_path)
+            return jsonify({
+                'success': True,
+                'transcription': text,
+                'method': 'google'
+            })
 
     except sr.UnknownValueError:
-        print("⚠️ Google no pudo entender el audio")
+        log_event('google_empty', "⚠️ Google no pudo entender el audio")
         return jsonify({
             'success': True,
             'transcription': '',
@@ -993,22 +1920,63 @@ def transcribe_google():
         })
 
     except sr.RequestError as e:
-        print(f"❌ Error de Google API: {e}")
+        log_event('google_error', f"❌ Error de Google API: {e}", level=logging.ERROR, error=str(e))
         return jsonify({
             'success': False,
             'message': f'Error de conexión con Google: {str(e)}. Verifica tu conexión a internet.'
         }), 500
 
     except Exception as e:
-        print(f"❌ Error en transcripción Google: {e}")
-        import traceback
-        traceback.print_exc()
+        log_event('google_error', f"❌ Error en transcripción Google: {e}",
+                  level=logging.ERROR, exc_info=True, error=str(e))
         return jsonify({
             'success': False,
             'message': f'Error al transcribir: {str(e)}'
         }), 500
 
 
+def get_pdf_generator():
+    """
+    Generador de PDFs compartido, creado la primera vez que se pide
+
+    Importar ReportLab cuesta más que el resto del arranque; así el
+    servidor atiende antes y el import se hace en la primera exportación
+    o en el precalentamiento de fondo (warm_up).
+    """
+    global _pdf_generator
+
+    with _pdf_generator_lock:
+        if _pdf_generator is None:
+            from diary.pdf_generator import PDFGenerator
+
+            # Estilos construidos una sola vez; las ramas largas se preparan
+            # en los procesos de WORKER_POOL
+            _pdf_generator = PDFGenerator(pool=WORKER_POOL,
+                                          parallel_min_entries=PARALLEL_PDF_MIN_ENTRIES)
+
+        return _pdf_generator
+
+
+def send_pdf(pdf_file, size, download_name):
+    """
+    Envía un PDF ya abierto (búfer en memoria o archivo de la caché)
+
+    send_file no conoce el tamaño de un archivo sin ruta, así que se fija
+    aquí el Content-Length; el archivo se cierra al terminar el envío.
+    """
+    from flask import send_file
+
+    response = send_file(
+        pdf_file,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=download_name
+    )
+    response.content_length = size
+
+    return response
+
+
 @app.route('/api/export_entry_pdf/<project>/<filename>', methods=['GET'])
 def export_entry_pdf(project, filename):
     """Exporta una entrada individual a PDF"""
@@ -1022,70 +1990,90 @@ def export_entry_pdf(project, filename):
             }), 404
 
         # Leer entrada
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = read_entry(filepath)
 
         # Parsear datos
         entry_data = parse_frontmatter(content)
         entry_data['content'] = content
 
-        # Generar PDF
-        pdf_gen = PDFGenerator()
+        # Generar PDF en memoria (o reutilizar el de una exportación anterior)
+        from diary.pdf_generator import GENERATOR_VERSION
 
-        # Crear PDF temporal
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_pdf:
-            pdf_path = temp_pdf.name
-
-        pdf_gen.generate_single_entry_pdf(entry_data, pdf_path)
+        generator = get_pdf_generator()
+        cache_key = PDF_CACHE.make_key(GENERATOR_VERSION, 'entry', project, filename, content)
+        pdf_file, size = PDF_CACHE.get_or_render(
+            cache_key,
+            lambda target: generator.generate_single_entry_pdf(entry_data, target),
+            spool_bytes=PDF_SPOOL_BYTES
+        )
 
         # Nombre del archivo PDF
         pdf_filename = filename.replace('.md', '.pdf')
 
-        # Enviar archivo
-        from flask import send_file
-        return send_file(
-            pdf_path,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=pdf_filename
-        )
+        return send_pdf(pdf_file, size, pdf_filename)
 
     except Exception as e:
-        print(f"❌ Error generando PDF: {e}")
-        import traceback
-        traceback.print_exc()
+        log_event('pdf_error', f"❌ Error generando PDF: {e}",
+                  level=logging.ERROR, exc_info=True, error=str(e))
         return jsonify({
             'success': False,
             'message': f'Error generando PDF: {str(e)}'
         }), 500
 
 
+def render_branch_pdf(project, branch, entries):
+    """
+    PDF de una rama en memoria (o el de una exportación anterior)
+
+    Args:
+        entries: Metadatos de las entradas, ordenadas por fecha; se les
+                 añade el contenido ('content') leído de disco
+
+    Returns:
+        (archivo abierto, tamaño en bytes)
+    """
+    from diary.pdf_generator import GENERATOR_VERSION
+
+    with phase('pdf_setup'):
+        generator = get_pdf_generator()
+
+    with phase('read_entries'):
+        for entry_data in entries:
+            filepath = ENTRY_INDEX.entry_path(project, entry_data['filename'])
+            entry_data['content'] = read_entry(filepath)
+
+    cache_key = PDF_CACHE.make_key(
+        GENERATOR_VERSION, 'branch', project, branch,
+        *(part for entry in entries for part in (entry['filename'], entry['content']))
+    )
+
+    # Sin acierto en la caché incluye la maquetación con ReportLab
+    with phase('pdf'):
+        return PDF_CACHE.get_or_render(
+            cache_key,
+            lambda target: generator.generate_branch_pdf(entries, branch, project, target),
+            spool_bytes=PDF_SPOOL_BYTES
+        )
+
+
 @app.route('/api/export_branch_pdf/<project>/<branch>', methods=['GET'])
+@profiled
 def export_branch_pdf(project, branch):
     """Exporta todas las entradas de una rama a PDF"""
     try:
-        project_path = BASE_PATH / project / "entries"
+        with phase('index'):
+            ENTRY_INDEX.refresh_if_stale()
+            projects = ENTRY_INDEX.list_projects()
 
-        if not project_path.exists():
+        if project not in projects:
             return jsonify({
                 'success': False,
                 'message': 'Proyecto no encontrado'
             }), 404
 
-        # Buscar entradas de la rama
-        entries = []
-
-        for md_file in sorted(project_path.glob("*.md")):
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            entry_data = parse_frontmatter(content)
-
-            # Filtrar por rama
-            if entry_data.get('rama', '').lower() == branch.lower():
-                entry_data['content'] = content
-                entry_data['filename'] = md_file.name
-                entries.append(entry_data)
+        # Buscar entradas de la rama (ordenadas por fecha)
+        with phase('index'):
+            entries = ENTRY_INDEX.list_entries(project=project, branch=branch, newest_first=False)
 
         if not entries:
             return jsonify({
@@ -1093,40 +2081,355 @@ def export_branch_pdf(project, branch):
                 'message': f'No hay entradas para la rama "{branch}"'
             }), 404
 
-        # Ordenar por fecha
-        entries.sort(key=lambda x: x.get('fecha', ''))
-
-        # Generar PDF
-        pdf_gen = PDFGenerator()
-
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_pdf:
-            pdf_path = temp_pdf.name
-
-        pdf_gen.generate_branch_pdf(entries, branch, project, pdf_path)
+        pdf_file, size = render_branch_pdf(project, branch, entries)
 
         # Nombre del archivo
         pdf_filename = f"{project}_{branch}_completo.pdf".replace('/', '-')
 
-        from flask import send_file
-        return send_file(
-            pdf_path,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=pdf_filename
-        )
+        return send_pdf(pdf_file, size, pdf_filename)
 
     except Exception as e:
-        print(f"❌ Error generando PDF de rama: {e}")
-        import traceback
-        traceback.print_exc()
+        log_event('pdf_error', f"❌ Error generando PDF de rama: {e}",
+                  level=logging.ERROR, exc_info=True, project=project, branch=branch, error=str(e))
         return jsonify({
             'success': False,
             'message': f'Error generando PDF: {str(e)}'
         }), 500
 
+
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def remove_old_exports():
+    """Borra los ZIP exportados hace más de EXPORT_MAX_AGE_HOURS"""
+    limit = time.time() - EXPORT_MAX_AGE_HOURS * 3600
+
+    for path in EXPORTS_PATH.glob('*.zip'):
+        try:
+            if path.stat().st_mtime < limit:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def export_project_job(job_id, payload):
+    """
+    Trabajo: PDF de cada rama de un proyecto en un ZIP en disco
+
+    Con 'date_from'/'date_to' solo entran las entradas de ese rango y con
+    'branches' solo esas ramas. Las ramas se renderizan una a una (pasando
+    por la caché de PDFs) y cada PDF se copia al ZIP nada más generarse,
+    así que en memoria solo está el de la rama en curso.
+    """
+    project = payload['project']
+    entries = ENTRY_INDEX.list_entries(
+        project=project,
+        newest_first=False,
+        date_from=payload.get('date_from'),
+        date_to=payload.get('date_to')
+    )
+
+    # Agrupar por rama (sin distinguir mayúsculas, como export_branch_pdf)
+    wanted = {branch.lower() for branch in payload.get('branches') or []}
+    branches = {}
+    for entry in entries:
+        branch = entry.get('rama') or 'sin-rama'
+        if wanted and branch.lower() not in wanted:
+            continue
+        branches.setdefault(branch.lower(), (branch, []))[1].append(entry)
+
+    if not branches:
+        raise ValueError('No hay entradas que exportar con esos filtros')
+
+    EXPORTS_PATH.mkdir(parents=True, exist_ok=True)
+    zip_path = EXPORTS_PATH / f'{job_id}.zip'
+    temp_path = EXPORTS_PATH / f'{job_id}.zip.tmp'
+    total = len(branches)
+    names = set()
+
+    log_event('export_started', f"📦 Exportando {total} rama(s) de {project} ({job_id[:8]})...",
+              job_id=job_id, project=project, branches=total)
+
+    try:
+        # Los PDFs ya van comprimidos: se guardan sin volver a comprimir
+        with zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for done, (branch, branch_entries) in enumerate(branches.values()):
+                JOB_QUEUE.set_progress(job_id, done=done, total=total, current=branch)
+
+                name = f"{project}_{branch}.pdf".replace('/', '-')
+                while name in names:
+                    name = name[:-4] + '_.pdf'
+                names.add(name)
+
+                pdf_file, _size = render_branch_pdf(project, branch, branch_entries)
+                with pdf_file, archive.open(name, 'w') as member:
+                    shutil.copyfileobj(pdf_file, member)
+
+                # El contenido ya no hace falta: no acumularlo rama tras rama
+                for entry in branch_entries:
+                    entry.pop('content', None)
+
+        os.replace(temp_path, zip_path)
+    except BaseException:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+
+    JOB_QUEUE.set_progress(job_id, done=total, total=total)
+    log_event('export_done', f"✅ Exportación lista: {zip_path}", job_id=job_id, project=project)
+
+    suffix = ''
+    if payload.get('date_from') or payload.get('date_to'):
+        suffix = f"_{payload.get('date_from') or 'inicio'}_{payload.get('date_to') or 'hoy'}"
+
+    return {
+        'project': project,
+        'branches': total,
+        'entries': sum(len(branch_entries) for _branch, branch_entries in branches.values()),
+        'bytes': zip_path.stat().st_size,
+        'filename': f"{project}{suffix}.zip".replace('/', '-')
+    }
+
+
+@app.route('/api/export_project/<project>', methods=['POST'])
+def export_project(project):
+    """
+    Encola la exportación de un proyecto a un ZIP con un PDF por rama
+
+    Body JSON (todo opcional): date_from y date_to ('YYYY-MM-DD') y
+    branches (lista de ramas). El avance se consulta en /api/jobs/<id>
+    y el ZIP se descarga de /api/export_project/download/<id>.
+    """
+    ENTRY_INDEX.refresh_if_stale()
+
+    if project not in ENTRY_INDEX.list_projects():
+        return jsonify({
+            'success': False,
+            'message': 'Proyecto no encontrado'
+        }), 404
+
+    data = request.get_json(silent=True) or {}
+    payload = {'project': project}
+
+    for field in ('date_from', 'date_to'):
+        value = data.get(field)
+        if value:
+            if not isinstance(value, str) or not DATE_PATTERN.match(value):
+                return jsonify({
+                    'success': False,
+                    'message': f'{field} debe tener el formato YYYY-MM-DD'
+                }), 400
+            payload[field] = value
+
+    branches = data.get('branches')
+    if branches:
+        if not isinstance(branches, list) or not all(isinstance(b, str) for b in branches):
+            return jsonify({
+                'success': False,
+                'message': 'branches debe ser una lista de nombres de rama'
+            }), 400
+        payload['branches'] = branches
+
+    remove_old_exports()
+    job_id = JOB_QUEUE.submit('export_project', payload)
+    log_event('export_queued', f"📦 Exportación de {project} encolada ({job_id[:8]})", job_id=job_id, project=project)
+
+    return jsonify({
+        'success': True,
+        'job_id': job_id
+    }), 202
+
+
+@app.route('/api/export_project/download/<job_id>', methods=['GET'])
+def download_project_export(job_id):
+    """Descarga el ZIP de una exportación terminada"""
+    from flask import send_file
+
+    job = JOB_QUEUE.get(job_id)
+
+    if job is None or job['kind'] != 'export_project':
+        return jsonify({
+            'success': False,
+            'message': 'Exportación no encontrada'
+        }), 404
+
+    if job['status'] != DONE:
+        return jsonify({
+            'success': False,
+            'message': 'La exportación todavía no ha terminado',
+            'status': job['status']
+        }), 409
+
+    zip_path = EXPORTS_PATH / f'{job_id}.zip'
+    if not zip_path.exists():
+        return jsonify({
+            'success': False,
+            'message': 'La exportación ha caducado; vuelve a generarla'
+        }), 410
+
+    return send_file(
+        zip_path.resolve(),  # send_file resuelve las relativas contra la app
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=job['result']['filename']
+    )
+
+
+# ==================== ARRANQUE ====================
+
+JOB_QUEUE.register('enrich', enrich_entry_job)
+JOB_QUEUE.register('embed', embed_entry_job, background=True)
+JOB_QUEUE.register('embed_backfill', embed_backfill_job, background=True)
+JOB_QUEUE.register('export_project', export_project_job)
+
+_background_started = False
+_background_lock = threading.Lock()
+
+
+def warm_up():
+    """
+    Precarga en segundo plano lo que el arranque deja para el primer uso
+
+    Espera WARMUP_DELAY_SECONDS para no competir con el arranque y después
+    carga el modelo de Vosk, ReportLab y SpeechRecognition, de modo que el
+    primer dictado o la primera exportación no paguen los imports.
+    """
+    time.sleep(WARMUP_DELAY_SECONDS)
+    start = time.perf_counter()
+
+    VOSK_LOADER.start()
+
+    try:
+        get_pdf_generator()
+        import speech_recognition  # noqa: F401
+    except Exception as e:
+        log_event('warm_up_error', f"⚠️ Precarga incompleta (se cargará al primer uso): {e}",
+                  level=logging.WARNING, error=str(e))
+        return
+
+    log_event('warm_up_done', f"🔥 PDFs y Google Speech precargados ({time.perf_counter() - start:.1f}s)",
+              seconds=round(time.perf_counter() - start, 2))
+
+
+def start_background():
+    """
+    Prepara el índice y arranca lo que trabaja en segundo plano: la cola
+    de trabajos, el watcher de inotify, los embeddings pendientes y la
+    precarga
+
+    Importar app.py no arranca nada: lo llama main() antes de servir y,
+    si otro servidor WSGI importa la app (gunicorn, waitress-serve), la
+    primera petición. Así, con el recargador de --dev solo el proceso que
+    sirve peticiones usa la base de datos, no también el que vigila los
+    archivos. Solo la primera llamada hace algo; las que llegan mientras
+    tanto esperan a que termine.
+    """
+    global _background_started
+
+    with _background_lock:
+        if _background_started:
+            return
+
+        # Lo primero: si aún no hay otros hilos los procesos se crean con fork
+        # (lo más rápido); si los hay (gunicorn, waitress-serve), con forkserver
+        WORKER_POOL.start()
+
+        PDF_CACHE.remove_orphans()
+        ENTRY_INDEX.bootstrap()
+
+        # Los workers pueden empezar a reanudar trabajos en cuanto arrancan
+        JOB_QUEUE.start()
+
+        if SEMANTIC_SEARCH:
+            ENTRY_INDEX.listeners.append(on_index_change)
+            JOB_QUEUE.submit('embed_backfill', {}, unique=True)
+
+        if USE_INOTIFY:
+            ENTRY_INDEX.start_watcher()
+
+        if WARMUP_DELAY_SECONDS is not None:
+            threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+        _background_started = True
+
+
+@app.before_request
+def ensure_background_started():
+    if not _background_started:
+        start_background()
+
+
+def close_resources():
+    """
+    Cierre ordenado de todo lo que trabaja en segundo plano
+
+    Los trabajos en curso terminan; los pendientes quedan en la base y se
+    reanudan al volver a arrancar.
+    """
+    log_event('resources_closing', "🧹 Cerrando trabajos en segundo plano...")
+    JOB_QUEUE.shutdown(wait=True, cancel_pending=True)
+
+    WORKER_POOL.shutdown()
+
+    if ENTRY_INDEX.watcher is not None:
+        ENTRY_INDEX.watcher.stop()
+
+    VECTOR_STORE.persist()
+    log_event('server_stopped', "👋 Development Diary detenido")
+
+
+def main(argv=None):
+    """
+    Punto de entrada (también el comando 'development-diary' de setup.py)
+
+    Por defecto sirve con waitress (o el servidor multihilo de Werkzeug) y
+    cierre ordenado; --dev arranca el servidor de desarrollo de Flask con
+    recarga automática.
+    """
+    import argparse
+
+    global SERVER
+
+    parser = argparse.ArgumentParser(description='Development Diary')
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--threads', type=int, default=SERVER_THREADS,
+                        help='Peticiones atendidas a la vez')
+    parser.add_argument('--dev', action='store_true',
+                        help='Servidor de desarrollo de Flask (debug y recarga automática)')
+    args = parser.parse_args(argv)
+
+    log_event('server_starting', "\n".join([
+        "🚀 Iniciando Development Diary...",
+        f"📂 Carpeta de diarios: {BASE_PATH.absolute()}",
+        f"🌐 Abre tu navegador en: http://localhost:{args.port}",
+        "⚠️  Presiona Ctrl+C para detener el servidor"
+    ]), base_path=str(BASE_PATH.absolute()), port=args.port)
+
+    if args.dev:
+        # El recargador ejecuta main() dos veces; solo el hijo sirve peticiones
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+            start_background()
+        app.run(debug=True, host=args.host, port=args.port)
+        return
+
+    start_background()
+
+    SERVER = GracefulServer(
+        app,
+        REQUEST_TRACKER,
+        host=args.host,
+        port=args.port,
+        threads=args.threads,
+        channel_timeout=SERVER_CHANNEL_TIMEOUT,
+        drain_timeout=SHUTDOWN_DRAIN_SECONDS
+    )
+
+    try:
+        SERVER.serve()
+    finally:
+        close_resources()
+
+
 if __name__ == '__main__':
-    print("🚀 Iniciando Development Diary...")
-    print("📂 Carpeta de diarios:", BASE_PATH.absolute())
-    print("🌐 Abre tu navegador en: http://localhost:5000")
-    print("⚠️  Presiona Ctrl+C para detener el servidor")
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    main()
@@ -0,0 +1,226 @@
+"""
+Micro-benchmark de la generación de PDFs
+
+La referencia ("antes") es el camino en serie sin caché de markdown y con
+un generador nuevo por exportación, como se hacía antes (el generador
+anterior no sirve de referencia: rompía con el código en línea). Se
+compara con el generador compartido (caché fría y caliente) y, para la
+rama completa, con el reparto de las entradas entre procesos
+(comprobando que los PDFs en serie y en paralelo son idénticos).
+
+El reparto se mide con los dos arranques de la app (--startup): desde
+main() antes de que haya hilos (fork) y desde la primera petición de un
+servidor WSGI externo, con hilos ya vivos (forkserver).
+
+Cada medida se repite --repeat veces y se muestra la mediana, la
+desviación típica y el mínimo. Con una sola CPU el reparto entre
+procesos no puede ganar: solo añade el coste de enviar las entradas.
+
+Uso:
+    python benchmarks/bench_pdf.py [--entries 500] [--processes 4] [--repeat 5] [--startup both]
+"""
+
+import argparse
+import io
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from reportlab import rl_config  # noqa: E402
+
+from core.process_pool import ProcessPool  # noqa: E402
+from diary.markdown_parser import MarkdownCache  # noqa: E402
+from diary.pdf_generator import PDFGenerator  # noqa: E402
+
+
+def make_entry(i):
+    """Entrada sintética con el markdown que genera la app"""
+    content = f"""---
+fecha: 2024-01-{i % 28 + 1:02d} 10:{i % 60:02d}
+autor: Ana
+proyecto: Benchmark
+rama: main
+commit_problema: Fix {i}: error en la validación del formulario
+---
+
+# Entrada {i}
+
+## Resumen
+
+Se corrigió un **error importante** en la *validación* del formulario de alta.
+El problema aparecía con `emails` que tenían mayúsculas.
+
+### Cambios
+
+- Normalizar el **email** antes de validar
+- Añadir tests para *casos límite*
+- Revisar `validators.py`
+
+```
+def normalize(email):
+    return email.strip().lower()
+```
+
+Notas finales con **negrita**, *cursiva* y más texto para rellenar el párrafo.
+"""
+    return {
+        'fecha': f'2024-01-{i % 28 + 1:02d} 10:{i % 60:02d}',
+        'autor': 'Ana',
+        'proyecto': 'Benchmark',
+        'rama': 'main',
+        'commit_problema': f'Fix {i}: error en la validación del formulario',
+        'content': content
+    }
+
+
+def timed(label, count, func, repeat, setup=None):
+    """Mide 'func' 'repeat' veces y devuelve la mediana"""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+
+    median = statistics.median(samples)
+    spread = statistics.stdev(samples) if len(samples) > 1 else 0.0
+    print(f"  {label:<40} {median:8.3f}s ±{spread:6.3f}  (mín {min(samples):.3f}s)  "
+          f"{median / count * 1000:8.3f} ms/entrada")
+    return median
+
+
+def wait_for_threads(timeout=5):
+    """Espera a que terminen los hilos de un pool anterior"""
+    deadline = time.monotonic() + timeout
+    while threading.active_count() > 1 and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def start_pool(processes, startup):
+    """
+    Arranca el pool como lo hace la app
+
+    'main': desde main(), antes de que haya otros hilos (fork).
+    'wsgi': desde el hilo de la primera petición de un servidor WSGI
+    externo (gunicorn, waitress-serve), con otros hilos vivos (forkserver).
+    """
+    pool = ProcessPool(processes=processes, preload=['diary.pdf_generator'])
+    if startup == 'main':
+        pool.start()
+        return pool
+
+    release = threading.Event()
+    server_thread = threading.Thread(target=release.wait, name='servidor')
+    server_thread.start()
+    request_thread = threading.Thread(target=pool.start, name='peticion')
+    request_thread.start()
+    request_thread.join()
+    release.set()
+    server_thread.join()
+    return pool
+
+
+def compare(baseline, median):
+    print(f"  → {baseline / median:.2f}x respecto a antes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=500)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--startup', choices=['main', 'wsgi', 'both'], default='both',
+                        help='Cómo se arranca el pool: desde main() o desde una petición con hilos')
+    args = parser.parse_args()
+
+    # Sin fecha de creación ni ID aleatorio: PDFs comparables byte a byte
+    rl_config.invariant = 1
+
+    # Sin una línea de log por cada PDF generado
+    logging.disable(logging.INFO)
+
+    def baseline_class():
+        return PDFGenerator(markdown_cache_entries=0)
+    baseline_label = 'antes (nuevo por exportación, sin caché)'
+
+    entries = [make_entry(i) for i in range(args.entries)]
+    count = len(entries)
+    shared = PDFGenerator()
+
+    def clear_cache():
+        shared.markdown_cache = MarkdownCache(shared.markdown_cache.max_entries)
+
+    cpus = os.cpu_count()
+    print(f"📊 Benchmark de PDFs ({count} entradas, {cpus} CPUs, {args.repeat} repeticiones)\n")
+
+    print("Markdown → flowables:")
+    before = timed(baseline_label, count, lambda: [
+        baseline_class().parse_markdown_to_flowables(e['content']) for e in entries
+    ], args.repeat)
+    compare(before, timed('compartido, caché fría', count, lambda: [
+        shared.parse_markdown_to_flowables(e['content']) for e in entries
+    ], args.repeat, setup=clear_cache))
+    compare(before, timed('compartido, caché caliente', count, lambda: [
+        shared.parse_markdown_to_flowables(e['content']) for e in entries
+    ], args.repeat))
+    print()
+
+    print("PDF de una entrada (exportación suelta):")
+    before = timed(baseline_label, count, lambda: [
+        baseline_class().generate_single_entry_pdf(e, io.BytesIO()) for e in entries
+    ], args.repeat)
+    compare(before, timed('compartido, caché fría', count, lambda: [
+        shared.generate_single_entry_pdf(e, io.BytesIO()) for e in entries
+    ], args.repeat, setup=clear_cache))
+    compare(before, timed('compartido, caché caliente', count, lambda: [
+        shared.generate_single_entry_pdf(e, io.BytesIO()) for e in entries
+    ], args.repeat))
+    print()
+
+    print(f"PDF de la rama completa ({args.processes} procesos, {cpus} CPUs):")
+    if args.processes > (cpus or 1):
+        print(f"  ⚠️ Más procesos que CPUs: el reparto compite por {cpus} CPU(s)")
+
+    outputs = {}
+
+    def branch_pdf(generator, key):
+        outputs[key] = io.BytesIO()
+        generator.generate_branch_pdf(entries, 'main', 'Benchmark', outputs[key])
+
+    before = timed(baseline_label, count, lambda: branch_pdf(baseline_class(), 'baseline'), args.repeat)
+    compare(before, timed('en serie, caché fría', count, lambda: branch_pdf(shared, 'serial'),
+                          args.repeat, setup=clear_cache))
+    compare(before, timed('en serie, caché caliente', count, lambda: branch_pdf(shared, 'serial'),
+                          args.repeat))
+
+    startups = ['main', 'wsgi'] if args.startup == 'both' else [args.startup]
+    for startup in startups:
+        pool = start_pool(args.processes, startup)
+        if not pool.available:
+            print(f"  (arranque {startup}: sin procesos de trabajo, no se mide el reparto)")
+            continue
+
+        parallel = PDFGenerator(pool=pool, parallel_min_entries=1)
+        # Preparar los procesos (y su caché) fuera de la medida
+        parallel.entry_stories(entries)
+
+        label = f'en paralelo, arranque {startup} ({pool.start_method})'
+        compare(before, timed(label, count, lambda: branch_pdf(parallel, 'parallel'), args.repeat))
+
+        same = outputs['serial'].getvalue() == outputs['parallel'].getvalue()
+        status = pool.status()
+        print(f"  PDFs en serie y en paralelo {'idénticos' if same else 'DISTINTOS'}; "
+              f"procesos {'activos' if status['running'] else 'PERDIDOS'}, {status['failures']} fallos")
+        pool.shutdown()
+        wait_for_threads()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""
+Benchmark de escala de los endpoints de lectura
+
+Para cada tamaño genera un diario sintético (generate_diary.py) y, en un
+proceso nuevo que apunta DIARY_BASE_PATH a él y DIARY_OLLAMA_HOST a un
+Ollama falso (ollama_stub.py), importa la app y recorre con el cliente de
+pruebas de Flask todos los endpoints de lectura: listados, búsqueda,
+contenido, contexto del asistente y PDFs. Muestra latencias (p50/p95) y
+pico de memoria por endpoint y tamaño, y cómo crece cada uno respecto al
+tamaño más pequeño, para que las regresiones de escala salten a la vista.
+
+Uso:
+    python benchmarks/bench_scale.py [--sizes 1000,10000] [--repeats 5] [--no-embeddings] [--json salida.json]
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from generate_diary import generate_diary  # noqa: E402
+
+# Preguntas distintas en cada repetición: el asistente no debe responder desde la caché
+QUESTIONS = [
+    'Tengo un TypeError NoneType object is not subscriptable al validar el pedido',
+    '¿Cómo se resolvió el timeout de la conexión con la base de datos?',
+    'Error de UnicodeDecodeError al leer el archivo de usuarios',
+    '¿Qué cambiamos en el pool de conexiones de payments?',
+    'KeyError user_id en el servicio de auth',
+    'El listado de reports va lento después del despliegue',
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def wait_until_idle(app_module, timeout=3600):
+    """Espera a la precarga y a los trabajos de fondo (embeddings) antes de medir"""
+    for thread in threading.enumerate():
+        if thread.name == 'warm-up':
+            thread.join()
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        counts = app_module.JOB_QUEUE.counts()
+        if not counts.get('pending') and not counts.get('running'):
+            return
+        time.sleep(0.2)
+
+
+def measure(client, method, url, repeats, body_factory=None):
+    """
+    Latencias de 'repeats' llamadas y pico de memoria de una más con tracemalloc
+
+    Returns:
+        Dict con status, p50/p95/max en ms y pico en KB
+    """
+    timings = []
+    status = None
+
+    for i in range(repeats):
+        kwargs = {'json': body_factory(i)} if body_factory else {}
+        start = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        response.get_data()
+        timings.append((time.perf_counter() - start) * 1000)
+        status = response.status_code
+        response.close()
+
+    kwargs = {'json': body_factory(repeats)} if body_factory else {}
+    tracemalloc.start()
+    response = client.open(url, method=method, **kwargs)
+    response.get_data()
+    response.close()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'status': status,
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'max_ms': round(max(timings), 2),
+        'peak_kb': round(peak / 1024, 1)
+    }
+
+
+def run_child(base_path, repeats, embeddings):
+    """Mide un diario ya generado (se ejecuta en un proceso nuevo) e imprime JSON"""
+    from ollama_stub import OllamaStub
+
+    stub = OllamaStub(embeddings=embeddings).start()
+    os.environ['DIARY_BASE_PATH'] = base_path
+    os.environ['DIARY_OLLAMA_HOST'] = stub.url
+
+    results = {}
+
+    # Arrancar la app construye el índice desde cero: es el arranque en frío
+    start = time.perf_counter()
+    import app as app_module
+    app_module.start_background()
+    results['arranque (índice en frío)'] = {
+        'status': 200, 'p50_ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+
+    start = time.perf_counter()
+    wait_until_idle(app_module)
+    results['embeddings de todo el diario'] = {
+        'status': 200, 'p50_ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+
+    client = app_module.app.test_client()
+    index = app_module.ENTRY_INDEX
+    project = index.list_projects()[0]
+    newest = index.list_entries(project=project)[0]
+    main_entries = len(index.list_entries(project=project, branch='main'))
+
+    first_page = client.get('/api/entries?limit=50').get_json()
+
+    endpoints = [
+        ('GET /api/projects', 'GET', '/api/projects', None),
+        ('GET /api/branches/<p>', 'GET', f'/api/branches/{project}', None),
+        ('GET /api/index/status', 'GET', '/api/index/status', None),
+        ('GET /api/entries', 'GET', '/api/entries?limit=50', None),
+        ('GET /api/entries (página 2)', 'GET', f"/api/entries?limit=50&after={first_page['next_cursor']}", None),
+        ('GET /api/entries (proyecto+rama)', 'GET', f'/api/entries?project={project}&branch=main', None),
+        ('GET /api/entries (texto)', 'GET', '/api/entries?q=timeout', None),
+        ('GET /api/entries (fields=full)', 'GET', '/api/entries?limit=50&fields=full', None),
+        ('GET /api/entry/<p>/<f>', 'GET', f"/api/entry/{project}/{newest['filename']}", None),
+        ('POST /api/assistant', 'POST', '/api/assistant',
+         lambda i: {'question': QUESTIONS[i % len(QUESTIONS)] + f' ({i})', 'project': project, 'mode': 'search'}),
+        ('GET /api/export_entry_pdf', 'GET', f"/api/export_entry_pdf/{project}/{newest['filename']}", None),
+    ]
+
+    for name, method, url, body_factory in endpoints:
+        results[name] = measure(client, method, url, repeats, body_factory)
+
+    # El contexto del asistente por separado (sin el prompt ni Ollama)
+    timings = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        app_module.get_relevant_context(QUESTIONS[i % len(QUESTIONS)], project, 'search')
+        timings.append((time.perf_counter() - start) * 1000)
+    results['get_relevant_context()'] = {
+        'status': 200,
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'max_ms': round(max(timings), 2)
+    }
+
+    # PDF de rama: la primera vez se maqueta, las siguientes salen de la caché
+    branch_url = f'/api/export_branch_pdf/{project}/main'
+    start = time.perf_counter()
+    response = client.get(branch_url)
+    response.get_data()
+    response.close()
+    results['GET /api/export_branch_pdf (frío)'] = {
+        'status': response.status_code, 'p50_ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+    results['GET /api/export_branch_pdf (caché)'] = measure(client, 'GET', branch_url, repeats)
+
+    # Linux da ru_maxrss en KB
+    results['_branch_entries'] = main_entries
+    results['_max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    results['_ollama_calls'] = stub.calls
+
+    print('RESULTS ' + json.dumps(results), flush=True)
+
+    # Cerrar lo de fondo sin esperar a los hilos daemon (watcher, precarga)
+    app_module.close_resources()
+    stub.stop()
+    os._exit(0)
+
+
+def run_size(size, projects, repeats, embeddings, keep):
+    """Genera el diario de 'size' entradas y lo mide en un proceso nuevo"""
+    workdir = tempfile.mkdtemp(prefix=f'diary-bench-{size}-')
+    base_path = os.path.join(workdir, 'Development Diary')
+
+    start = time.perf_counter()
+    generate_diary(base_path, size, projects)
+    print(f"📝 {size} entradas generadas en {time.perf_counter() - start:.1f}s ({base_path})")
+
+    command = [sys.executable, __file__, '--child', base_path, '--repeats', str(repeats)]
+    if not embeddings:
+        command.append('--no-embeddings')
+
+    # cwd temporal: la app no debe dejar nada en el repositorio
+    completed = subprocess.run(command, cwd=workdir, capture_output=True, text=True)
+
+    if not keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for line in completed.stdout.splitlines():
+        if line.startswith('RESULTS '):
+            return json.loads(line[len('RESULTS '):])
+
+    print(completed.stdout[-3000:])
+    print(completed.stderr[-3000:])
+    raise SystemExit(f'❌ Falló la medida con {size} entradas')
+
+
+def print_report(sizes, all_results):
+    names = [name for name in all_results[sizes[0]] if not name.startswith('_')]
+    width = max(len(name) for name in names) + 2
+
+    for size in sizes:
+        results = all_results[size]
+        print(f"\n📊 {size} entradas (RSS máximo {results['_max_rss_mb']} MB, "
+              f"llamadas a Ollama {results['_ollama_calls']}, "
+              f"PDF de rama con {results['_branch_entries']} entradas)")
+        print(f"  {'':<{width}} {'p50 ms':>10} {'p95 ms':>10} {'máx ms':>10} {'pico KB':>10}")
+        for name in results:
+            if name.startswith('_'):
+                continue
+            row = results[name]
+            flag = '' if row['status'] < 400 else f"  ⚠️ HTTP {row['status']}"
+            columns = ''.join(f"{row[key]:>10.1f}" if key in row else f"{'-':>10}"
+                              for key in ('p50_ms', 'p95_ms', 'max_ms', 'peak_kb'))
+            print(f"  {name:<{width}} {columns}{flag}")
+
+    if len(sizes) < 2:
+        return
+
+    smallest, largest = sizes[0], sizes[-1]
+    factor = largest / smallest
+    print(f"\n📈 Crecimiento de p50 de {smallest} a {largest} entradas (x{factor:.0f} datos):")
+    for name in names:
+        before, after = all_results[smallest].get(name), all_results[largest].get(name)
+        if not before or not after or not before['p50_ms']:
+            continue
+        growth = after['p50_ms'] / before['p50_ms']
+        flag = '  ⚠️ crece como los datos o más' if growth >= factor * 0.5 else ''
+        print(f"  {name:<{width}} x{growth:6.1f}{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000',
+                        help='Entradas por diario, separadas por comas (p. ej. 1000,10000,100000)')
+    parser.add_argument('--projects', type=int, default=20)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--no-embeddings', action='store_true',
+                        help='Sin búsqueda semántica (más rápido con diarios enormes)')
+    parser.add_argument('--keep', action='store_true', help='No borrar los diarios generados')
+    parser.add_argument('--json', help='Guardar los resultados en este archivo')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.repeats, not args.no_embeddings)
+        return
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    all_results = {size: run_size(size, args.projects, args.repeats, not args.no_embeddings, args.keep)
+                   for size in sizes}
+
+    print_report(sizes, all_results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({str(size): results for size, results in all_results.items()}, f,
+                      indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+
+if __name__ == '__main__':
+    main()
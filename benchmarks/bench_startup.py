@@ -0,0 +1,122 @@
+"""
+Benchmark del arranque del servidor
+
+Importa app.py y prepara lo que main() arranca antes de servir
+(start_background) en un proceso nuevo con 'python -X importtime' (en una
+carpeta temporal, con un diario vacío) y muestra cuánto tarda y qué
+imports pesan más. Falla si algún subsistema que debe cargarse al primer
+uso (voz, Google Speech, PDFs) se importa al arrancar, o si se supera el
+presupuesto de tiempo, para detectar regresiones.
+
+Uso:
+    python benchmarks/bench_startup.py [--runs 3] [--top 15] [--budget-ms 0]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Deben importarse al primer uso o en la precarga de fondo, nunca al arrancar
+LAZY_MODULES = ('vosk', 'speech_recognition', 'pydub', 'reportlab', 'diary.pdf_generator')
+
+# os._exit: no esperar a los hilos de fondo (trabajos, precarga)
+IMPORT_SCRIPT = (
+    "import os, time\n"
+    "start = time.perf_counter()\n"
+    "import app\n"
+    "app.start_background()\n"
+    "print(f'WALL {time.perf_counter() - start:.6f}', flush=True)\n"
+    "os._exit(0)\n"
+)
+
+
+def parse_importtime(stderr):
+    """
+    Líneas 'import time: propio | acumulado | módulo' de -X importtime
+
+    Returns:
+        Lista de (módulo, nivel de anidamiento, propio µs, acumulado µs)
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3:
+            continue
+
+        own, cumulative, name = fields
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((name.strip(), depth, int(own), int(cumulative)))
+
+    return rows
+
+
+def run_once():
+    """Importa app.py en un proceso limpio; devuelve (segundos, filas de importtime)"""
+    env = dict(os.environ, PYTHONPATH=str(ROOT), PYTHONDONTWRITEBYTECODE='1')
+
+    with tempfile.TemporaryDirectory() as workdir:
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+
+    wall = None
+    for line in completed.stdout.splitlines():
+        if line.startswith('WALL '):
+            wall = float(line.split()[1])
+
+    if completed.returncode != 0 or wall is None:
+        print(completed.stderr[-2000:])
+        raise SystemExit('❌ No se pudo importar app.py')
+
+    return wall, parse_importtime(completed.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help='Repeticiones (se queda con la más rápida)')
+    parser.add_argument('--top', type=int, default=15, help='Imports directos de app.py a mostrar')
+    parser.add_argument('--budget-ms', type=float, default=0, help='Tiempo máximo de arranque (0 = sin límite)')
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    wall, rows = min(runs, key=lambda run: run[0])
+
+    print(f"📊 Arranque de app.py (mejor de {args.runs}): {wall * 1000:.0f} ms\n")
+
+    # Imports hechos directamente por app.py (un nivel por debajo de 'app')
+    app_depth = next((depth for name, depth, _own, _cum in rows if name == 'app'), 0)
+    direct = [row for row in rows if row[1] == app_depth + 1]
+
+    print("Imports de app.py más pesados (acumulado):")
+    for name, _depth, _own, cumulative in sorted(direct, key=lambda row: -row[3])[:args.top]:
+        print(f"  {name:<40} {cumulative / 1000:8.1f} ms")
+
+    loaded = sorted({name for name, *_rest in rows
+                     if any(name == lazy or name.startswith(lazy + '.') for lazy in LAZY_MODULES)})
+
+    failed = False
+    print()
+    if loaded:
+        print(f"❌ Se importan al arrancar (deberían cargarse al primer uso): {', '.join(loaded[:10])}")
+        failed = True
+    else:
+        print(f"✅ Ningún subsistema pesado al arrancar ({', '.join(LAZY_MODULES)})")
+
+    if args.budget_ms and wall * 1000 > args.budget_ms:
+        print(f"❌ Arranque por encima del presupuesto ({wall * 1000:.0f} > {args.budget_ms:.0f} ms)")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
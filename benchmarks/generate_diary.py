@@ -0,0 +1,213 @@
+"""
+Generador de diarios sintéticos
+
+Crea un diario con la misma estructura que escribe la app
+(<proyecto>/entries/<FECHA_HORA>_<rama>.md, frontmatter y cuerpo de
+generate_markdown) y contenido variado: varios proyectos, ramas y
+autores, errores con trazas, bloques de código, listas y tablas. Con la
+misma semilla el diario es idéntico, así que las medidas son comparables.
+
+Uso:
+    python benchmarks/generate_diary.py DESTINO [--entries 10000] [--projects 20] [--seed 1]
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+AUTHORS = ['Ana', 'Luis', 'Marta', 'Carlos', 'Lucía', 'Javier', 'Elena', 'Pablo']
+PROJECT_NAMES = ['Tienda', 'Backoffice', 'API_Pagos', 'App_Movil', 'Facturacion', 'CRM',
+                 'Analitica', 'Notificaciones', 'Inventario', 'Portal_Clientes']
+BRANCHES = ['main', 'develop', 'feature/login', 'feature/carrito', 'fix/timeout',
+            'fix/encoding', 'release/2.1', 'refactor/db']
+MODULES = ['auth', 'orders', 'payments', 'users', 'reports', 'cache', 'db', 'api', 'emails']
+ERRORS = [
+    ("TypeError", "'NoneType' object is not subscriptable"),
+    ("KeyError", "'user_id'"),
+    ("ValueError", "invalid literal for int() with base 10: ''"),
+    ("TimeoutError", "la conexión con la base de datos tardó más de 30s"),
+    ("UnicodeDecodeError", "'utf-8' codec can't decode byte 0xf1 in position 12"),
+    ("IntegrityError", "UNIQUE constraint failed: orders.reference"),
+    ("ConnectionError", "Max retries exceeded with url: /api/v1/payments"),
+]
+PROBLEMS = [
+    "Error al validar el {module} con datos vacíos",
+    "Fix {error} en {module}",
+    "Lentitud en el listado de {module}",
+    "Refactor del servicio de {module}",
+    "Nueva funcionalidad de exportación en {module}",
+    "Migración de {module} a la nueva API",
+    "Tests de integración de {module}",
+]
+WORDS = ('el servicio devuelve datos incompletos cuando la caché está fría y el índice '
+         'no se ha reconstruido después del despliegue por eso revisamos la consulta '
+         'los logs del servidor y la configuración del pool de conexiones').split()
+
+
+def sentence(rng, words=12):
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def code_block(rng, module):
+    function = rng.choice(['load', 'validate', 'save', 'sync', 'retry'])
+    return (
+        "```python\n"
+        f"def {function}_{module}(data, timeout=30):\n"
+        f"    if not data:\n"
+        f"        raise ValueError('{module} vacío')\n"
+        f"    for attempt in range({rng.randint(2, 5)}):\n"
+        f"        result = client.{function}(data, timeout=timeout)\n"
+        f"        if result.ok:\n"
+        f"            return result\n"
+        f"    return None\n"
+        "```"
+    )
+
+
+def traceback_block(rng, module, error):
+    name, message = error
+    return (
+        "```\n"
+        "Traceback (most recent call last):\n"
+        f'  File "app/{module}/views.py", line {rng.randint(10, 400)}, in handle\n'
+        f"    result = service.process(request.data)\n"
+        f'  File "app/{module}/service.py", line {rng.randint(10, 400)}, in process\n'
+        f"    return payload['{module}']\n"
+        f"{name}: {message}\n"
+        "```"
+    )
+
+
+def make_body(rng, module, error):
+    """Cuerpo "mejorado por la IA" con secciones, listas, código y a veces tablas"""
+    sections = [
+        "## Resumen",
+        ' '.join(sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(2, 5))),
+    ]
+
+    if error is not None:
+        sections += [
+            "## Error",
+            f"Aparecía **{error[0]}** al procesar `{module}`: *{error[1]}*.",
+            traceback_block(rng, module, error),
+        ]
+
+    sections += [
+        "## Cambios",
+        '\n'.join(f"- {sentence(rng, rng.randint(5, 10))}" for _ in range(rng.randint(2, 6))),
+    ]
+
+    if rng.random() < 0.6:
+        sections += ["### Código", code_block(rng, module)]
+
+    if rng.random() < 0.2:
+        rows = '\n'.join(f"| {rng.choice(MODULES)} | {rng.randint(10, 900)} ms | {rng.randint(5, 300)} ms |"
+                         for _ in range(rng.randint(2, 5)))
+        sections += ["### Medidas", "| Módulo | Antes | Después |\n|---|---|---|\n" + rows]
+
+    sections += [
+        "## Próximos pasos",
+        '\n'.join(f"{i}. {sentence(rng, rng.randint(4, 9))}" for i in range(1, rng.randint(2, 5))),
+    ]
+
+    return '\n\n'.join(sections)
+
+
+def make_entry(rng, project, moment):
+    """(nombre de archivo, markdown) de una entrada como las de generate_markdown"""
+    branch = rng.choice(BRANCHES)
+    module = rng.choice(MODULES)
+    error = rng.choice(ERRORS) if rng.random() < 0.4 else None
+    problem = rng.choice(PROBLEMS).format(module=module, error=error[0] if error else 'error')
+    author = rng.choice(AUTHORS)
+
+    timestamp = moment.strftime("%Y-%m-%d_%H-%M-%S")
+    fecha = moment.strftime("%Y-%m-%d %H:%M:%S")
+    branch_clean = branch.replace('/', '-')
+    notes = ' '.join(sentence(rng, rng.randint(6, 14)) for _ in range(rng.randint(1, 3)))
+
+    content = f"""---
+autor: {author}
+proyecto: {project}
+rama: {branch}
+commit_problema: {problem}
+fecha: {fecha}
+---
+
+# {problem}
+
+{make_body(rng, module, error)}
+
+---
+
+## 📝 Notas Originales
+```
+{notes}
+```
+
+---
+*Generado por Development Diary el {fecha}*
+"""
+    return f"{timestamp}_{branch_clean}.md", content
+
+
+def project_name(i):
+    """Tienda, Backoffice, ... y, pasada la lista, Tienda_2, Backoffice_2..."""
+    name = PROJECT_NAMES[i % len(PROJECT_NAMES)]
+    return name if i < len(PROJECT_NAMES) else f'{name}_{i // len(PROJECT_NAMES) + 1}'
+
+
+def generate_diary(base_path, entries, projects=20, seed=1, start=datetime(2021, 1, 1)):
+    """
+    Escribe 'entries' entradas repartidas entre 'projects' proyectos
+
+    Las fechas avanzan entre 1 y 600 minutos por entrada dentro de cada
+    proyecto, así que los nombres de archivo nunca se repiten.
+
+    Returns:
+        Lista de nombres de proyecto creados
+    """
+    rng = random.Random(seed)
+    base_path = Path(base_path)
+
+    names = [project_name(i) for i in range(projects)]
+    moments = {name: start for name in names}
+
+    for name in names:
+        (base_path / name / 'entries').mkdir(parents=True, exist_ok=True)
+
+    for _ in range(entries):
+        project = rng.choice(names)
+        moments[project] += timedelta(minutes=rng.randint(1, 600))
+        filename, content = make_entry(rng, project, moments[project])
+
+        with open(base_path / project / 'entries' / filename, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('destination', help='Carpeta del diario (se crea si no existe)')
+    parser.add_argument('--entries', type=int, default=10000)
+    parser.add_argument('--projects', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    destination = Path(args.destination)
+    if destination.exists() and any(destination.iterdir()):
+        sys.exit(f'❌ {destination} no está vacía')
+
+    start = time.perf_counter()
+    names = generate_diary(destination, args.entries, args.projects, args.seed)
+    print(f"📝 {args.entries} entradas en {len(names)} proyectos ({time.perf_counter() - start:.1f}s): "
+          f"{destination.absolute()}")
+
+
+if __name__ == '__main__':
+    main()
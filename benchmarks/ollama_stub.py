@@ -0,0 +1,154 @@
+"""
+Ollama falso para benchmarks
+
+Responde a /api/generate (con y sin streaming) y /api/embeddings con el
+mismo formato que Ollama, sin modelo: el texto es fijo y los embeddings
+salen de un hash de las palabras, así que textos parecidos dan vectores
+parecidos y la búsqueda semántica funciona. Con 'latency' se simula el
+tiempo de generación.
+
+Uso (para probar la app a mano):
+    python benchmarks/ollama_stub.py [--port 11434] [--latency 0]
+    DIARY_OLLAMA_HOST=http://localhost:11434 python app.py
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_DIMENSIONS = 64
+RESPONSE_TOKENS = ('Según el historial, el problema es parecido a uno ya resuelto. '
+                   'Revisa la validación de los datos de entrada y el timeout de la conexión; '
+                   'en las entradas relacionadas se corrigió normalizando el valor antes de guardarlo.').split(' ')
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def fake_embedding(text):
+    """Vector normalizado de 'bolsa de palabras' con hashing"""
+    vector = [0.0] * EMBEDDING_DIMENSIONS
+    for word in WORD_PATTERN.findall(text.lower()):
+        digest = hashlib.md5(word.encode('utf-8')).digest()
+        vector[digest[0] % EMBEDDING_DIMENSIONS] += 1.0 if digest[1] & 1 else -1.0
+
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class OllamaStub:
+    """
+    Servidor HTTP en un hilo que imita la API de Ollama
+
+    Args:
+        port: Puerto (0 = uno libre, ver 'url')
+        latency: Segundos que tarda cada generación
+        embeddings: False para contestar 404 a los embeddings (sin búsqueda semántica)
+    """
+
+    def __init__(self, port=0, latency=0.0, embeddings=True):
+        self.latency = latency
+        self.embeddings = embeddings
+        self.calls = {'generate': 0, 'embeddings': 0}
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='ollama-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Cabeceras y cuerpo van en envíos separados: sin esto cada
+            # llamada espera ~40 ms al ACK retardado de TCP
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+
+                if self.path == '/api/embeddings':
+                    stub.calls['embeddings'] += 1
+                    if not stub.embeddings:
+                        self._send(404, {'error': 'model not found'})
+                        return
+                    self._send(200, {'embedding': fake_embedding(payload.get('prompt', ''))})
+                elif self.path == '/api/generate':
+                    stub.calls['generate'] += 1
+                    self._generate(payload)
+                else:
+                    self._send(404, {'error': 'not found'})
+
+            def _generate(self, payload):
+                start = time.perf_counter()
+                time.sleep(stub.latency)
+
+                prompt_tokens = len(payload.get('prompt', '').split())
+                final = {
+                    'done': True,
+                    'prompt_eval_count': prompt_tokens,
+                    'prompt_eval_duration': 1_000_000,
+                    'eval_count': len(RESPONSE_TOKENS),
+                    'eval_duration': max(int((time.perf_counter() - start) * 1e9), 1_000_000),
+                    'load_duration': 0
+                }
+
+                if not payload.get('stream'):
+                    self._send(200, {**final, 'response': ' '.join(RESPONSE_TOKENS)})
+                    return
+
+                lines = [json.dumps({'response': token + ' ', 'done': False}) for token in RESPONSE_TOKENS]
+                lines.append(json.dumps({**final, 'response': ''}))
+                self._send_raw(200, ('\n'.join(lines) + '\n').encode('utf-8'), 'application/x-ndjson')
+
+            def _send(self, status, data):
+                self._send_raw(status, json.dumps(data).encode('utf-8'), 'application/json')
+
+            def _send_raw(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', type=float, default=0.0, help='Segundos por generación')
+    args = parser.parse_args()
+
+    stub = OllamaStub(args.port, args.latency).start()
+    print(f"🤖 Ollama falso en {stub.url} (Ctrl+C para salir)")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""
+Preprocesado de audio para el reconocimiento de voz
+Todo vectorizado con NumPy: mezcla a mono, remuestreo a la frecuencia del
+modelo, normalización de ganancia y detección de voz por energía para no
+pasarle a Kaldi los silencios
+"""
+
+import numpy as np
+
+
+# Parámetros de la detección de voz (VAD)
+FRAME_MS = 30            # Duración de cada ventana de análisis
+VAD_MARGIN_DB = 12.0     # Cuánto por encima del ruido de fondo se considera voz
+VAD_FLOOR_DBFS = -55.0   # Por debajo de esto nunca es voz
+MIN_SILENCE_MS = 400     # Silencios más cortos no cortan un segmento
+PAD_MS = 200             # Margen que se conserva antes y después de la voz
+
+# Normalización de ganancia
+TARGET_PEAK = 0.9
+MAX_GAIN = 20.0
+
+
+def pcm_to_float(data, sample_width, channels):
+    """
+    Convierte PCM entero intercalado en float32 mono en [-1, 1]
+
+    Args:
+        data: Bytes del PCM (como los devuelve wave.readframes)
+        sample_width: Bytes por muestra (1, 2 o 4)
+        channels: Número de canales intercalados
+    """
+    if sample_width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 4:
+        samples = np.frombuffer(data, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f'Ancho de muestra no soportado: {sample_width * 8} bits')
+
+    if channels > 1:
+        usable = len(samples) - len(samples) % channels
+        samples = samples[:usable].reshape(-1, channels).mean(axis=1)
+
+    return samples
+
+
+def resample(samples, from_rate, to_rate):
+    """
+    Remuestrea por interpolación lineal
+
+    Al bajar de frecuencia se aplica antes una media móvil del ancho del
+    factor de reducción como filtro antialiasing sencillo.
+    """
+    if from_rate == to_rate or not len(samples):
+        return samples
+
+    if from_rate > to_rate:
+        width = int(round(from_rate / to_rate))
+        if width > 1:
+            kernel = np.full(width, 1.0 / width, dtype=np.float32)
+            samples = np.convolve(samples, kernel, mode='same')
+
+    duration = len(samples) / from_rate
+    target_length = int(duration * to_rate)
+    positions = np.arange(target_length, dtype=np.float64) * (from_rate / to_rate)
+
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def normalize_gain(samples, target_peak=TARGET_PEAK, max_gain=MAX_GAIN):
+    """
+    Ajusta el volumen para que el pico (percentil 99.9, ignora chasquidos
+    sueltos) quede en 'target_peak', sin amplificar más de 'max_gain'
+    """
+    if not len(samples):
+        return samples
+
+    peak = float(np.percentile(np.abs(samples), 99.9))
+    if peak <= 0:
+        return samples
+
+    gain = min(target_peak / peak, max_gain)
+
+    return np.clip(samples * gain, -1.0, 1.0)
+
+
+def frame_energies_db(samples, sample_rate, frame_ms=FRAME_MS):
+    """Energía RMS (dBFS) de cada ventana de 'frame_ms'"""
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    count = len(samples) // frame_length
+    if not count:
+        return np.empty(0, dtype=np.float32), frame_length
+
+    frames = samples[:count * frame_length].reshape(count, frame_length)
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+
+    return 20 * np.log10(np.maximum(rms, 1e-10)), frame_length
+
+
+def speech_segments(samples, sample_rate, min_silence_ms=MIN_SILENCE_MS, pad_ms=PAD_MS):
+    """
+    Tramos con voz según la energía de cada ventana
+
+    El umbral se adapta al ruido de fondo de la grabación (percentil 10
+    de la energía) más un margen. Los silencios cortos no separan tramos
+    y cada tramo se amplía con un pequeño margen.
+
+    Si la energía no varía lo bastante para separar voz de fondo (un
+    dictado sin pausas, ruido constante) se devuelve la grabación entera
+    como un solo tramo; solo se descarta si toda está por debajo de
+    VAD_FLOOR_DBFS.
+
+    Returns:
+        Lista de (inicio, fin) en muestras, ordenada
+    """
+    energies, frame_length = frame_energies_db(samples, sample_rate)
+    if not len(energies):
+        return []
+
+    noise_floor = float(np.percentile(energies, 10))
+    threshold = max(noise_floor + VAD_MARGIN_DB, VAD_FLOOR_DBFS)
+    voiced = energies > threshold
+
+    if not voiced.any():
+        if (energies > VAD_FLOOR_DBFS).any():
+            return [(0, len(samples))]
+        return []
+
+    # Inicio y fin de cada racha de ventanas con voz
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    # Unir rachas separadas por silencios cortos
+    max_gap = max(1, int(min_silence_ms / FRAME_MS))
+    keep = np.concatenate(([True], starts[1:] - ends[:-1] > max_gap))
+    starts = starts[keep]
+    ends = np.concatenate((ends[np.flatnonzero(keep)[1:] - 1], [ends[-1]]))
+
+    pad = int(sample_rate * pad_ms / 1000)
+    total = len(samples)
+
+    return [
+        (max(0, int(start) * frame_length - pad), min(total, int(end) * frame_length + pad))
+        for start, end in zip(starts, ends)
+    ]
+
+
+def split_long_segments(samples, bounds, sample_rate, max_seconds):
+    """
+    Parte los tramos más largos que 'max_seconds'
+
+    Cada corte se hace en la ventana más silenciosa de la segunda mitad
+    del tramo máximo, para no partir palabras. Así un dictado sin pausas
+    largas también se puede repartir entre varios procesos.
+    """
+    energies, frame_length = frame_energies_db(samples, sample_rate)
+    max_length = int(max_seconds * sample_rate)
+    result = []
+
+    for start, end in bounds:
+        while end - start > max_length:
+            low = (start + max_length // 2) // frame_length
+            high = min((start + max_length) // frame_length, len(energies))
+            if high <= low:
+                break
+
+            cut = int(low + np.argmin(energies[low:high])) * frame_length
+            if cut <= start:
+                break
+
+            result.append((start, cut))
+            start = cut
+
+        result.append((start, end))
+
+    return result
+
+
+def float_to_pcm16(samples):
+    """Convierte float32 en [-1, 1] a bytes PCM de 16 bits little-endian"""
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype('<i2').tobytes()
+
+
+def prepare_for_recognition(data, sample_rate, channels, sample_width, target_rate=16000,
+                            trim_silence=True, max_segment_seconds=None):
+    """
+    Deja una grabación lista para el reconocedor
+
+    Args:
+        data: PCM tal cual viene del WAV
+        sample_rate, channels, sample_width: Formato del PCM
+        target_rate: Frecuencia del modelo de Vosk
+        trim_silence: Quitar los silencios y separar en tramos con voz
+        max_segment_seconds: Partir los tramos más largos (None = no partir)
+
+    Returns:
+        Dict con 'segments' (lista de bytes PCM 16 bits mono a
+        'target_rate'), 'sample_rate', 'input_seconds' y 'voiced_seconds'
+    """
+    samples = pcm_to_float(data, sample_width, channels)
+    input_seconds = len(samples) / sample_rate if sample_rate else 0.0
+
+    samples = resample(samples, sample_rate, target_rate)
+    samples = normalize_gain(samples)
+
+    if trim_silence:
+        bounds = speech_segments(samples, target_rate)
+    else:
+        bounds = [(0, len(samples))] if len(samples) else []
+
+    if max_segment_seconds:
+        bounds = split_long_segments(samples, bounds, target_rate, max_segment_seconds)
+
+    segments = [float_to_pcm16(samples[start:end]) for start, end in bounds]
+    voiced = sum(end - start for start, end in bounds)
+
+    return {
+        'segments': segments,
+        'sample_rate': target_rate,
+        'input_seconds': round(input_seconds, 2),
+        'voiced_seconds': round(voiced / target_rate, 2)
+    }
@@ -0,0 +1,861 @@
+"""
+Lógica del diario - Índice persistente de entradas
+Guarda en SQLite los metadatos de cada entrada para no reescanear el disco
+en cada petición, y lo mantiene al día de forma incremental
+"""
+
+import base64
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+from core.logs import log_event
+from core.metrics import METRICS
+from core.search_index import SearchIndex, extract_keywords, register_collations
+
+
+# Carpeta (dentro de BASE_PATH) donde viven los datos internos del diario
+INDEX_DIRNAME = '.index'
+
+# Campos del frontmatter que se indexan
+METADATA_FIELDS = ('autor', 'proyecto', 'rama', 'commit_problema', 'fecha')
+
+# Segundos mínimos entre dos escaneos incrementales (sin watcher)
+REFRESH_INTERVAL = 5.0
+
+# Sube al cambiar lo que se guarda por entrada o cómo se tokeniza (fuerza reindexar todo)
+SCHEMA_VERSION = 3
+
+# Columnas devueltas en los listados
+LISTING_FIELDS = ('project', 'filename') + METADATA_FIELDS + ('preview', 'size')
+
+INDEX_SCANS = METRICS.counter(
+    'diary_index_scans_total', 'Recorridos del directorio del diario (rebuild = todo, refresh = incremental)',
+    ['kind']
+)
+INDEX_SCAN_SECONDS = METRICS.histogram('diary_index_scan_seconds', 'Duración de los recorridos del diario', ['kind'])
+INDEX_STATS = METRICS.counter('diary_index_files_stat_total', 'stat() de archivos de entrada al escanear')
+ENTRY_READS = METRICS.counter('diary_entry_file_reads_total', 'Archivos de entrada leídos del disco')
+
+
+def parse_frontmatter(content):
+    """Extrae datos del frontmatter YAML"""
+    data = {}
+
+    if content.startswith('---'):
+        parts = content.split('---', 2)
+        if len(parts) >= 2:
+            frontmatter = parts[1].strip()
+
+            for line in frontmatter.split('\n'):
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    data[key.strip()] = value.strip()
+
+    return data
+
+
+def read_entry(filepath):
+    """Contenido de un archivo de entrada (cuenta la lectura en las métricas)"""
+    ENTRY_READS.inc()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def read_entry_with_stat(filepath):
+    """
+    Contenido de un archivo de entrada y su stat, tomado del mismo archivo
+    abierto antes de leerlo
+
+    Si el archivo cambia mientras se lee, el stat guardado es el anterior
+    al cambio y el siguiente refresh lo vuelve a leer (al revés se quedaría
+    indexado el contenido viejo con el mtime nuevo).
+    """
+    ENTRY_READS.inc()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        stat = os.fstat(f.fileno())
+        return f.read(), stat
+
+
+def extract_preview(content, max_length=150):
+    """Resumen corto del cuerpo: primeras líneas que no son encabezados"""
+    parts = content.split('---', 2)
+    body = parts[2].strip() if len(parts) >= 3 else content
+
+    lines = [line.strip() for line in body.split('\n')
+             if line.strip() and not line.startswith(('#', '---', '```'))]
+    preview = ' '.join(lines[:3])
+
+    if len(preview) > max_length:
+        preview = preview[:max_length] + '...'
+
+    return preview
+
+
+def encode_cursor(entry_data):
+    """Cursor opaco a partir de la clave de orden (fecha, proyecto, archivo)"""
+    key = [entry_data['fecha'], entry_data['project'], entry_data['filename']]
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Inverso de encode_cursor; lanza ValueError si el cursor no es válido"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Cursor no válido')
+
+    if not (isinstance(key, list) and len(key) == 3 and all(isinstance(k, str) for k in key)):
+        raise ValueError('Cursor no válido')
+
+    return key
+
+
+class EntryIndex:
+    """
+    Índice de metadatos de las entradas del diario
+
+    Cada fila representa un archivo BASE_PATH/<proyecto>/entries/<archivo>.md
+    con los datos de su frontmatter, su tamaño y su fecha de modificación.
+    """
+
+    def __init__(self, base_path, db_path=None):
+        self.base_path = Path(base_path)
+        self.db_path = Path(db_path) if db_path else self.base_path / INDEX_DIRNAME / 'diary.db'
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Una sola conexión compartida entre hilos de Flask, protegida por lock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        register_collations(self._conn)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+
+        self.setup_schema()
+        self.search = SearchIndex(self._conn, self._lock)
+
+        # Contador de generación: cambia cada vez que cambia el índice
+        self.generation = self._load_generation()
+        self.last_refresh = 0.0
+        self.watcher = None
+        self._refresh_lock = threading.Lock()
+
+        # Funciones llamadas con (proyecto, archivo, borrado) tras cada cambio
+        self.listeners = []
+
+    def setup_schema(self):
+        """Crea las tablas e índices si no existen"""
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    project TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    autor TEXT NOT NULL DEFAULT '',
+                    proyecto TEXT NOT NULL DEFAULT '',
+                    rama TEXT NOT NULL DEFAULT '',
+                    commit_problema TEXT NOT NULL DEFAULT '',
+                    fecha TEXT NOT NULL DEFAULT '',
+                    size INTEGER NOT NULL DEFAULT 0,
+                    mtime REAL NOT NULL DEFAULT 0,
+                    inode INTEGER NOT NULL DEFAULT 0,
+                    preview TEXT NOT NULL DEFAULT '',
+                    UNIQUE (project, filename)
+                );
+
+                CREATE TABLE IF NOT EXISTS index_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+
+                DROP INDEX IF EXISTS idx_entries_project_rama;
+                CREATE INDEX IF NOT EXISTS idx_entries_project_rama_casefold
+                    ON entries (project, rama COLLATE CASEFOLD);
+                CREATE INDEX IF NOT EXISTS idx_entries_fecha
+                    ON entries (fecha, project, filename);
+            """)
+
+            # Columnas añadidas en versiones posteriores del esquema
+            columns = [row['name'] for row in self._conn.execute('PRAGMA table_info(entries)')]
+            if 'inode' not in columns:
+                self._conn.execute('ALTER TABLE entries ADD COLUMN inode INTEGER NOT NULL DEFAULT 0')
+            if 'preview' not in columns:
+                self._conn.execute("ALTER TABLE entries ADD COLUMN preview TEXT NOT NULL DEFAULT ''")
+
+    def _load_schema_version(self):
+        """Versión del esquema con la que se construyó el índice"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM index_meta WHERE key = 'schema_version'"
+            ).fetchone()
+
+        return int(row['value']) if row else 1
+
+    def _load_generation(self):
+        """Lee el contador de generación persistido"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM index_meta WHERE key = 'generation'"
+            ).fetchone()
+
+        return int(row['value']) if row else 0
+
+    def _bump_generation(self):
+        """Incrementa la generación (requiere el lock y una transacción abierta)"""
+        self.generation += 1
+        self._conn.execute(
+            "INSERT OR REPLACE INTO index_meta (key, value) VALUES ('generation', ?)",
+            (str(self.generation),)
+        )
+
+    # ==================== ESCRITURA ====================
+
+    def bootstrap(self):
+        """
+        Prepara el índice al arrancar: lo construye entero la primera vez
+        (si está vacío) y si no aplica solo los cambios hechos en disco
+        mientras el servidor estaba parado
+        """
+        with self._lock:
+            count = self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+        # También si el índice invertido no cubre todas las entradas o el
+        # esquema ha cambiado desde que se construyó
+        if (count == 0 or self.search.document_count() != count
+                or self._load_schema_version() != SCHEMA_VERSION):
+            indexed = self.rebuild()
+            if indexed:
+                log_event('index_built', f"🗂️  Índice de entradas construido ({indexed} entradas)",
+                          entries=indexed)
+        else:
+            self.refresh()
+
+    def rebuild(self):
+        """Vacía el índice y vuelve a indexar todos los proyectos"""
+        indexed = 0
+        start = time.perf_counter()
+
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM entries')
+            self.search.clear()
+
+            for project_name in self.scan_projects():
+                entries_path = self.base_path / project_name / "entries"
+
+                for md_file in entries_path.glob("*.md"):
+                    try:
+                        self._upsert(project_name, md_file)
+                    except (FileNotFoundError, UnicodeDecodeError):
+                        # Borrado durante el recorrido, o no es texto
+                        continue
+                    indexed += 1
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO index_meta (key, value) VALUES ('schema_version', ?)",
+                (str(SCHEMA_VERSION),)
+            )
+            self._bump_generation()
+
+        self.last_refresh = time.monotonic()
+        INDEX_SCANS.inc(kind='rebuild')
+        INDEX_SCAN_SECONDS.observe(time.perf_counter() - start, kind='rebuild')
+        return indexed
+
+    def refresh(self, projects=None):
+        """
+        Sincroniza el índice con el disco de forma incremental
+
+        Solo hace stat() de los archivos; únicamente se leen y reindexan los
+        que son nuevos o cuyo tamaño, mtime o inode ha cambiado.
+
+        Args:
+            projects: Proyectos a revisar (None = todos, incluidos los borrados)
+
+        Returns:
+            Dict con el número de entradas 'added', 'modified' y 'deleted'
+        """
+        changes = {'added': 0, 'modified': 0, 'deleted': 0}
+        start = time.perf_counter()
+
+        with self._refresh_lock:
+            if projects is None:
+                with self._lock:
+                    indexed_projects = set(self.list_projects())
+                projects = indexed_projects | set(self.scan_projects())
+
+            for project in projects:
+                on_disk = self._scan_manifest(project)
+
+                with self._lock:
+                    rows = self._conn.execute(
+                        'SELECT filename, size, mtime, inode FROM entries WHERE project = ?',
+                        (project,)
+                    ).fetchall()
+                indexed = {row['filename']: (row['size'], row['mtime'], row['inode']) for row in rows}
+
+                added = [name for name in on_disk if name not in indexed]
+                modified = [name for name in on_disk
+                            if name in indexed and on_disk[name] != indexed[name]]
+                deleted = [name for name in indexed if name not in on_disk]
+
+                if not (added or modified or deleted):
+                    continue
+
+                upserted = []
+                with self._lock, self._conn:
+                    for name in added + modified:
+                        try:
+                            self._upsert(project, self.entry_path(project, name))
+                            upserted.append(name)
+                        except (FileNotFoundError, UnicodeDecodeError):
+                            # Borrado entre el stat y la lectura, o no es texto
+                            continue
+
+                    for name in deleted:
+                        self._delete(project, name)
+
+                    self._bump_generation()
+
+                for name in upserted:
+                    self._notify(project, name, False)
+                for name in deleted:
+                    self._notify(project, name, True)
+
+                # Solo cuentan las que se pudieron indexar
+                new_names = set(added)
+                changes['added'] += sum(1 for name in upserted if name in new_names)
+                changes['modified'] += sum(1 for name in upserted if name not in new_names)
+                changes['deleted'] += len(deleted)
+
+            self.last_refresh = time.monotonic()
+
+        INDEX_SCANS.inc(kind='refresh')
+        INDEX_SCAN_SECONDS.observe(time.perf_counter() - start, kind='refresh')
+
+        if any(changes.values()):
+            log_event('index_refreshed', f"🔄 Índice actualizado: +{changes['added']} "
+                      f"~{changes['modified']} -{changes['deleted']}", **changes)
+
+        return changes
+
+    def refresh_if_stale(self, max_age=REFRESH_INTERVAL):
+        """
+        Refresca el índice si el último escaneo es antiguo
+
+        Con el watcher de inotify activo no hace nada: los cambios ya se
+        aplican en cuanto ocurren.
+        """
+        if self.watcher is not None and self.watcher.is_alive():
+            return
+
+        if time.monotonic() - self.last_refresh >= max_age and not self._refresh_lock.locked():
+            self.refresh()
+
+    def _scan_manifest(self, project):
+        """Devuelve {archivo: (tamaño, mtime, inode)} de los .md de un proyecto"""
+        manifest = {}
+        entries_path = self.base_path / project / "entries"
+
+        try:
+            with os.scandir(entries_path) as it:
+                for item in it:
+                    if item.name.endswith('.md') and item.is_file():
+                        INDEX_STATS.inc()
+                        stat = item.stat()
+                        manifest[item.name] = (stat.st_size, stat.st_mtime, stat.st_ino)
+        except FileNotFoundError:
+            pass
+
+        return manifest
+
+    def index_file(self, project, filepath, content=None):
+        """
+        Añade o actualiza una entrada en el índice
+
+        Args:
+            project: Nombre de la carpeta del proyecto
+            filepath: Ruta del archivo markdown
+            content: Contenido ya leído (evita releer el archivo)
+        """
+        filepath = Path(filepath)
+
+        with self._lock, self._conn:
+            self._upsert(project, filepath, content)
+            self._bump_generation()
+
+        self._notify(project, filepath.name, False)
+
+    def remove_file(self, project, filename):
+        """Elimina una entrada del índice"""
+        with self._lock, self._conn:
+            deleted = self._delete(project, filename)
+            if deleted:
+                self._bump_generation()
+
+        if deleted:
+            self._notify(project, filename, True)
+
+    def _notify(self, project, filename, deleted):
+        """Avisa a los listeners de un cambio (fuera del lock)"""
+        for listener in self.listeners:
+            try:
+                listener(project, filename, deleted)
+            except Exception as e:
+                log_event('index_listener_error', f"⚠️ Error en listener del índice: {e}",
+                          level=logging.WARNING, error=str(e))
+
+    def _delete(self, project, filename):
+        """Borra la fila de un archivo (requiere el lock)"""
+        row = self._conn.execute(
+            'SELECT id FROM entries WHERE project = ? AND filename = ?',
+            (project, filename)
+        ).fetchone()
+
+        if row is None:
+            return False
+
+        self.search.remove_document(row['id'])
+        self._conn.execute('DELETE FROM entries WHERE id = ?', (row['id'],))
+        return True
+
+    def _upsert(self, project, filepath, content=None):
+        """Inserta o reemplaza la fila de un archivo (requiere el lock)"""
+        if content is None:
+            content, stat = read_entry_with_stat(filepath)
+        else:
+            # 'content' lo acaba de escribir quien llama
+            stat = filepath.stat()
+
+        metadata = parse_frontmatter(content)
+
+        self._conn.execute(
+            """
+            INSERT INTO entries (project, filename, autor, proyecto, rama,
+                                 commit_problema, fecha, size, mtime, inode, preview)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (project, filename) DO UPDATE SET
+                autor = excluded.autor,
+                proyecto = excluded.proyecto,
+                rama = excluded.rama,
+                commit_problema = excluded.commit_problema,
+                fecha = excluded.fecha,
+                size = excluded.size,
+                mtime = excluded.mtime,
+                inode = excluded.inode,
+                preview = excluded.preview
+            """,
+            (project, filepath.name,
+             *(metadata.get(field, '') for field in METADATA_FIELDS),
+             stat.st_size, stat.st_mtime, stat.st_ino, extract_preview(content))
+        )
+
+        entry_id = self._conn.execute(
+            'SELECT id FROM entries WHERE project = ? AND filename = ?',
+            (project, filepath.name)
+        ).fetchone()['id']
+        self.search.index_document(entry_id, project, content)
+
+    # ==================== CONSULTAS ====================
+
+    def scan_projects(self):
+        """Lista las carpetas de proyecto presentes en disco, tengan o no entradas"""
+        try:
+            with os.scandir(self.base_path) as items:
+                return sorted(
+                    item.name for item in items
+                    if item.is_dir() and not item.name.startswith('.')
+                )
+        except FileNotFoundError:
+            return []
+
+    def list_projects(self):
+        """Proyectos con al menos una entrada indexada"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT DISTINCT project FROM entries ORDER BY project'
+            ).fetchall()
+
+        return [row['project'] for row in rows]
+
+    def list_branches(self, project):
+        """Ramas distintas de un proyecto (ignora vacías y 'nada')"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT DISTINCT rama FROM entries
+                WHERE project = ? AND rama != '' AND lower(rama) != 'nada'
+                ORDER BY rama
+                """,
+                (project,)
+            ).fetchall()
+
+        return [row['rama'] for row in rows]
+
+    def list_entries(self, project=None, branch=None, newest_first=True, date_from=None, date_to=None):
+        """
+        Lista metadatos de entradas, opcionalmente filtrados
+
+        Args:
+            project: Nombre del proyecto (None = todos)
+            branch: Rama, sin distinguir mayúsculas (None = todas)
+            newest_first: Orden por fecha descendente
+            date_from: Fecha mínima 'YYYY-MM-DD[ HH:MM:SS]' (incluida)
+            date_to: Fecha máxima 'YYYY-MM-DD[ HH:MM:SS]' (incluida)
+
+        Returns:
+            Lista de dicts con el frontmatter más 'project' y 'filename'
+        """
+        query = f"SELECT project, filename, {', '.join(METADATA_FIELDS)} FROM entries"
+        conditions = []
+        params = []
+
+        if project:
+            conditions.append('project = ?')
+            params.append(project)
+
+        if branch:
+            conditions.append('rama = ? COLLATE CASEFOLD')
+            params.append(branch)
+
+        if date_from:
+            conditions.append('fecha >= ?')
+            params.append(date_from)
+
+        if date_to:
+            # Una fecha sin hora incluye el día completo
+            if len(date_to) == 10:
+                date_to += ' 23:59:59'
+            conditions.append('fecha <= ?')
+            params.append(date_to)
+
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+
+        direction = 'DESC' if newest_first else 'ASC'
+        query += f' ORDER BY fecha {direction}, filename {direction}'
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def query_entries(self, project=None, branch=None, author=None, date_from=None,
+                      date_to=None, text=None, after=None, limit=50):
+        """
+        Página de entradas (más recientes primero) con filtros en el servidor
+
+        La paginación es por cursor sobre (fecha, proyecto, archivo), así
+        que cada página es una búsqueda por índice y no depende de cuántas
+        páginas se hayan pedido antes.
+
+        Args:
+            project: Proyecto exacto
+            branch: Rama, sin distinguir mayúsculas
+            author: Autor, sin distinguir mayúsculas
+            date_from: Fecha mínima 'YYYY-MM-DD[ HH:MM:SS]' (incluida)
+            date_to: Fecha máxima 'YYYY-MM-DD[ HH:MM:SS]' (incluida)
+            text: Palabras a buscar en el título o en el contenido indexado
+            after: Cursor devuelto por la página anterior
+            limit: Tamaño de página
+
+        Returns:
+            (lista de dicts con LISTING_FIELDS, cursor siguiente o None)
+        """
+        conditions = []
+        params = []
+
+        if project:
+            conditions.append('project = ?')
+            params.append(project)
+
+        if branch:
+            conditions.append('rama = ? COLLATE CASEFOLD')
+            params.append(branch)
+
+        if author:
+            conditions.append('autor = ? COLLATE CASEFOLD')
+            params.append(author)
+
+        if date_from:
+            conditions.append('fecha >= ?')
+            params.append(date_from)
+
+        if date_to:
+            # Una fecha sin hora incluye el día completo
+            if len(date_to) == 10:
+                date_to += ' 23:59:59'
+            conditions.append('fecha <= ?')
+            params.append(date_to)
+
+        if text:
+            terms = extract_keywords(text) or [text.lower().strip()]
+            for term in terms:
+                conditions.append(
+                    '(commit_problema LIKE ? OR id IN '
+                    '(SELECT entry_id FROM postings WHERE term = ?))'
+                )
+                params.extend([f'%{term}%', term])
+
+        if after:
+            conditions.append('(fecha, project, filename) < (?, ?, ?)')
+            params.extend(decode_cursor(after))
+
+        query = f"SELECT {', '.join(LISTING_FIELDS)} FROM entries"
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY fecha DESC, project DESC, filename DESC LIMIT ?'
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        entries = [dict(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(entries[-1]) if len(rows) > limit else None
+
+        return entries, next_cursor
+
+    def search_entries(self, keywords, project_filter=None, boost_errors=False, limit=5):
+        """
+        Busca entradas relevantes con BM25 (ver SearchIndex.search)
+
+        Returns:
+            Lista de dicts con metadatos más 'relevance' e 'is_error'
+        """
+        hits = self.search.search(keywords, project_filter, boost_errors, limit)
+        if not hits:
+            return []
+
+        placeholders = ', '.join('?' * len(hits))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, project, filename, {', '.join(METADATA_FIELDS)} "
+                f"FROM entries WHERE id IN ({placeholders})",
+                [hit['entry_id'] for hit in hits]
+            ).fetchall()
+
+        rows_by_id = {row['id']: row for row in rows}
+        results = []
+
+        for hit in hits:
+            row = rows_by_id.get(hit['entry_id'])
+            if row is None:
+                continue
+
+            entry_data = dict(row)
+            del entry_data['id']
+            entry_data['relevance'] = round(hit['score'], 2)
+            entry_data['is_error'] = hit['is_error']
+            results.append(entry_data)
+
+        return results
+
+    def get_entry(self, project, filename):
+        """Metadatos de una entrada concreta (None si no está indexada)"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(LISTING_FIELDS)} FROM entries WHERE project = ? AND filename = ?",
+                (project, filename)
+            ).fetchone()
+
+        return dict(row) if row else None
+
+    def signatures(self):
+        """
+        Firma (tamaño, mtime) de cada entrada, para detectar qué ha cambiado
+
+        Returns:
+            Dict {(proyecto, archivo): 'tamaño-mtime'}
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT project, filename, size, mtime FROM entries').fetchall()
+
+        return {(row['project'], row['filename']): f"{row['size']}-{row['mtime']}" for row in rows}
+
+    def entry_path(self, project, filename):
+        """Ruta en disco de una entrada"""
+        return self.base_path / project / "entries" / filename
+
+    def status(self):
+        """Resumen del estado del índice"""
+        with self._lock:
+            count = self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+        return {
+            'generation': self.generation,
+            'entries': count,
+            'watcher': self.watcher is not None and self.watcher.is_alive(),
+            'seconds_since_refresh': round(time.monotonic() - self.last_refresh, 1)
+        }
+
+    def start_watcher(self):
+        """
+        Arranca el watcher de inotify (solo Linux)
+
+        Returns:
+            True si el watcher quedó activo; si no, se usa refresh_if_stale
+        """
+        if not IndexWatcher.is_supported():
+            return False
+
+        try:
+            self.watcher = IndexWatcher(self)
+            self.watcher.start()
+        except OSError as e:
+            log_event('index_watcher_unavailable', f"⚠️ inotify no disponible, se usará escaneo periódico: {e}",
+                      level=logging.WARNING, error=str(e))
+            self.watcher = None
+            return False
+
+        return True
+
+
+class IndexWatcher(threading.Thread):
+    """
+    Hilo que escucha inotify sobre BASE_PATH y refresca solo los proyectos
+    en los que algo ha cambiado
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+
+    WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+                  | IN_CREATE | IN_DELETE)
+
+    # Agrupa ráfagas de eventos (p. ej. un git pull) en un solo refresco
+    DEBOUNCE_SECONDS = 0.5
+
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, entry_index):
+        super().__init__(name='index-watcher', daemon=True)
+        self.entry_index = entry_index
+        self.base_path = entry_index.base_path
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1')
+
+        self._watches = {}  # wd -> proyecto (None = BASE_PATH)
+        self._stop_event = threading.Event()
+
+        self._add_watch(self.base_path, None)
+        for project in entry_index.scan_projects():
+            self._watch_project(project)
+
+    @staticmethod
+    def is_supported():
+        """inotify solo existe en Linux"""
+        return sys.platform.startswith('linux')
+
+    def _add_watch(self, path, project):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+        if wd >= 0:
+            self._watches[wd] = project
+
+    def _watch_project(self, project):
+        project_path = self.base_path / project
+        self._add_watch(project_path, project)
+
+        entries_path = project_path / "entries"
+        if entries_path.is_dir():
+            self._add_watch(entries_path, project)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        dirty = set()
+        deadline = None
+
+        while not self._stop_event.is_set():
+            timeout = self.DEBOUNCE_SECONDS if dirty else 1.0
+            readable, _, _ = select.select([self._fd], [], [], timeout)
+
+            if readable:
+                try:
+                    buffer = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    buffer = b''
+                dirty |= self._parse_events(buffer)
+                deadline = time.monotonic() + self.DEBOUNCE_SECONDS
+
+            if dirty and time.monotonic() >= deadline:
+                projects, dirty = dirty, set()
+                try:
+                    self._refresh(projects)
+                except Exception as e:
+                    log_event('index_refresh_error', f"⚠️ Error refrescando índice: {e}",
+                              level=logging.WARNING, error=str(e))
+
+        os.close(self._fd)
+
+    def _refresh(self, projects):
+        """Refresca los proyectos afectados (None entre ellos = todos)"""
+        if None not in projects:
+            self.entry_index.refresh(projects)
+            return
+
+        # Se perdieron eventos: vigilar los proyectos creados mientras tanto
+        # y revisar todos
+        for project in self.entry_index.scan_projects():
+            self._watch_project(project)
+        self.entry_index.refresh()
+
+    def _parse_events(self, buffer):
+        """
+        Devuelve los proyectos afectados por un bloque de eventos
+
+        Si la cola de inotify se desbordó (p. ej. un git pull grande) se
+        han perdido eventos y el conjunto incluye None: hay que revisarlo todo.
+        """
+        projects = set()
+        offset = 0
+
+        while offset + self.EVENT_HEADER.size <= len(buffer):
+            wd, mask, _cookie, length = self.EVENT_HEADER.unpack_from(buffer, offset)
+            offset += self.EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                log_event('index_watcher_overflow', "⚠️ Cola de inotify desbordada: se revisa todo el diario",
+                          level=logging.WARNING)
+                projects.add(None)
+                continue
+
+            if wd not in self._watches:
+                continue
+
+            project = self._watches[wd]
+            is_dir = mask & self.IN_ISDIR
+
+            if project is None:
+                # Evento en BASE_PATH: proyecto creado, borrado o renombrado
+                if is_dir and not name.startswith('.'):
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        self._watch_project(name)
+                    projects.add(name)
+            elif is_dir and name == 'entries' and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                self._add_watch(self.base_path / project / "entries", project)
+                projects.add(project)
+            elif name.endswith('.md'):
+                projects.add(project)
+
+        return projects
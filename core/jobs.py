@@ -0,0 +1,262 @@
+"""
+Cola de trabajos en segundo plano
+Los trabajos se guardan en SQLite, así que los que no terminaron se
+reanudan al reiniciar el servidor
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from core.logs import log_event
+from core.metrics import METRICS
+
+
+# Estados posibles de un trabajo
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+ERROR = 'error'
+
+JOB_SECONDS = METRICS.histogram('diary_job_seconds', 'Duración de los trabajos en segundo plano',
+                                ['kind', 'status'])
+
+
+class JobQueue:
+    """
+    Cola persistente de trabajos ejecutados por un pool de hilos
+
+    Cada tipo de trabajo ('kind') tiene un handler registrado con
+    register(); el handler recibe (job_id, payload) y devuelve un dict
+    serializable como resultado. Si lanza una excepción, el trabajo
+    queda en estado 'error' con el mensaje. Los trabajos largos pueden ir
+    informando de su avance con set_progress().
+
+    Los tipos registrados con background=True (mantenimiento, como los
+    embeddings) tienen sus propios workers, así que nunca retrasan a los
+    que espera el usuario (mejoras con IA, exportaciones).
+
+    Args:
+        workers: Hilos para los trabajos que espera el usuario
+        background_workers: Hilos para los de mantenimiento
+        retention_days: Los trabajos terminados se borran pasado este tiempo
+    """
+
+    def __init__(self, db_path, workers=2, background_workers=1, retention_days=7):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.background_workers = background_workers
+        self.retention_days = retention_days
+
+        self._handlers = {}
+        self._background_kinds = set()
+        self._executor = None
+        self._background_executor = None
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    progress TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+            """)
+
+            # Bases creadas antes de que existiera el avance
+            columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+            if 'progress' not in columns:
+                self._conn.execute('ALTER TABLE jobs ADD COLUMN progress TEXT')
+
+    def register(self, kind, handler, background=False):
+        """Asocia un handler a un tipo de trabajo (background: en los workers de mantenimiento)"""
+        self._handlers[kind] = handler
+        if background:
+            self._background_kinds.add(kind)
+
+    def start(self):
+        """
+        Arranca los workers y reanuda los trabajos pendientes
+
+        Los que quedaron 'running' se cortaron al parar el servidor: vuelven
+        a 'pending'. Los terminados hace más de retention_days se borran.
+        Solo un proceso debe arrancar la cola de una base.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix='job-worker')
+        self._background_executor = ThreadPoolExecutor(max_workers=self.background_workers,
+                                                       thread_name_prefix='job-background')
+
+        with self._lock, self._conn:
+            pruned = self._conn.execute(
+                'DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?',
+                (DONE, ERROR, time.time() - self.retention_days * 86400)
+            ).rowcount
+            self._conn.execute('UPDATE jobs SET status = ? WHERE status = ?', (PENDING, RUNNING))
+            rows = self._conn.execute(
+                'SELECT id, kind FROM jobs WHERE status = ? ORDER BY created_at', (PENDING,)
+            ).fetchall()
+
+        if pruned:
+            log_event('jobs_pruned', f"🧹 Borrados {pruned} trabajo(s) terminado(s) antiguos", count=pruned)
+
+        if rows:
+            log_event('jobs_resumed', f"♻️  Reanudando {len(rows)} trabajo(s) pendiente(s)", count=len(rows))
+
+        for row in rows:
+            self._schedule(row['id'], row['kind'])
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """
+        Detiene los workers (con wait=True espera a los trabajos en curso)
+
+        Con cancel_pending los que aún no han empezado no se ejecutan; siguen
+        guardados como pendientes y se reanudan en el próximo arranque.
+        """
+        for executor in (self._executor, self._background_executor):
+            if executor is not None:
+                executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+        self._executor = None
+        self._background_executor = None
+
+    def submit(self, kind, payload, unique=False):
+        """
+        Encola un trabajo
+
+        Args:
+            unique: Si ya hay uno pendiente de este tipo no se encola otro
+                    (para trabajos que lo repasan todo, como los embeddings)
+
+        Returns:
+            Identificador del trabajo (con unique, el del pendiente si lo había)
+        """
+        if kind not in self._handlers:
+            raise ValueError(f'Tipo de trabajo desconocido: {kind}')
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+
+        with self._lock, self._conn:
+            if unique:
+                row = self._conn.execute(
+                    'SELECT id FROM jobs WHERE kind = ? AND status = ? LIMIT 1', (kind, PENDING)
+                ).fetchone()
+                if row is not None:
+                    return row['id']
+
+            self._conn.execute(
+                """
+                INSERT INTO jobs (id, kind, status, payload, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, kind, PENDING, json.dumps(payload), now, now)
+            )
+
+        self._schedule(job_id, kind)
+        return job_id
+
+    def _schedule(self, job_id, kind):
+        """Pasa el trabajo a sus workers (si la cola ya arrancó)"""
+        executor = self._background_executor if kind in self._background_kinds else self._executor
+        if executor is not None:
+            executor.submit(self._run, job_id)
+
+    def get(self, job_id):
+        """Estado de un trabajo (None si no existe)"""
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'progress': json.loads(row['progress']) if row['progress'] else None,
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at']
+        }
+
+    def counts(self):
+        """Trabajos por estado (p. ej. {'pending': 3, 'done': 10})"""
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+
+        return {status: count for status, count in rows}
+
+    def set_progress(self, job_id, **progress):
+        """Guarda el avance de un trabajo en curso (p. ej. done=3, total=10)"""
+        self._update(job_id, progress=json.dumps(progress))
+
+    def _update(self, job_id, **fields):
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f'{key} = ?' for key in fields)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                f'UPDATE jobs SET {assignments} WHERE id = ?',
+                (*fields.values(), job_id)
+            )
+
+    def _claim(self, job_id):
+        """
+        Pasa un trabajo de 'pending' a 'running' si nadie lo ha hecho antes
+
+        Returns:
+            Fila (kind, payload) del trabajo, o None si ya lo tomó otro
+            worker (o otro proceso con la misma base) o no existe
+        """
+        with self._lock, self._conn:
+            claimed = self._conn.execute(
+                'UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?',
+                (RUNNING, time.time(), job_id, PENDING)
+            ).rowcount
+            if not claimed:
+                return None
+
+            return self._conn.execute(
+                'SELECT kind, payload FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+
+    def _run(self, job_id):
+        """Ejecuta un trabajo en un hilo del pool"""
+        row = self._claim(job_id)
+        if row is None:
+            return
+
+        handler = self._handlers.get(row['kind'])
+        if handler is None:
+            self._update(job_id, status=ERROR, error=f"Sin handler para '{row['kind']}'")
+            return
+
+        start = time.perf_counter()
+
+        try:
+            result = handler(job_id, json.loads(row['payload']))
+            self._update(job_id, status=DONE, result=json.dumps(result or {}))
+            JOB_SECONDS.observe(time.perf_counter() - start, kind=row['kind'], status=DONE)
+        except Exception as e:
+            JOB_SECONDS.observe(time.perf_counter() - start, kind=row['kind'], status=ERROR)
+            log_event('job_error', f"❌ Error en trabajo {row['kind']} ({job_id[:8]}): {e}",
+                      level=logging.ERROR, exc_info=True, kind=row['kind'], job_id=job_id, error=str(e))
+            self._update(job_id, status=ERROR, error=str(e))
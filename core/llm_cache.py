@@ -0,0 +1,201 @@
+"""
+Caché persistente de respuestas del LLM
+Evita repetir generaciones idénticas (reintentos, doble click, la misma
+pregunta al asistente) guardando las respuestas en SQLite
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class LLMCache:
+    """
+    Caché direccionada por contenido con expulsión LRU y caducidad (TTL)
+
+    La clave es un hash de (modelo, prompt, opciones de muestreo). Cada
+    entrada puede llevar una etiqueta ('tag'): si al leerla la etiqueta no
+    coincide con la actual, se considera obsoleta y se descarta. El
+    asistente usa como etiqueta la generación del índice, de modo que sus
+    respuestas se invalidan solas cuando cambia el diario.
+
+    Args:
+        db_path: Archivo SQLite
+        max_entries: Número máximo de respuestas guardadas
+        max_bytes: Tamaño máximo total de las respuestas
+        ttl: Segundos que una respuesta sigue siendo válida
+    """
+
+    def __init__(self, db_path, max_entries=1000, max_bytes=50 * 1024 * 1024, ttl=7 * 24 * 3600):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.RLock()
+        self._in_flight = {}  # clave -> threading.Event de quien la está generando
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    tag TEXT,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_llm_cache_access
+                    ON llm_cache (last_access);
+                CREATE INDEX IF NOT EXISTS idx_llm_cache_created
+                    ON llm_cache (created_at);
+            """)
+
+    @staticmethod
+    def make_key(model, prompt, options=None):
+        """Hash estable de (modelo, prompt, opciones)"""
+        material = json.dumps(
+            {'model': model, 'prompt': prompt, 'options': options or {}},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def get(self, key, tag=None):
+        """
+        Devuelve la respuesta guardada o None
+
+        Las entradas caducadas o con otra etiqueta cuentan como fallo y se
+        borran en el momento.
+        """
+        now = time.time()
+        tag = None if tag is None else str(tag)
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, tag, created_at FROM llm_cache WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            if now - row['created_at'] > self.ttl or row['tag'] != tag:
+                with self._conn:
+                    self._conn.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+                self.misses += 1
+                return None
+
+            with self._conn:
+                self._conn.execute(
+                    'UPDATE llm_cache SET last_access = ? WHERE key = ?', (now, key)
+                )
+            self.hits += 1
+
+        return row['value']
+
+    def put(self, key, value, tag=None):
+        """Guarda una respuesta y expulsa lo necesario para respetar los límites"""
+        now = time.time()
+        size = len(value.encode('utf-8'))
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_cache (key, value, tag, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (key, value, None if tag is None else str(tag), size, now, now)
+            )
+            self._evict(now)
+
+    def get_or_compute(self, key, compute, tag=None):
+        """
+        Devuelve la respuesta cacheada o la calcula con compute()
+
+        Si otra petición idéntica ya se está generando, espera a que
+        termine y reutiliza su resultado en lugar de lanzar otra
+        generación. compute() puede devolver None para no cachear.
+        """
+        tag = None if tag is None else str(tag)
+
+        while True:
+            value = self.get(key, tag)
+            if value is not None:
+                return value
+
+            with self._lock:
+                event = self._in_flight.get(key)
+                if event is None:
+                    event = self._in_flight[key] = threading.Event()
+                    owner = True
+                else:
+                    owner = False
+
+            if not owner:
+                event.wait()
+                # Si la otra generación falló, se vuelve a intentar aquí
+                value = self.get(key, tag)
+                if value is not None:
+                    return value
+                continue
+
+            try:
+                value = compute()
+                if value:
+                    self.put(key, value, tag)
+                return value
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                event.set()
+
+    def _evict(self, now):
+        """Borra caducadas y, si hace falta, las menos usadas (requiere el lock)"""
+        self._conn.execute('DELETE FROM llm_cache WHERE created_at < ?', (now - self.ttl,))
+
+        count, total = self._conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache'
+        ).fetchone()
+
+        while count > self.max_entries or total > self.max_bytes:
+            row = self._conn.execute(
+                'SELECT key, size FROM llm_cache ORDER BY last_access LIMIT 1'
+            ).fetchone()
+            if row is None:
+                break
+
+            self._conn.execute('DELETE FROM llm_cache WHERE key = ?', (row['key'],))
+            count -= 1
+            total -= row['size']
+            self.evictions += 1
+
+    def stats(self):
+        """Contadores de aciertos/fallos y ocupación"""
+        with self._lock:
+            count, total = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache'
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': count,
+            'bytes': total
+        }
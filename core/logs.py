@@ -0,0 +1,70 @@
+"""
+Logs estructurados
+Cada evento tiene un nombre ('entry_saved', 'ollama_retry'...), un mensaje
+legible y campos. En formato 'text' se ve como siempre (el mensaje con su
+emoji); en 'json' cada evento es una línea JSON con todos los campos,
+lista para un recolector de logs
+"""
+
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+
+LOGGER = logging.getLogger('diary')
+
+
+class JSONFormatter(logging.Formatter):
+    """Una línea JSON por evento: hora, nivel, evento, mensaje y campos"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'event': getattr(record, 'event', record.name),
+            'message': record.getMessage(),
+            **getattr(record, 'fields', {})
+        }
+
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def configure_logging(log_format='text', level='INFO'):
+    """
+    Configura la salida de los eventos (por stdout, como los print de antes)
+
+    Args:
+        log_format: 'text' (solo el mensaje) o 'json'
+        level: Nivel mínimo ('DEBUG' incluye una línea por petición HTTP)
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    if log_format == 'json':
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(message)s'))
+
+    LOGGER.handlers[:] = [handler]
+    LOGGER.setLevel(level)
+    LOGGER.propagate = False
+
+
+def log_event(event, message, level=logging.INFO, exc_info=False, **fields):
+    """
+    Registra un evento
+
+    Args:
+        event: Nombre estable del evento (para filtrar y agregar)
+        message: Texto para humanos
+        exc_info: True dentro de un 'except' para incluir la traza
+        **fields: Datos del evento (solo aparecen en formato json)
+    """
+    LOGGER.log(level, message, exc_info=exc_info, extra={'event': event, 'fields': fields})
+
+
+# Hasta que la app elija formato, los eventos se ven como texto
+if not LOGGER.handlers:
+    configure_logging()
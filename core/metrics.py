@@ -0,0 +1,219 @@
+"""
+Métricas de la app en formato de texto de Prometheus
+Contadores, gauges e histogramas con etiquetas, en memoria del proceso.
+Cada módulo declara las suyas sobre el registro compartido METRICS y
+/api/metrics las publica todas
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Buckets por defecto (segundos): de peticiones rápidas a generaciones largas
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _escape_help(text):
+    return str(text).replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base de las métricas: nombre, ayuda, etiquetas y un valor por combinación"""
+
+    TYPE = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+        # Sin etiquetas hay una sola serie: se publica desde el principio (a 0)
+        if not self.label_names:
+            self._values[()] = self._initial_value()
+
+    def _initial_value(self):
+        return 0
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f'{self.name} espera las etiquetas {self.label_names}, no {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {_escape_help(self.documentation)}', f'# TYPE {self.name} {self.TYPE}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines += self._render_sample(key, value)
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    """Valor que solo crece (peticiones, tokens, segundos de audio...)"""
+
+    TYPE = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value, **labels):
+        """Copia un total que cuenta otro objeto (p. ej. los aciertos de una caché)"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """Valor que sube y baja (peticiones en curso, tamaño de una caché...)"""
+
+    TYPE = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """
+    Distribución de observaciones en buckets acumulativos
+
+    Args:
+        buckets: Límites superiores, de menor a mayor (+Inf se añade solo)
+    """
+
+    TYPE = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labels)
+
+    def _initial_value(self):
+        # [conteo por bucket..., suma]
+        return [0] * len(self.buckets) + [0.0]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = self._initial_value()
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observa la duración del bloque 'with' en segundos"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_sample(self, key, series):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, series):
+            cumulative += count
+            labels = _format_labels(self.label_names, key, [('le', _format_value(bound))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+
+        labels = _format_labels(self.label_names, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(series[-1])}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """
+    Conjunto de métricas que se publican juntas
+
+    Además de las métricas que se actualizan al vuelo admite "collectors":
+    funciones que se llaman al generar el texto y fijan gauges con el
+    estado del momento (tamaño de las cachés, trabajos pendientes...).
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Reimportar un módulo no debe duplicar ni perder la métrica
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f'Métrica {metric.name} ya registrada con otra definición')
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def collector(self, function):
+        """Registra una función sin argumentos que se ejecuta antes de cada render()"""
+        with self._lock:
+            self._collectors.append(function)
+        return function
+
+    def render(self):
+        """Todas las métricas en formato de texto de Prometheus"""
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+
+        for function in collectors:
+            function()
+
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+# Registro compartido por toda la app
+METRICS = Registry()
@@ -0,0 +1,295 @@
+"""
+Cliente compartido de Ollama
+Reutiliza conexiones HTTP, limita cuántas generaciones se lanzan a la vez
+contra el Ollama local y reintenta los fallos transitorios
+"""
+
+import json
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.logs import log_event
+from core.metrics import METRICS
+
+
+OLLAMA_SECONDS = METRICS.histogram(
+    'diary_ollama_request_seconds', 'Duración de las llamadas a Ollama (incluida la espera de hueco)',
+    ['operation', 'outcome']
+)
+OLLAMA_QUEUE_SECONDS = METRICS.histogram(
+    'diary_ollama_queue_seconds', 'Espera por un hueco de generación libre', ['operation']
+)
+OLLAMA_TOKENS = METRICS.counter(
+    'diary_ollama_tokens_total', 'Tokens procesados por Ollama (prompt = entrada, eval = generados)',
+    ['operation', 'kind']
+)
+OLLAMA_RETRIES = METRICS.counter('diary_ollama_retries_total', 'Reintentos de llamadas a Ollama')
+
+
+class OllamaError(Exception):
+    """Error al generar con Ollama (tras agotar los reintentos)"""
+
+
+class OllamaBusyError(OllamaError):
+    """No hubo hueco libre para generar dentro del tiempo de espera"""
+
+
+class OllamaClient:
+    """
+    Cliente HTTP de Ollama con pool de conexiones keep-alive
+
+    Args:
+        base_url: URL base del servidor (p. ej. http://localhost:11434)
+        max_in_flight: Generaciones simultáneas como máximo
+        max_retries: Reintentos ante errores de conexión o HTTP 5xx
+        backoff: Segundos de espera antes del primer reintento (se duplica)
+        queue_timeout: Segundos máximos esperando un hueco libre
+    """
+
+    def __init__(self, base_url, max_in_flight=2, max_retries=2, backoff=1.0,
+                 queue_timeout=300):
+        self.base_url = base_url.rstrip('/')
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.queue_timeout = queue_timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(max_in_flight * 2, 4))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+
+    # ==================== GENERACIÓN ====================
+
+    def generate(self, model, prompt, options=None, timeout=120):
+        """
+        Genera una respuesta completa (sin streaming)
+
+        Returns:
+            Dict {'text': respuesta, 'stats': estadísticas de la llamada}
+
+        Raises:
+            OllamaError: Si la generación falla tras los reintentos
+        """
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": False,
+            "options": options or {}
+        }
+
+        start = time.perf_counter()
+        try:
+            with self._slot() as queue_time:
+                resp, attempts = self._post('/api/generate', payload, timeout)
+                result = self._json(resp)
+        except OllamaError:
+            OLLAMA_SECONDS.observe(time.perf_counter() - start, operation='generate', outcome='error')
+            raise
+
+        stats = self.build_stats(result, start, queue_time, attempts)
+        self.record_stats('generate', stats)
+        return {'text': result.get('response', '').strip(), 'stats': stats}
+
+    def stream_generate(self, model, prompt, options=None, timeout=(10, 180), on_stats=None):
+        """
+        Genera una respuesta token a token
+
+        Solo se reintenta antes de recibir el primer token. Al cerrar el
+        generador se corta la conexión y Ollama deja de generar.
+
+        Args:
+            on_stats: Callback opcional que recibe las estadísticas al terminar
+
+        Yields:
+            Fragmentos de texto según llegan
+        """
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": True,
+            "options": options or {}
+        }
+
+        start = time.perf_counter()
+        outcome = 'cancelled'  # el cliente cerró el generador antes de terminar
+        try:
+            with self._slot() as queue_time:
+                resp, attempts = self._post('/api/generate', payload, timeout, stream=True)
+
+                with resp:
+                    for line in self._iter_lines(resp):
+                        if not line:
+                            continue
+
+                        try:
+                            chunk = json.loads(line)
+                        except ValueError as e:
+                            raise OllamaError(f"Respuesta de Ollama no válida: {e}")
+
+                        if chunk.get('error'):
+                            raise OllamaError(chunk['error'])
+
+                        token = chunk.get('response', '')
+                        if token:
+                            yield token
+
+                        if chunk.get('done'):
+                            stats = self.build_stats(chunk, start, queue_time, attempts)
+                            self.record_stats('stream', stats)
+                            outcome = None
+                            if on_stats is not None:
+                                on_stats(stats)
+                            break
+        except OllamaError:
+            outcome = 'error'
+            raise
+        finally:
+            if outcome is not None:
+                OLLAMA_SECONDS.observe(time.perf_counter() - start, operation='stream', outcome=outcome)
+
+    @staticmethod
+    def _iter_lines(resp):
+        """Líneas de una respuesta en streaming; un corte a medias es un OllamaError"""
+        try:
+            yield from resp.iter_lines()
+        except requests.RequestException as e:
+            # ChunkedEncodingError, ConnectionError o timeout de lectura tras el primer token
+            raise OllamaError(f"Conexión con Ollama cortada durante la generación: {e}") from e
+
+    def embed(self, model, text, timeout=60):
+        """
+        Calcula el embedding de un texto
+
+        Ocupa un hueco como las generaciones: Ollama atiende las dos cosas
+        con el mismo límite de peticiones en paralelo.
+
+        Returns:
+            Lista de floats
+
+        Raises:
+            OllamaError: Si falla tras los reintentos o no hay embedding
+        """
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            with self._slot():
+                resp, _attempts = self._post('/api/embeddings', {"model": model, "prompt": text}, timeout)
+                embedding = self._json(resp).get('embedding')
+
+            if not embedding:
+                raise OllamaError(f"El modelo {model} no devolvió embedding")
+            outcome = 'ok'
+        finally:
+            OLLAMA_SECONDS.observe(time.perf_counter() - start, operation='embed', outcome=outcome)
+
+        return embedding
+
+    # ==================== INTERNOS ====================
+
+    def _slot(self):
+        """Context manager que reserva un hueco de generación"""
+        return _GenerationSlot(self._slots, self.queue_timeout)
+
+    @staticmethod
+    def _json(resp):
+        """Cuerpo JSON de una respuesta (OllamaError si no lo es)"""
+        try:
+            result = resp.json()
+        except ValueError as e:
+            raise OllamaError(f"Respuesta de Ollama no válida: {e}")
+        if not isinstance(result, dict):
+            raise OllamaError("Respuesta de Ollama no válida")
+        return result
+
+    def _post(self, path, payload, timeout, stream=False):
+        """
+        POST con reintentos y backoff exponencial
+
+        Returns:
+            (respuesta con status 200, número de intentos)
+        """
+        url = self.base_url + path
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = self.backoff * (2 ** (attempt - 1))
+                OLLAMA_RETRIES.inc()
+                log_event('ollama_retry',
+                          f"🔁 Reintentando Ollama en {delay:.1f}s ({attempt}/{self.max_retries}): {last_error}",
+                          level=logging.WARNING, attempt=attempt, delay=delay, error=str(last_error))
+                time.sleep(delay)
+
+            try:
+                resp = self.session.post(url, json=payload, timeout=timeout, stream=stream)
+            except requests.ConnectionError as e:
+                # Incluye ConnectTimeout: la petición no llegó a Ollama
+                last_error = e
+                continue
+            except requests.Timeout as e:
+                # Lectura agotada: reintentar repetiría una generación larga
+                raise OllamaError(f"Ollama no respondió a tiempo: {e}")
+
+            if resp.status_code >= 500:
+                last_error = f"HTTP {resp.status_code}"
+                resp.close()
+                continue
+
+            if resp.status_code != 200:
+                resp.close()
+                raise OllamaError(f"HTTP {resp.status_code}")
+
+            return resp, attempt + 1
+
+        raise OllamaError(f"Ollama no responde tras {self.max_retries + 1} intentos: {last_error}")
+
+    @staticmethod
+    def record_stats(operation, stats):
+        """Pasa las estadísticas de una generación terminada a las métricas"""
+        OLLAMA_SECONDS.observe(stats['wall_seconds'], operation=operation, outcome='ok')
+        OLLAMA_QUEUE_SECONDS.observe(stats['queue_seconds'], operation=operation)
+        OLLAMA_TOKENS.inc(stats['prompt_tokens'], operation=operation, kind='prompt')
+        OLLAMA_TOKENS.inc(stats['eval_tokens'], operation=operation, kind='eval')
+
+    @staticmethod
+    def build_stats(result, start, queue_time, attempts):
+        """Estadísticas de una llamada a partir de los campos de Ollama"""
+        eval_count = result.get('eval_count', 0)
+        eval_duration = result.get('eval_duration', 0)  # nanosegundos
+
+        return {
+            'prompt_tokens': result.get('prompt_eval_count', 0),
+            'eval_tokens': eval_count,
+            'prompt_eval_seconds': result.get('prompt_eval_duration', 0) / 1e9,
+            'eval_seconds': eval_duration / 1e9,
+            'load_seconds': result.get('load_duration', 0) / 1e9,
+            'tokens_per_second': round(eval_count / (eval_duration / 1e9), 2) if eval_duration else 0.0,
+            'queue_seconds': round(queue_time, 3),
+            'wall_seconds': round(time.perf_counter() - start, 3),
+            'attempts': attempts
+        }
+
+
+class _GenerationSlot:
+    """Reserva un hueco del semáforo y mide cuánto se esperó"""
+
+    def __init__(self, semaphore, timeout):
+        self.semaphore = semaphore
+        self.timeout = timeout
+
+    def __enter__(self):
+        start = time.perf_counter()
+        if not self.semaphore.acquire(timeout=self.timeout):
+            raise OllamaBusyError('Ollama está ocupado; inténtalo de nuevo en un momento')
+        return time.perf_counter() - start
+
+    def __exit__(self, *exc_info):
+        self.semaphore.release()
+        return False
@@ -0,0 +1,171 @@
+"""
+Pool de procesos compartido
+Procesos para el trabajo de CPU que se puede repartir (decodificar
+grabaciones largas con Vosk, preparar las entradas de las ramas largas
+en PDF)
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from core.logs import log_event
+
+
+class PoolUnavailable(Exception):
+    """No hay pool (desactivado, sin arrancar o se acaba de romper): se trabaja en serie"""
+
+
+def _ready():
+    return True
+
+
+def start_method():
+    """
+    'fork' si solo existe el hilo principal; si no, 'forkserver' (un fork
+    con otros hilos copia sus locks cogidos y el hijo puede bloquearse).
+    None si la plataforma no tiene ninguno de los dos (Windows)
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if 'fork' in methods and threading.active_count() == 1:
+        return 'fork'
+    if 'forkserver' in methods:
+        return 'forkserver'
+    return None
+
+
+class ProcessPool:
+    """
+    Procesos de trabajo que se crean en start() y se recrean al siguiente
+    uso si uno muere o se agota el tiempo
+
+    Args:
+        processes: Número de procesos (1 = sin pool, todo en serie)
+        preload: Módulos que el servidor de forkserver importa una sola vez
+    """
+
+    def __init__(self, processes=2, preload=()):
+        self.processes = processes
+        self.preload = list(preload)
+        self.start_method = None
+        self.failures = 0
+        self.last_error = None
+        self._enabled = False
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        """Si el pool está arrancado (si se rompió, se recrea al usarlo)"""
+        return self._enabled
+
+    def start(self):
+        """
+        Crea los procesos (solo la primera vez)
+
+        Returns:
+            True si el pool quedó disponible
+        """
+        with self._lock:
+            if self._enabled:
+                return True
+
+            if self.processes <= 1:
+                return False
+
+            if self._create() is None:
+                log_event('process_pool_skipped', "⚠️ Sin fork ni forkserver: las tareas largas se harán en serie",
+                          level=logging.WARNING)
+                return False
+
+            self._enabled = True
+
+        log_event('process_pool_started', f"⚙️  {self.processes} procesos de trabajo listos ({self.start_method})",
+                  processes=self.processes, start_method=self.start_method)
+        return True
+
+    def map(self, function, *iterables, timeout=None, chunksize=1):
+        """
+        Como Executor.map, pero devuelve la lista completa
+
+        Raises:
+            PoolUnavailable: Sin pool, o un proceso murió o se agotó el
+                             tiempo (los procesos se recrean en el próximo uso)
+        """
+        with self._lock:
+            if not self._enabled:
+                raise PoolUnavailable('Sin procesos de trabajo')
+
+            executor = self._executor
+            if executor is None:
+                executor = self._create()
+                if executor is None:
+                    raise PoolUnavailable('Sin procesos de trabajo')
+                log_event('process_pool_restarted', f"⚙️  Procesos de trabajo recreados ({self.start_method})",
+                          start_method=self.start_method, failures=self.failures)
+
+        try:
+            return list(executor.map(function, *iterables, timeout=timeout, chunksize=chunksize))
+        except (BrokenProcessPool, FuturesTimeoutError) as e:
+            reason = 'se agotó el tiempo' if isinstance(e, FuturesTimeoutError) else f'un proceso murió ({e})'
+            log_event('process_pool_broken', f"⚠️ Procesos de trabajo perdidos: {reason}; "
+                      "se recrearán en el próximo uso", level=logging.WARNING,
+                      error=str(e) or type(e).__name__)
+            with self._lock:
+                if self._executor is executor:
+                    self._shutdown(kill=True)
+                    self.failures += 1
+                    self.last_error = reason
+            raise PoolUnavailable(reason) from e
+
+    def status(self):
+        """Estado del pool (para los endpoints de estado)"""
+        return {
+            'enabled': self._enabled,
+            'processes': self.processes,
+            'start_method': self.start_method,
+            'running': self._executor is not None,
+            'failures': self.failures,
+            'last_error': self.last_error
+        }
+
+    def shutdown(self):
+        """Detiene los procesos (no se vuelven a crear)"""
+        with self._lock:
+            self._enabled = False
+            self._shutdown()
+
+    def _create(self):
+        """Crea el executor con el método de arranque seguro ahora mismo (requiere el lock)"""
+        method = start_method()
+        if method is None:
+            return None
+
+        context = multiprocessing.get_context(method)
+        if method == 'forkserver' and self.preload:
+            context.set_forkserver_preload(self.preload)
+
+        executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=context)
+        if method == 'fork':
+            # Con fork todos los procesos se crean en el primer submit, antes
+            # de que el executor arranque sus propios hilos
+            executor.submit(_ready).result()
+        else:
+            # Con forkserver se crean bajo demanda: se piden todos ya, sin esperar
+            for _ in range(self.processes):
+                executor.submit(_ready)
+
+        self._executor = executor
+        self.start_method = method
+        return executor
+
+    def _shutdown(self, kill=False):
+        if self._executor is not None:
+            if kill:
+                # Un proceso colgado no atiende a shutdown(): se termina a la fuerza
+                for process in list((self._executor._processes or {}).values()):
+                    process.terminate()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
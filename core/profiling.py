@@ -0,0 +1,195 @@
+"""
+Perfilado de peticiones concretas
+Envuelve una petición en cProfile y, además, anota cuánto dura cada fase
+(leer el diario, montar el prompt, Ollama, ReportLab...) con phase().
+El resultado se guarda en disco: <id>.prof (para pstats o snakeviz) y
+<id>.json con el desglose por fases y las funciones más costosas
+"""
+
+import cProfile
+import json
+import logging
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from core.logs import log_event
+
+
+PROFILE_ID_PATTERN = re.compile(r'^[\w-]+$')
+TOP_FUNCTIONS = 30
+
+# Perfil de la petición que atiende cada hilo (None si no se perfila)
+_current = threading.local()
+
+
+class RequestProfile:
+    """
+    Tiempos por fase de una petición perfilada
+
+    Las fases se pueden anidar; la anidada se guarda como 'padre/hija'
+    y su tiempo también cuenta en la del padre.
+    """
+
+    def __init__(self, profile_id, name, info=None):
+        self.id = profile_id
+        self.name = name
+        self.info = info or {}
+        self.phases = {}
+        self._stack = []
+
+    def add(self, name, seconds):
+        phase = self.phases.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        phase['seconds'] += seconds
+        phase['calls'] += 1
+
+    def breakdown(self, total):
+        """Segundos y llamadas por fase, más lo que no cae en ninguna ('other')"""
+        phases = {name: {'seconds': round(data['seconds'], 4), 'calls': data['calls']}
+                  for name, data in self.phases.items()}
+        top_level = sum(data['seconds'] for name, data in self.phases.items() if '/' not in name)
+        phases['other'] = {'seconds': round(max(total - top_level, 0.0), 4), 'calls': 1}
+        return phases
+
+
+@contextmanager
+def phase(name):
+    """
+    Anota la duración del bloque en el perfil de la petición en curso
+
+    Sin perfil activo no hace nada, así que se puede dejar en el código
+    que atiende todas las peticiones.
+    """
+    profile = getattr(_current, 'profile', None)
+    if profile is None:
+        yield
+        return
+
+    full_name = '/'.join(profile._stack + [name])
+    profile._stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile._stack.pop()
+        profile.add(full_name, time.perf_counter() - start)
+
+
+def _top_functions(profiler, limit=TOP_FUNCTIONS):
+    """Las funciones con más tiempo acumulado, como lista de dicts"""
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+
+    return [{
+        'function': f'{Path(filename).name}:{line}({function})' if line else function,
+        'calls': calls,
+        'own_seconds': round(own, 4),
+        'cumulative_seconds': round(cumulative, 4)
+    } for (filename, line, function), (_primitive, calls, own, cumulative, _callers) in rows]
+
+
+class Profiler:
+    """
+    Perfila peticiones y guarda los resultados en 'directory'
+
+    Solo se perfila una petición a la vez: cProfile mide el hilo que lo
+    activa y dos perfiles a la vez se estorbarían. Si ya hay uno en curso
+    la petición se atiende sin perfilar.
+
+    Args:
+        directory: Carpeta de los perfiles
+        max_profiles: Perfiles guardados como máximo (se borran los más antiguos)
+    """
+
+    def __init__(self, directory, max_profiles=50):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def profile(self, name, **info):
+        """
+        Perfila el bloque 'with' y guarda el resultado al salir
+
+        Yields:
+            RequestProfile (su 'id' identifica el perfil) o None si ya
+            se está perfilando otra petición
+        """
+        if not self._lock.acquire(blocking=False):
+            yield None
+            return
+
+        try:
+            profile = RequestProfile(self._new_id(name), name, info)
+            profiler = cProfile.Profile()
+            _current.profile = profile
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                yield profile
+            finally:
+                profiler.disable()
+                total = time.perf_counter() - start
+                _current.profile = None
+                self._save(profile, profiler, total)
+        finally:
+            self._lock.release()
+
+    def _new_id(self, name):
+        slug = re.sub(r'\W+', '-', name).strip('-') or 'request'
+        return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{slug}_{uuid.uuid4().hex[:6]}"
+
+    def _save(self, profile, profiler, total):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(self.directory / f'{profile.id}.prof'))
+
+            summary = {
+                'id': profile.id,
+                'name': profile.name,
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'total_seconds': round(total, 4),
+                **profile.info,
+                'phases': profile.breakdown(total),
+                'top_functions': _top_functions(profiler)
+            }
+            with open(self.directory / f'{profile.id}.json', 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2, ensure_ascii=False)
+
+            log_event('profile_saved', f"🔬 Perfil guardado: {profile.id} ({total * 1000:.0f} ms)",
+                      profile_id=profile.id, seconds=round(total, 3))
+            self._prune()
+        except OSError as e:
+            log_event('profile_error', f"⚠️ No se pudo guardar el perfil {profile.id}: {e}",
+                      level=logging.WARNING, profile_id=profile.id, error=str(e))
+
+    def _prune(self):
+        summaries = sorted(self.directory.glob('*.json'), key=lambda path: path.stat().st_mtime)
+        for path in summaries[:max(len(summaries) - self.max_profiles, 0)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix('.prof').unlink(missing_ok=True)
+
+    def list(self):
+        """Resumen de los perfiles guardados (id, petición, duración), del más reciente al más antiguo"""
+        profiles = []
+        for path in sorted(self.directory.glob('*.json'), reverse=True):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            profiles.append({key: value for key, value in data.items()
+                             if key not in ('phases', 'top_functions')})
+        return profiles
+
+    def path(self, profile_id, suffix):
+        """Ruta de un perfil guardado ('.json' o '.prof') o None si no existe"""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = self.directory / f'{profile_id}{suffix}'
+        return path if path.exists() else None
@@ -0,0 +1,261 @@
+"""
+Índice invertido con ranking BM25 para el asistente
+Usa la misma tokenización que extract_keywords, así que preguntas y
+documentos se comparan término a término
+"""
+
+import math
+import re
+from collections import Counter
+
+
+STOP_WORDS = {'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'ser', 'se', 'no', 'haber',
+              'por', 'con', 'su', 'para', 'como', 'estar', 'tener', 'le', 'lo', 'todo',
+              'pero', 'más', 'hacer', 'o', 'poder', 'decir', 'este', 'ir', 'otro', 'ese',
+              'si', 'me', 'ya', 'ver', 'porque', 'dar', 'cuando', 'él', 'muy', 'sin',
+              'vez', 'mucho', 'saber', 'qué', 'sobre', 'mi', 'alguno', 'mismo', 'yo',
+              'también', 'hasta', 'año', 'dos', 'querer', 'entre', 'así', 'primero',
+              'desde', 'grande', 'eso', 'ni', 'nos', 'llegar', 'pasar', 'tiempo', 'ella',
+              'tengo', 'he', 'ha', 'sido', 'cómo', 'hay', 'puedo', 'puede', 'los', 'las',
+              'una', 'unos', 'unas', 'del'}
+
+# Palabras clave de errores comunes
+ERROR_KEYWORDS = ['error', 'bug', 'fallo', 'problema', 'excepción', 'exception',
+                  'crash', 'no funciona', 'roto', 'broken']
+
+# Letras y dígitos: el markdown (**negrita**, `código`, _cursiva_, #etiqueta),
+# las rutas y los nombres_con_guiones no pegan símbolos a las palabras
+WORD_PATTERN = re.compile(r'[^\W_]+')
+
+# Parámetros BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Bonificaciones (en las mismas unidades que la puntuación BM25)
+PROJECT_BOOST = 3.0
+ERROR_BOOST = 1.5
+
+
+def extract_keywords(text):
+    """Extrae palabras clave de una pregunta o un documento (misma regla para ambos)"""
+    return [word for word in WORD_PATTERN.findall(text.lower())
+            if len(word) > 3 and word not in STOP_WORDS]
+
+
+def casefold_collation(a, b):
+    """Compara sin distinguir mayúsculas en cualquier alfabeto (NOCASE solo pliega ASCII)"""
+    a, b = a.casefold(), b.casefold()
+    return (a > b) - (a < b)
+
+
+def register_collations(conn):
+    """Registra la colación CASEFOLD en una conexión (la usan los índices y consultas)"""
+    conn.create_collation('CASEFOLD', casefold_collation)
+
+
+def is_error_text(content_lower):
+    """Indica si un texto (ya en minúsculas) habla de errores"""
+    return any(err in content_lower for err in ERROR_KEYWORDS)
+
+
+class SearchIndex:
+    """
+    Índice invertido término → (entrada, frecuencia) sobre SQLite
+
+    Comparte conexión y lock con EntryIndex; los identificadores de
+    documento son los id de la tabla entries.
+    """
+
+    def __init__(self, conn, lock):
+        self._conn = conn
+        self._lock = lock
+        register_collations(conn)
+        self.setup_schema()
+
+    def setup_schema(self):
+        """Crea las tablas del índice invertido si no existen"""
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    entry_id INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, entry_id)
+                ) WITHOUT ROWID;
+
+                CREATE INDEX IF NOT EXISTS idx_postings_entry
+                    ON postings (entry_id);
+
+                CREATE TABLE IF NOT EXISTS documents (
+                    entry_id INTEGER PRIMARY KEY,
+                    project TEXT NOT NULL,
+                    length INTEGER NOT NULL,
+                    is_error INTEGER NOT NULL DEFAULT 0
+                );
+
+                DROP INDEX IF EXISTS idx_documents_project;
+                CREATE INDEX IF NOT EXISTS idx_documents_project_casefold
+                    ON documents (project COLLATE CASEFOLD, is_error, entry_id);
+                CREATE INDEX IF NOT EXISTS idx_documents_error
+                    ON documents (is_error, entry_id);
+
+                CREATE TABLE IF NOT EXISTS search_stats (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    doc_count INTEGER NOT NULL,
+                    total_length INTEGER NOT NULL
+                );
+
+                INSERT OR IGNORE INTO search_stats (id, doc_count, total_length)
+                VALUES (0, 0, 0);
+            """)
+
+    # ==================== ESCRITURA (requieren el lock) ====================
+
+    def index_document(self, entry_id, project, content):
+        """Indexa (o reindexa) el contenido de una entrada"""
+        self.remove_document(entry_id)
+
+        content_lower = content.lower()
+        terms = Counter(extract_keywords(content_lower))
+        length = sum(terms.values())
+
+        self._conn.executemany(
+            'INSERT INTO postings (term, entry_id, tf) VALUES (?, ?, ?)',
+            ((term, entry_id, tf) for term, tf in terms.items())
+        )
+        self._conn.execute(
+            'INSERT INTO documents (entry_id, project, length, is_error) VALUES (?, ?, ?, ?)',
+            (entry_id, project, length, int(is_error_text(content_lower)))
+        )
+        self._conn.execute(
+            'UPDATE search_stats SET doc_count = doc_count + 1, total_length = total_length + ?',
+            (length,)
+        )
+
+    def remove_document(self, entry_id):
+        """Elimina una entrada del índice invertido (si estaba)"""
+        row = self._conn.execute(
+            'SELECT length FROM documents WHERE entry_id = ?', (entry_id,)
+        ).fetchone()
+
+        if row is None:
+            return
+
+        self._conn.execute('DELETE FROM postings WHERE entry_id = ?', (entry_id,))
+        self._conn.execute('DELETE FROM documents WHERE entry_id = ?', (entry_id,))
+        self._conn.execute(
+            'UPDATE search_stats SET doc_count = doc_count - 1, total_length = total_length - ?',
+            (row['length'],)
+        )
+
+    def clear(self):
+        """Vacía el índice invertido"""
+        self._conn.execute('DELETE FROM postings')
+        self._conn.execute('DELETE FROM documents')
+        self._conn.execute('UPDATE search_stats SET doc_count = 0, total_length = 0')
+
+    # ==================== CONSULTAS ====================
+
+    def document_count(self):
+        """Número de documentos indexados"""
+        with self._lock:
+            return self._conn.execute('SELECT doc_count FROM search_stats').fetchone()[0]
+
+    def search(self, keywords, project_filter=None, boost_errors=False, limit=5):
+        """
+        Ordena entradas por BM25 más las bonificaciones de proyecto y error
+
+        Args:
+            keywords: Términos de la consulta (salida de extract_keywords)
+            project_filter: Proyecto actual (recibe PROJECT_BOOST)
+            boost_errors: Si las entradas con errores reciben ERROR_BOOST
+            limit: Número máximo de resultados
+
+        Returns:
+            Lista de dicts {'entry_id', 'score', 'is_error'} de mayor a menor
+        """
+        project_key = project_filter.casefold() if project_filter else None
+        candidates = {}
+
+        def boosts(project, is_error):
+            score = 0.0
+            if project_key and project.casefold() == project_key:
+                score += PROJECT_BOOST
+            if is_error and boost_errors:
+                score += ERROR_BOOST
+            return score
+
+        with self._lock:
+            doc_count, total_length = self._conn.execute(
+                'SELECT doc_count, total_length FROM search_stats'
+            ).fetchone()
+
+            if doc_count == 0:
+                return []
+
+            avg_length = total_length / doc_count or 1.0
+
+            # Puntuación BM25: solo se recorren las listas de los términos
+            for term, query_tf in Counter(keywords).items():
+                postings = self._conn.execute(
+                    """
+                    SELECT p.entry_id, p.tf, d.length, d.project, d.is_error
+                    FROM postings p JOIN documents d ON d.entry_id = p.entry_id
+                    WHERE p.term = ?
+                    """,
+                    (term,)
+                ).fetchall()
+
+                if not postings:
+                    continue
+
+                df = len(postings)
+                idf = math.log((doc_count - df + 0.5) / (df + 0.5) + 1)
+
+                for row in postings:
+                    tf = row['tf']
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * row['length'] / avg_length)
+                    term_score = query_tf * idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+                    hit = candidates.get(row['entry_id'])
+                    if hit is None:
+                        hit = candidates[row['entry_id']] = {
+                            'entry_id': row['entry_id'],
+                            'score': boosts(row['project'], row['is_error']),
+                            'is_error': bool(row['is_error'])
+                        }
+                    hit['score'] += term_score
+
+            # Entradas que solo puntúan por bonificación (sin coincidencias)
+            extra_rows = []
+            if project_key:
+                extra_rows += self._conn.execute(
+                    """
+                    SELECT entry_id, project, is_error FROM documents
+                    WHERE project = ? COLLATE CASEFOLD
+                    ORDER BY is_error DESC, entry_id DESC LIMIT ?
+                    """,
+                    (project_filter, limit)
+                ).fetchall()
+            if boost_errors:
+                extra_rows += self._conn.execute(
+                    """
+                    SELECT entry_id, project, is_error FROM documents
+                    WHERE is_error = 1
+                    ORDER BY entry_id DESC LIMIT ?
+                    """,
+                    (limit,)
+                ).fetchall()
+
+        for row in extra_rows:
+            if row['entry_id'] not in candidates:
+                candidates[row['entry_id']] = {
+                    'entry_id': row['entry_id'],
+                    'score': boosts(row['project'], row['is_error']),
+                    'is_error': bool(row['is_error'])
+                }
+
+        results = [hit for hit in candidates.values() if hit['score'] > 0]
+        results.sort(key=lambda hit: (hit['score'], hit['entry_id']), reverse=True)
+
+        return results[:limit]
@@ -0,0 +1,195 @@
+"""
+Servidor de producción
+Sirve la app con waitress (o, si no está instalado, con el servidor
+multihilo de Werkzeug) y la detiene de forma ordenada: deja de aceptar
+peticiones, espera a las que están en curso y solo entonces para el bucle
+del servidor, para que ningún guardado ni transcripción se corte a medias
+"""
+
+import _thread
+import logging
+import signal
+import threading
+import time
+
+from werkzeug.wsgi import ClosingIterator
+
+from core.logs import log_event
+
+
+class RequestTracker:
+    """
+    Middleware WSGI que cuenta las peticiones en curso
+
+    Una respuesta cuenta hasta que el servidor la termina de enviar (cierra
+    su iterable), así que las respuestas en streaming también se esperan.
+    Durante el cierre las peticiones nuevas reciben un 503, salvo las que
+    'keep_open(environ)' deja pasar; 'pending()' cuenta el trabajo abierto
+    entre peticiones (p. ej. dictados a medias) que el cierre también espera.
+    """
+
+    # Cada cuánto se vuelve a mirar pending() mientras se vacía
+    PENDING_POLL_SECONDS = 0.25
+
+    def __init__(self, app, keep_open=None, pending=None):
+        self.app = app
+        self.keep_open = keep_open
+        self.pending = pending
+        self.in_flight = 0
+        self.draining = False
+        self._idle = threading.Condition()
+
+    def __call__(self, environ, start_response):
+        # keep_open() va fuera del lock: puede tardar (consulta otros registros)
+        allowed = not self.draining or (self.keep_open is not None and self.keep_open(environ))
+
+        with self._idle:
+            if self.draining and not allowed:
+                start_response('503 Service Unavailable', [
+                    ('Content-Type', 'text/plain; charset=utf-8'),
+                    ('Retry-After', '5'),
+                    ('Connection', 'close')
+                ])
+                return ['El servidor se está deteniendo'.encode('utf-8')]
+            self.in_flight += 1
+
+        try:
+            response = self.app(environ, start_response)
+        except BaseException:
+            self._finished()
+            raise
+
+        return ClosingIterator(response, self._finished)
+
+    def _finished(self):
+        with self._idle:
+            self.in_flight -= 1
+            if self.in_flight <= 0:
+                self._idle.notify_all()
+
+    def drain(self, timeout):
+        """
+        Rechaza las peticiones nuevas y espera a que acaben las que hay
+        (y el trabajo que cuente pending())
+
+        Returns:
+            Peticiones y trabajos que seguían en curso al agotarse el tiempo
+            (0 = todo terminó)
+        """
+        deadline = time.monotonic() + timeout
+
+        with self._idle:
+            self.draining = True
+            while True:
+                outstanding = self.in_flight + self._pending()
+                remaining = deadline - time.monotonic()
+                if outstanding <= 0 or remaining <= 0:
+                    return outstanding
+                if self.in_flight > 0:
+                    self._idle.wait(remaining)
+                else:
+                    # El trabajo pendiente no avisa al acabar: se vuelve a mirar
+                    self._idle.wait(min(remaining, self.PENDING_POLL_SECONDS))
+
+    def _pending(self):
+        return self.pending() if self.pending is not None else 0
+
+
+class GracefulServer:
+    """
+    Servidor WSGI multihilo con cierre ordenado
+
+    serve() bloquea el hilo principal hasta que se pide el cierre con
+    request_stop() (p. ej. desde /api/shutdown), Ctrl+C o SIGTERM. El
+    cierre se hace en un hilo aparte: vacía 'tracker' y después
+    interrumpe el bucle del servidor en el hilo principal. Un segundo
+    Ctrl+C durante la espera fuerza la salida.
+
+    Args:
+        app: Aplicación WSGI
+        tracker: RequestTracker que envuelve a la app
+        host, port: Dirección en la que escuchar
+        threads: Hilos que atienden peticiones
+        channel_timeout: Segundos que se mantiene abierta una conexión inactiva
+        drain_timeout: Espera máxima a las peticiones en curso al cerrar
+    """
+
+    def __init__(self, app, tracker, host='127.0.0.1', port=5000, threads=8,
+                 channel_timeout=120, drain_timeout=30):
+        self.app = app
+        self.tracker = tracker
+        self.host = host
+        self.port = port
+        self.threads = threads
+        self.channel_timeout = channel_timeout
+        self.drain_timeout = drain_timeout
+
+        self.backend = None
+        self._stopping = False
+        self._stopped = False
+        self._lock = threading.Lock()
+
+    def serve(self):
+        """Atiende peticiones hasta que se pida el cierre (llamar desde el hilo principal)"""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self._on_signal)
+            if hasattr(signal, 'SIGTERM'):
+                signal.signal(signal.SIGTERM, self._on_signal)
+
+        try:
+            import waitress
+        except ImportError:
+            waitress = None
+
+        try:
+            if waitress is not None:
+                self.backend = 'waitress'
+                log_event('server_listening', f"🍽️  waitress en http://{self.host}:{self.port} ({self.threads} hilos)",
+                          backend=self.backend, host=self.host, port=self.port, threads=self.threads)
+                waitress.serve(
+                    self.app,
+                    host=self.host,
+                    port=self.port,
+                    threads=self.threads,
+                    channel_timeout=self.channel_timeout
+                )
+            else:
+                from werkzeug.serving import make_server
+
+                self.backend = 'werkzeug'
+                log_event('server_listening', f"🧪 waitress no está instalado; servidor multihilo de Werkzeug "
+                          f"en http://{self.host}:{self.port}",
+                          backend=self.backend, host=self.host, port=self.port)
+                make_server(self.host, self.port, self.app, threaded=True).serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+    def request_stop(self):
+        """Pide el cierre ordenado (se puede llamar desde cualquier hilo)"""
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+
+        threading.Thread(target=self._stop, name='graceful-stop', daemon=True).start()
+
+    def _stop(self):
+        pending = self.tracker._pending()
+        log_event('server_draining', f"🛑 Deteniendo: esperando a {self.tracker.in_flight} petición(es) "
+                  f"y {pending} trabajo(s) en curso...", in_flight=self.tracker.in_flight, pending=pending)
+        pending = self.tracker.drain(self.drain_timeout)
+        if pending:
+            log_event('server_drain_timeout',
+                      f"⚠️ {pending} petición(es) o trabajo(s) sin terminar tras {self.drain_timeout}s; se cierran",
+                      level=logging.WARNING, pending=pending)
+
+        self._stopped = True
+        # Desde Python 3.10 esto llama a _on_signal, que con _stopped lanza
+        # el KeyboardInterrupt que saca al servidor de su bucle
+        _thread.interrupt_main()
+
+    def _on_signal(self, signum, frame):
+        if self._stopped or self._stopping:
+            # Ya drenado, o segundo Ctrl+C: salir ya
+            raise KeyboardInterrupt
+        self.request_stop()
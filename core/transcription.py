@@ -0,0 +1,458 @@
+"""
+Transcripción con Vosk
+Carga del modelo en segundo plano, pool de reconocedores reutilizables y
+decodificación en paralelo de las grabaciones largas.
+En el dictado en streaming el navegador envía el audio en trozos PCM
+mientras graba; cada trozo se pasa al reconocedor en cuanto llega y se
+devuelven los resultados parciales, de modo que al dejar de hablar la
+transcripción ya está hecha
+"""
+
+import json
+import threading
+import time
+import uuid
+
+from core.logs import log_event
+from core.process_pool import PoolUnavailable
+
+
+# Estados de la carga del modelo
+IDLE = 'idle'
+LOADING = 'loading'
+READY = 'ready'
+MISSING = 'missing'
+FAILED = 'error'
+
+
+class RecognizerBusyError(Exception):
+    """No quedó ningún reconocedor libre dentro del tiempo de espera"""
+
+
+class SessionClosedError(Exception):
+    """El dictado ya se cerró (terminado, cancelado o caducado)"""
+
+
+def capitalize_sentence(text):
+    """Pone en mayúscula la primera letra de una frase"""
+    text = text.strip()
+    return text[0].upper() + text[1:] if text else text
+
+
+def join_sentences(parts):
+    """Une las frases reconocidas con punto y asegura el punto final"""
+    if not parts:
+        return ''
+
+    text = '. '.join(parts)
+    if not text.endswith('.'):
+        text += '.'
+
+    return text
+
+
+def recognize_pcm(recognizer, data, chunk_bytes=16000):
+    """
+    Decodifica de una vez un bloque de PCM y vacía el reconocedor
+
+    Args:
+        recognizer: KaldiRecognizer (queda listo para otro bloque)
+        data: PCM de 16 bits mono a la frecuencia del reconocedor
+        chunk_bytes: Bytes por llamada a AcceptWaveform
+
+    Returns:
+        Lista de frases reconocidas, ya capitalizadas
+    """
+    sentences = []
+
+    for offset in range(0, len(data), chunk_bytes):
+        if recognizer.AcceptWaveform(data[offset:offset + chunk_bytes]):
+            text = capitalize_sentence(json.loads(recognizer.Result()).get('text', ''))
+            if text:
+                sentences.append(text)
+
+    text = capitalize_sentence(json.loads(recognizer.FinalResult()).get('text', ''))
+    if text:
+        sentences.append(text)
+
+    return sentences
+
+
+class TranscriptionSession:
+    """
+    Un dictado en curso: un KaldiRecognizer que recibe PCM poco a poco
+
+    Una vez cerrada (finish o close) no vuelve a tocar el reconocedor, así
+    que se puede devolver al pool aunque llegue otro trozo a la vez.
+
+    Args:
+        recognizer: KaldiRecognizer ya configurado para 'sample_rate'
+        sample_rate: Frecuencia del PCM (16 bits, mono, little-endian)
+    """
+
+    def __init__(self, recognizer, sample_rate):
+        self.recognizer = recognizer
+        self.sample_rate = sample_rate
+        self.parts = []
+        self.partial = ''
+        self.bytes_received = 0
+        self.decode_seconds = 0.0  # tiempo dentro del reconocedor (factor de tiempo real)
+        self.last_activity = time.monotonic()
+        self.closed = False
+
+        self._pending_byte = b''  # medio sample que quedó de un trozo impar
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self):
+        """Segundos de audio recibidos"""
+        return self.bytes_received / (2 * self.sample_rate)
+
+    def feed(self, data):
+        """
+        Pasa un trozo de PCM al reconocedor
+
+        Returns:
+            Dict {'final': frases cerradas con este trozo, 'partial': texto provisional}
+
+        Raises:
+            SessionClosedError: Si el dictado ya se cerró
+        """
+        with self._lock:
+            if self.closed:
+                raise SessionClosedError('Sesión de dictado cerrada')
+
+            self.last_activity = time.monotonic()
+            self.bytes_received += len(data)
+
+            data = self._pending_byte + data
+            if len(data) % 2:
+                data, self._pending_byte = data[:-1], data[-1:]
+            else:
+                self._pending_byte = b''
+
+            final = []
+            start = time.perf_counter()
+            if data and self.recognizer.AcceptWaveform(data):
+                text = capitalize_sentence(json.loads(self.recognizer.Result()).get('text', ''))
+                if text:
+                    self.parts.append(text)
+                    final.append(text)
+                self.partial = ''
+            elif data:
+                self.partial = json.loads(self.recognizer.PartialResult()).get('partial', '')
+            self.decode_seconds += time.perf_counter() - start
+
+            return {'final': final, 'partial': self.partial}
+
+    def finish(self):
+        """
+        Vacía el reconocedor, cierra la sesión y devuelve la transcripción completa
+
+        Raises:
+            SessionClosedError: Si el dictado ya se cerró
+        """
+        with self._lock:
+            if self.closed:
+                raise SessionClosedError('Sesión de dictado cerrada')
+
+            try:
+                start = time.perf_counter()
+                text = capitalize_sentence(json.loads(self.recognizer.FinalResult()).get('text', ''))
+                self.decode_seconds += time.perf_counter() - start
+            finally:
+                self.closed = True
+
+            if text:
+                self.parts.append(text)
+            self.partial = ''
+
+            return join_sentences(self.parts)
+
+    def close(self):
+        """
+        Cierra la sesión sin transcribir lo que quede (espera al trozo en curso)
+
+        Returns:
+            True si estaba abierta
+        """
+        with self._lock:
+            was_open = not self.closed
+            self.closed = True
+            return was_open
+
+
+class TranscriptionSessions:
+    """
+    Registro de dictados en curso
+
+    Las sesiones que llevan 'idle_timeout' segundos sin recibir audio
+    (pestaña cerrada, red caída) se descartan solas; 'on_expire' recibe
+    cada sesión descartada, ya cerrada, para poder devolver su reconocedor.
+    """
+
+    def __init__(self, idle_timeout=120, on_expire=None):
+        self.idle_timeout = idle_timeout
+        self.on_expire = on_expire
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, recognizer, sample_rate):
+        """
+        Abre una sesión
+
+        Returns:
+            Identificador de la sesión
+        """
+        session_id = uuid.uuid4().hex
+
+        self._expire()
+        with self._lock:
+            self._sessions[session_id] = TranscriptionSession(recognizer, sample_rate)
+
+        return session_id
+
+    def get(self, session_id):
+        """Sesión abierta (None si no existe o caducó)"""
+        self._expire()
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def close(self, session_id):
+        """Retira una sesión del registro y la devuelve (o None)"""
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        """Sesiones abiertas (sin contar las que ya caducaron)"""
+        self._expire()
+        with self._lock:
+            return len(self._sessions)
+
+    def _expire(self):
+        """Descarta las sesiones inactivas"""
+        now = time.monotonic()
+        with self._lock:
+            stale = [(session_id, session) for session_id, session in self._sessions.items()
+                     if now - session.last_activity > self.idle_timeout]
+            for session_id, _session in stale:
+                del self._sessions[session_id]
+
+        # Fuera del lock del registro: close() espera al trozo que se esté decodificando
+        for session_id, session in stale:
+            log_event('stream_expired', f"⌛ Sesión de dictado {session_id[:8]} descartada por inactividad",
+                      session_id=session_id)
+            if session.close() and self.on_expire is not None:
+                self.on_expire(session)
+
+
+class ModelLoader:
+    """
+    Carga un modelo pesado una sola vez en un hilo de fondo
+
+    Args:
+        load: Función que carga y devuelve el modelo, o None si no está
+              instalado; una excepción deja el estado en 'error'
+    """
+
+    def __init__(self, load):
+        self._load = load
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self.model = None
+        self.state = IDLE
+        self.error = None
+        self.load_seconds = None
+
+    def start(self):
+        """Lanza la carga en segundo plano (solo la primera vez)"""
+        with self._lock:
+            if self.state != IDLE:
+                return
+            self.state = LOADING
+
+        threading.Thread(target=self._run, name='model-loader', daemon=True).start()
+
+    def get(self, timeout=None):
+        """
+        Devuelve el modelo, esperando como mucho 'timeout' segundos
+
+        Returns:
+            El modelo, o None si no está disponible (todavía)
+        """
+        self.start()
+        self._ready.wait(timeout)
+        return self.model
+
+    def status(self):
+        """Estado de la carga"""
+        return {
+            'state': self.state,
+            'ready': self.state == READY,
+            'error': self.error,
+            'load_seconds': self.load_seconds
+        }
+
+    def _run(self):
+        start = time.perf_counter()
+
+        try:
+            model = self._load()
+        except Exception as e:
+            self.state, self.error = FAILED, str(e)
+        else:
+            self.model = model
+            self.state = READY if model is not None else MISSING
+        finally:
+            self.load_seconds = round(time.perf_counter() - start, 2)
+            self._ready.set()
+
+
+class RecognizerPool:
+    """
+    Reconocedores reutilizables, agrupados por frecuencia de muestreo
+
+    Crear un KaldiRecognizer cuesta; al devolverlo al pool se reinicia con
+    Reset() y queda listo para la siguiente petición. Como mucho hay 'size'
+    reconocedores en uso a la vez: el resto de peticiones esperan turno.
+
+    Args:
+        create: Función (sample_rate) -> reconocedor nuevo ya configurado
+        size: Reconocedores en uso simultáneo como máximo
+    """
+
+    def __init__(self, create, size=4):
+        self._create = create
+        self.size = size
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = {}  # sample_rate -> [reconocedores libres]
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, sample_rate, timeout=None):
+        """
+        Saca un reconocedor del pool (o crea uno)
+
+        Raises:
+            RecognizerBusyError: Si no queda hueco en 'timeout' segundos
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise RecognizerBusyError('Demasiadas transcripciones a la vez; inténtalo en un momento')
+
+        with self._lock:
+            idle = self._idle.get(sample_rate)
+            if idle:
+                self.reused += 1
+                return idle.pop()
+
+        try:
+            recognizer = self._create(sample_rate)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.created += 1
+
+        return recognizer
+
+    def release(self, sample_rate, recognizer):
+        """Devuelve un reconocedor al pool, reiniciado"""
+        try:
+            recognizer.Reset()
+        except Exception:
+            recognizer = None  # en mal estado: se descarta
+
+        with self._lock:
+            idle = self._idle.setdefault(sample_rate, [])
+            if recognizer is not None and len(idle) < self.size:
+                idle.append(recognizer)
+
+        self._slots.release()
+
+    def stats(self):
+        """Reconocedores creados, reutilizados y libres por frecuencia"""
+        with self._lock:
+            return {
+                'size': self.size,
+                'created': self.created,
+                'reused': self.reused,
+                'idle': {str(rate): len(idle) for rate, idle in self._idle.items()}
+            }
+
+
+# ==================== DECODIFICACIÓN EN PARALELO ====================
+
+# Modelos y reconocedores de cada proceso del pool (se cargan al primer uso)
+_worker_models = {}
+_worker_recognizers = {}
+
+
+def _decode_segment(data, sample_rate, model_path):
+    """Decodifica un tramo en un proceso del pool"""
+    recognizer = _worker_recognizers.get((model_path, sample_rate))
+    if recognizer is None:
+        from vosk import KaldiRecognizer, Model
+
+        model = _worker_models.get(model_path)
+        if model is None:
+            model = _worker_models[model_path] = Model(model_path)
+
+        recognizer = KaldiRecognizer(model, sample_rate)
+        recognizer.SetWords(True)
+        _worker_recognizers[(model_path, sample_rate)] = recognizer
+
+    return recognize_pcm(recognizer, data)
+
+
+class ParallelDecoder:
+    """
+    Decodifica tramos de una grabación a la vez en varios núcleos
+
+    Kaldi decodifica en un solo hilo, así que una nota de voz larga tarda
+    lo que marque su factor de tiempo real. Aquí cada tramo (cortado en
+    silencios) va a un proceso del pool compartido (ver ProcessPool), que
+    tiene sus propios reconocedores.
+
+    Los procesos se crean al arrancar, antes de que el modelo esté
+    cargado, así que cada uno carga su copia la primera vez que decodifica
+    (un modelo más en memoria por proceso).
+
+    Args:
+        pool: ProcessPool compartido
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    @property
+    def available(self):
+        """Si se puede decodificar en paralelo (pool arrancado)"""
+        return self.pool.available
+
+    def status(self):
+        """Si el paralelo está activo y el estado de los procesos"""
+        return {'active': self.available, **self.pool.status()}
+
+    def decode(self, model_path, segments, sample_rate, timeout=None):
+        """
+        Args:
+            model_path: Carpeta del modelo de Vosk (cada proceso lo carga)
+            timeout: Segundos máximos para toda la grabación (None = sin límite)
+
+        Returns:
+            Frases de todos los tramos, en el orden de la grabación, o None
+            si no hay pool o falló (un proceso murió por falta de memoria o
+            un abort de Kaldi, o se agotó el tiempo): el llamador decodifica
+            en serie y el pool se recrea la próxima vez
+        """
+        count = len(segments)
+
+        try:
+            results = self.pool.map(_decode_segment, segments, [sample_rate] * count,
+                                    [str(model_path)] * count, timeout=timeout)
+        except PoolUnavailable:
+            return None
+
+        return [sentence for sentences in results for sentence in sentences]
@@ -0,0 +1,240 @@
+"""
+Almacén de vectores para búsqueda semántica
+Guarda los embeddings en una matriz float32 en disco, mapeada en memoria,
+y resuelve las consultas con un producto matricial (similitud coseno)
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from core.logs import log_event
+
+
+class VectorStore:
+    """
+    Matriz de embeddings normalizados con un mapa fila → entrada
+
+    Cada entrada del diario puede tener varias filas (una por fragmento).
+    Las filas borradas quedan libres y se reutilizan; el archivo crece
+    duplicando su capacidad cuando hace falta.
+
+    Archivos en 'directory':
+        vectors.f32: Matriz float32 [capacidad x dimensión]
+        ids.json: Dimensión, clave de entrada por fila y hash del contenido
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / 'vectors.f32'
+        self.ids_path = self.directory / 'ids.json'
+
+        self._lock = threading.RLock()
+        self.dim = None
+        self._matrix = None
+        self._row_keys = []     # clave de entrada por fila (None = libre)
+        self._entry_rows = {}   # clave -> [filas]
+        self._free_rows = []    # filas libres para reutilizar
+        self._hashes = {}       # clave -> hash del contenido embebido
+
+        self._load()
+
+    # ==================== PERSISTENCIA ====================
+
+    def _load(self):
+        if not (self.ids_path.exists() and self.vectors_path.exists()):
+            return
+
+        with open(self.ids_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        self.dim = meta['dim']
+        self._row_keys = meta['rows']
+        self._hashes = meta['hashes']
+
+        for row, key in enumerate(self._row_keys):
+            if key is None:
+                self._free_rows.append(row)
+            else:
+                self._entry_rows.setdefault(key, []).append(row)
+
+        capacity = os.path.getsize(self.vectors_path) // (4 * self.dim)
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+',
+                                 shape=(capacity, self.dim))
+
+    def _save_ids(self):
+        """Escribe el mapa de filas de forma atómica"""
+        temp_path = self.ids_path.with_suffix('.json.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'dim': self.dim, 'rows': self._row_keys, 'hashes': self._hashes}, f)
+        os.replace(temp_path, self.ids_path)
+
+    def _ensure_capacity(self, rows_needed):
+        """Crea o agranda el archivo de la matriz (requiere el lock)"""
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if rows_needed <= capacity:
+            return
+
+        new_capacity = max(self.INITIAL_CAPACITY, capacity)
+        while new_capacity < rows_needed:
+            new_capacity *= 2
+
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(new_capacity * self.dim * 4)
+
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+',
+                                 shape=(new_capacity, self.dim))
+
+    def _reset(self, dim):
+        """Empieza de cero (p. ej. si cambia el modelo y la dimensión)"""
+        self._matrix = None
+        if self.vectors_path.exists():
+            self.vectors_path.unlink()
+        self.dim = dim
+        self._row_keys = []
+        self._entry_rows = {}
+        self._free_rows = []
+        self._hashes = {}
+
+    # ==================== ESCRITURA ====================
+
+    def upsert(self, key, vectors, content_hash=None, persist=True):
+        """
+        Reemplaza los vectores de una entrada
+
+        Args:
+            key: Identificador de la entrada ('proyecto/archivo.md')
+            vectors: Lista de embeddings (uno por fragmento)
+            content_hash: Hash del texto embebido (para saltar reembeddings)
+            persist: Guardar ya en disco (False en cargas masivas; luego persist())
+        """
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or not len(matrix):
+            return
+
+        # Normalizar: así la similitud coseno es un producto escalar
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.maximum(norms, 1e-12)
+
+        with self._lock:
+            if self.dim != matrix.shape[1]:
+                if self.dim is not None:
+                    log_event('vectors_reset', f"⚠️ Cambió la dimensión de los embeddings "
+                              f"({self.dim} → {matrix.shape[1]}); se vacía el almacén de vectores",
+                              level=logging.WARNING, old_dim=self.dim, new_dim=matrix.shape[1])
+                self._reset(matrix.shape[1])
+
+            self._release_rows(key)
+
+            reused = min(len(self._free_rows), len(matrix))
+            rows = [self._free_rows.pop() for _ in range(reused)]
+            rows += range(len(self._row_keys), len(self._row_keys) + len(matrix) - reused)
+
+            self._ensure_capacity(max(rows) + 1)
+            while len(self._row_keys) < max(rows) + 1:
+                self._row_keys.append(None)
+
+            self._matrix[rows] = matrix
+            for row in rows:
+                self._row_keys[row] = key
+            self._entry_rows[key] = rows
+            self._hashes[key] = content_hash
+
+            if persist:
+                self.persist()
+
+    def persist(self):
+        """Vuelca la matriz y el mapa de filas a disco"""
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._save_ids()
+
+    def remove(self, key):
+        """Elimina los vectores de una entrada"""
+        with self._lock:
+            if self._release_rows(key):
+                self._hashes.pop(key, None)
+                self._save_ids()
+
+    def _release_rows(self, key):
+        """Marca como libres las filas de una entrada (requiere el lock)"""
+        rows = self._entry_rows.pop(key, None)
+        if not rows:
+            return False
+
+        for row in rows:
+            self._row_keys[row] = None
+            self._matrix[row] = 0.0
+        self._free_rows.extend(rows)
+
+        return True
+
+    # ==================== CONSULTAS ====================
+
+    def content_hash(self, key):
+        """Hash del contenido con el que se embebió una entrada (o None)"""
+        with self._lock:
+            return self._hashes.get(key)
+
+    def keys(self):
+        """Claves de las entradas con embeddings"""
+        with self._lock:
+            return list(self._entry_rows)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entry_rows)
+
+    def query(self, vector, k=5, min_score=0.0):
+        """
+        Entradas más parecidas a un vector (similitud coseno)
+
+        Returns:
+            Lista de (clave, puntuación) de mayor a menor; cada entrada
+            aparece una vez con la puntuación de su mejor fragmento
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        with self._lock:
+            if self.dim is None or not self._entry_rows or query.shape != (self.dim,):
+                return []
+
+            used = len(self._row_keys)
+            scores = np.asarray(self._matrix[:used] @ query)
+            row_keys = list(self._row_keys)
+
+            # Las filas libres nunca deben salir como resultado
+            scores[self._free_rows] = -np.inf
+
+        # Candidatos: se piden más filas que k porque una entrada puede
+        # tener varios fragmentos entre los mejores
+        candidates = min(used, k * 4)
+        top_rows = np.argpartition(-scores, candidates - 1)[:candidates]
+        top_rows = top_rows[np.argsort(-scores[top_rows])]
+
+        results = []
+        seen = set()
+        for row in top_rows:
+            key = row_keys[row]
+            score = float(scores[row])
+            if key is None or key in seen or score < min_score:
+                continue
+            seen.add(key)
+            results.append((key, score))
+            if len(results) == k:
+                break
+
+        return results
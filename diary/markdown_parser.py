@@ -0,0 +1,205 @@
+"""
+Parser de markdown para los PDFs
+Recorre el texto una sola vez y lo convierte en una lista de bloques
+(títulos, párrafos, listas, tablas, código) con el formato en línea ya
+traducido al mini-HTML de los Paragraph de ReportLab. Los bloques son
+tuplas inmutables, así que se pueden cachear por contenido y compartir
+entre exportaciones
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+
+# Tipos de bloque
+HEADING = 'heading'      # ('heading', nivel, texto)
+PARAGRAPH = 'paragraph'  # ('paragraph', texto)
+BULLET = 'bullet'        # ('bullet', texto)
+NUMBERED = 'numbered'    # ('numbered', número, texto)
+CODE = 'code'            # ('code', texto sin formato, con sus sangrías)
+TABLE = 'table'          # ('table', tiene_cabecera, ((celda, ...), ...))
+BLANK = 'blank'          # ('blank',) una o varias líneas vacías seguidas
+
+# Clasificación de cada línea (ya sin espacios a los lados) en un solo match
+LINE_PATTERN = re.compile(
+    r'(?P<fence>```)'
+    r'|(?P<hashes>#{1,6})\s+(?P<heading>.*)'
+    r'|[-*+]\s+(?P<bullet>.*)'
+    r'|(?P<number>\d+)[.)]\s+(?P<numbered>.*)'
+    r'|(?P<row>\|.*)'
+)
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?$')
+
+# Formato en línea: código, negrita y cursiva en una sola pasada (el
+# código va primero para que lo que hay dentro no se interprete)
+INLINE_PATTERN = re.compile(r'`([^`]+)`|\*\*(.+?)\*\*|\*(.+?)\*')
+
+
+def escape(text):
+    """Escapa los caracteres especiales del mini-HTML de ReportLab"""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _inline_markup(match):
+    code, bold, italic = match.groups()
+    if code is not None:
+        return f'<font face="Courier" color="#6b21a8">{code}</font>'
+    if bold is not None:
+        return f'<b>{bold}</b>'
+    return f'<i>{italic}</i>'
+
+
+def render_inline(text):
+    """Texto markdown de una línea → mini-HTML de Paragraph"""
+    return INLINE_PATTERN.sub(_inline_markup, escape(text))
+
+
+def strip_frontmatter(lines):
+    """Quita el bloque '---' ... '---' del principio, si lo hay"""
+    if lines and lines[0].strip() == '---':
+        for i in range(1, len(lines)):
+            if lines[i].strip() == '---':
+                return lines[i + 1:]
+
+    return lines
+
+
+def split_table_row(line):
+    """Celdas de una fila '| a | b |'"""
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|'):
+        line = line[:-1]
+
+    return tuple(render_inline(cell.strip()) for cell in line.split('|'))
+
+
+def parse_markdown(markdown_text):
+    """
+    Convierte markdown en bloques
+
+    Las líneas de texto seguidas forman un solo párrafo; las filas de una
+    tabla deben ir seguidas y la segunda puede ser el separador '|---|'
+    (entonces la primera es la cabecera). Un bloque de código sin cerrar
+    llega hasta el final.
+
+    Returns:
+        Tupla de bloques (ver los tipos al principio del módulo)
+    """
+    blocks = []
+    paragraph = []
+    table = []
+    code = None  # líneas del bloque de código abierto
+
+    def flush():
+        if paragraph:
+            blocks.append((PARAGRAPH, render_inline(' '.join(paragraph))))
+            paragraph.clear()
+        if table:
+            has_header = len(table) > 1 and TABLE_SEPARATOR_PATTERN.match(table[1].strip()) is not None
+            rows = [table[0]] + table[2:] if has_header else table
+            blocks.append((TABLE, has_header, tuple(split_table_row(row) for row in rows)))
+            table.clear()
+
+    for raw_line in strip_frontmatter(markdown_text.split('\n')):
+        line = raw_line.strip()
+
+        if code is not None:
+            if line.startswith('```'):
+                blocks.append((CODE, '\n'.join(code).strip('\n')))
+                code = None
+            else:
+                code.append(raw_line.rstrip())
+            continue
+
+        if not line:
+            flush()
+            if not blocks or blocks[-1][0] != BLANK:
+                blocks.append((BLANK,))
+            continue
+
+        match = LINE_PATTERN.match(line)
+        kind = match.lastgroup if match else None
+
+        if kind == 'row':
+            if paragraph:
+                flush()
+            table.append(line)
+            continue
+
+        if kind is None:
+            if table:
+                flush()
+            paragraph.append(line)
+            continue
+
+        flush()
+
+        if kind == 'fence':
+            code = []
+        elif kind == 'heading':
+            blocks.append((HEADING, len(match.group('hashes')), render_inline(match.group('heading'))))
+        elif kind == 'bullet':
+            blocks.append((BULLET, render_inline(match.group('bullet'))))
+        elif kind == 'numbered':
+            blocks.append((NUMBERED, int(match.group('number')), render_inline(match.group('numbered'))))
+
+    flush()
+    if code is not None:
+        blocks.append((CODE, '\n'.join(code).strip('\n')))
+
+    return tuple(blocks)
+
+
+class MarkdownCache:
+    """
+    Bloques ya parseados por hash del contenido, con expulsión LRU
+
+    Exportar otra vez una entrada, o una rama que la contiene, reutiliza
+    sus bloques. Son inmutables, así que se comparten entre hilos sin copiarlos.
+
+    Args:
+        max_entries: Contenidos distintos que se recuerdan como máximo
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse(self, markdown_text):
+        """Bloques del texto, del caché si ya se había parseado"""
+        key = hashlib.sha256(markdown_text.encode('utf-8')).digest()
+
+        with self._lock:
+            blocks = self._blocks.get(key)
+            if blocks is not None:
+                self._blocks.move_to_end(key)
+                self.hits += 1
+                return blocks
+            self.misses += 1
+
+        blocks = parse_markdown(markdown_text)
+
+        with self._lock:
+            self._blocks[key] = blocks
+            while len(self._blocks) > self.max_entries:
+                self._blocks.popitem(last=False)
+
+        return blocks
+
+    def stats(self):
+        """Aciertos, fallos y contenidos guardados"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'entries': len(self._blocks)
+            }
@@ -0,0 +1,203 @@
+"""
+Caché de PDFs renderizados
+Los PDFs se guardan en disco con el hash de su contenido como nombre, así
+que exportar otra vez la misma entrada o rama no repite la maquetación
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+
+class PDFCache:
+    """
+    PDFs direccionados por contenido con expulsión LRU por tamaño
+
+    Los PDFs nuevos se renderizan en memoria y se sirven desde ahí; la
+    copia en disco solo se lee en los aciertos.
+
+    La clave es un hash de todo lo que influye en el PDF (versión del
+    generador y contenido de las entradas), de modo que cualquier cambio
+    produce otra clave y las versiones viejas acaban expulsadas. La fecha
+    de modificación de cada archivo hace de "último acceso".
+
+    Args:
+        directory: Carpeta de la caché
+        max_bytes: Tamaño máximo total de los PDFs guardados
+    """
+
+    SUFFIX = '.pdf'
+
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024):
+        self.directory = Path(directory).resolve()  # send_file resuelve las relativas contra la app
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._in_flight = {}  # clave -> threading.Lock de quien la está renderizando
+
+    @staticmethod
+    def make_key(*parts):
+        """Hash estable de las partes (textos) que determinan el PDF"""
+        digest = hashlib.sha256()
+        for part in parts:
+            data = str(part).encode('utf-8')
+            # Prefijo de longitud: ('ab', 'c') y ('a', 'bc') dan claves distintas
+            digest.update(len(data).to_bytes(8, 'little'))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def path_for(self, key):
+        return self.directory / f'{key}{self.SUFFIX}'
+
+    def get(self, key):
+        """Ruta del PDF cacheado (o None) y lo marca como recién usado"""
+        path = self.path_for(key)
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+
+        return path
+
+    def get_or_render(self, key, render, spool_bytes=8 * 1024 * 1024):
+        """
+        Devuelve el PDF abierto para leer, renderizándolo si falta
+
+        En un fallo render(archivo) escribe en memoria (SpooledTemporaryFile,
+        que solo pasa a disco por encima de 'spool_bytes'); el resultado se
+        guarda en la caché y se devuelve ese mismo búfer, sin releerlo.
+        Dos peticiones iguales a la vez renderizan una sola vez.
+
+        Returns:
+            (archivo binario posicionado al principio, tamaño en bytes)
+        """
+        cached = self._open(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            key_lock = self._in_flight.setdefault(key, threading.Lock())
+
+        with key_lock:
+            try:
+                # Otra petición pudo terminarlo mientras se esperaba
+                cached = self._open(key, count=False)
+                if cached is not None:
+                    return cached
+
+                buffer = tempfile.SpooledTemporaryFile(max_size=spool_bytes, mode='w+b')
+                try:
+                    render(buffer)
+                    size = buffer.tell()
+                    self._store(key, buffer)
+                except BaseException:
+                    buffer.close()
+                    raise
+            finally:
+                with self._lock:
+                    self._in_flight.pop(key, None)
+
+        self._evict(keep=self.path_for(key))
+        buffer.seek(0)
+
+        return buffer, size
+
+    def _open(self, key, count=True):
+        """Abre el PDF cacheado (o None); abrirlo ya lo protege de la expulsión"""
+        path = self.get(key) if count else self.path_for(key)
+        if path is None:
+            return None
+
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        return f, os.fstat(f.fileno()).st_size
+
+    def _store(self, key, buffer):
+        """Copia el búfer a la caché con escritura atómica (temporal + rename)"""
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                buffer.seek(0)
+                shutil.copyfileobj(buffer, f)
+            os.replace(temp_path, self.path_for(key))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def _evict(self, keep=None):
+        """Borra los PDFs menos usados hasta respetar max_bytes"""
+        with self._lock:
+            files = []
+            for path in self.directory.glob(f'*{self.SUFFIX}'):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _mtime, size, _path in files)
+
+            for _mtime, size, path in sorted(files, key=lambda item: item[0]):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+
+    def remove_orphans(self):
+        """
+        Borra temporales de renders interrumpidos (p. ej. un reinicio)
+
+        Se llama al arrancar el servidor, no al crear la caché: otro proceso
+        que importe la app no debe borrar los renders en curso.
+        """
+        for path in self.directory.glob('*.tmp'):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def stats(self):
+        """Contadores de aciertos/fallos y ocupación"""
+        with self._lock:
+            sizes = []
+            for path in self.directory.glob(f'*{self.SUFFIX}'):
+                try:
+                    sizes.append(path.stat().st_size)
+                except FileNotFoundError:
+                    pass
+            lookups = self.hits + self.misses
+
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(sizes),
+                'bytes': sum(sizes)
+            }
@@ -7,20 +7,167 @@ from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
+from reportlab.platypus import (
+    SimpleDocTemplate, Paragraph, Preformatted, Spacer, PageBreak, Table, TableStyle
+)
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from pathlib import Path
-from datetime import datetime
-import markdown2
-import re
+import time
+
+from core.logs import log_event
+from core.metrics import METRICS
+from core.process_pool import PoolUnavailable
+from core.profiling import phase
+from diary.markdown_parser import (
+    MarkdownCache, escape, HEADING, PARAGRAPH, BULLET, NUMBERED, CODE, TABLE, BLANK
+)
+
+
+# Cambiarla cuando cambie la maquetación: invalida los PDFs cacheados
+GENERATOR_VERSION = '4'
+
+# Márgenes de página y ancho útil del texto (el Frame de ReportLab añade
+# 6pt de relleno por cada lado)
+PAGE_MARGIN = 72
+FRAME_PADDING = 6
+CONTENT_WIDTH = A4[0] - 2 * PAGE_MARGIN - 2 * FRAME_PADDING
+
+PDF_RENDER_SECONDS = METRICS.histogram('diary_pdf_render_seconds', 'Maquetación de PDFs', ['kind'])
+PDF_PAGES = METRICS.histogram('diary_pdf_pages', 'Páginas de los PDFs generados', ['kind'],
+                              buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500))
+
+
+def record_render(kind, doc, start):
+    """Métricas de un PDF recién construido (devuelve los segundos que tardó)"""
+    seconds = time.perf_counter() - start
+    PDF_RENDER_SECONDS.observe(seconds, kind=kind)
+    PDF_PAGES.observe(doc.page, kind=kind)
+    return seconds
+
+
+def describe_target(output_path):
+    """Texto para el log: la ruta, o 'en memoria' si es un archivo abierto"""
+    return output_path if isinstance(output_path, (str, Path)) else 'en memoria'
+
+
+class CodeBlock(Preformatted):
+    """
+    Bloque de código: líneas tal cual, con sus sangrías, sobre el fondo del estilo
+
+    Preformatted no reparte el texto en líneas (mucho más barato que un
+    Paragraph con <br/>), pero no pinta el fondo ni lo conserva al partirse
+    entre páginas; esta clase hace ambas cosas. Las líneas más largas que
+    'max_line_length' caracteres se parten.
+    """
+
+    def __init__(self, text, style, max_line_length=None):
+        Preformatted.__init__(self, text, style, maxLineLength=max_line_length)
+
+    def draw(self):
+        style = self.style
+        if style.backColor:
+            padding = style.borderPadding
+            self.canv.saveState()
+            self.canv.setFillColor(style.backColor)
+            self.canv.rect(
+                style.leftIndent - padding, -padding,
+                self.width - style.leftIndent - style.rightIndent + 2 * padding,
+                self.height + 2 * padding,
+                stroke=0, fill=1
+            )
+            self.canv.restoreState()
+
+        Preformatted.draw(self)
+
+    def split(self, availWidth, availHeight):
+        parts = Preformatted.split(self, availWidth, availHeight)
+        return [CodeBlock('\n'.join(part.lines), self.style) for part in parts]
+
+
+class PrewrappedParagraph(Paragraph):
+    """
+    Párrafo que puede traer ya calculados sus cortes de línea
+
+    prewrap() parte las líneas para un ancho (en un proceso del pool) y el
+    primer wrap() con ese mismo ancho reutiliza el resultado. Con otro
+    ancho, o si ReportLab lo vuelve a maquetar, se calcula como siempre,
+    así que el PDF sale idéntico al de un Paragraph normal.
+    """
+
+    def prewrap(self, width):
+        self._prewrapped = (width, Paragraph.wrap(self, width, 0x7fffffff))
+
+    def wrap(self, availWidth, availHeight):
+        prewrapped = self.__dict__.pop('_prewrapped', None)
+        if prewrapped is not None and prewrapped[0] == availWidth and hasattr(self, 'blPara'):
+            return prewrapped[1]
+
+        return Paragraph.wrap(self, availWidth, availHeight)
+
+
+# ==================== MAQUETACIÓN EN PARALELO ====================
+
+# Generador de cada proceso del pool (se crea al primer uso)
+_worker_generator = None
+
+
+def _build_entry_story(entry, number, total):
+    """Flowables de una entrada, con las líneas ya partidas, en un proceso del pool"""
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = PDFGenerator()
+
+    story = _worker_generator.entry_story(entry, number, total)
+
+    for flowable in story:
+        if isinstance(flowable, PrewrappedParagraph):
+            flowable.prewrap(CONTENT_WIDTH)
+
+    return story
 
 
 class PDFGenerator:
-    def __init__(self):
+    """
+    Genera PDFs de entradas y ramas
+
+    Los estilos de párrafo y de tabla se construyen una vez en el
+    constructor y después solo se leen; los flowables se crean en cada
+    llamada. Por eso una misma instancia se puede compartir entre hilos
+    (app.py usa una sola para todas las exportaciones).
+
+    En las ramas largas el markdown de cada entrada se convierte y sus
+    párrafos se parten en líneas en varios procesos; el proceso principal
+    solo reparte en páginas y dibuja (doc.build no se puede dividir: el
+    flujo de páginas es uno solo). Los procesos son los del pool
+    compartido (ver ProcessPool); cada uno crea su propio generador la
+    primera vez. Sin pool, o si se rompe, se hace en serie.
+
+    El markdown de cada entrada se parsea una vez por contenido
+    (MarkdownCache); cada proceso del pool tiene su propia copia del caché.
+
+    Args:
+        pool: ProcessPool para las ramas largas (None = en serie)
+        parallel_min_entries: Entradas mínimas para repartir el trabajo
+        markdown_cache_entries: Entradas parseadas que se recuerdan
+    """
+
+    def __init__(self, pool=None, parallel_min_entries=50, markdown_cache_entries=1024):
         self.styles = getSampleStyleSheet()
         self.setup_custom_styles()
+        self.setup_table_styles()
+        self.markdown_cache = MarkdownCache(markdown_cache_entries)
+
+        # Caracteres de código que caben en una línea (Courier es monoespaciada)
+        code = self.styles['CustomCode']
+        self.code_line_length = int(
+            (CONTENT_WIDTH - code.leftIndent - code.rightIndent)
+            / pdfmetrics.stringWidth('M', code.fontName, code.fontSize)
+        )
+
+        self.pool = pool
+        self.parallel_min_entries = parallel_min_entries
 
     def setup_custom_styles(self):
         """Configura estilos personalizados"""
@@ -73,21 +220,58 @@ class PDFGenerator:
                 rightIndent=10
             ))
 
+        # Celdas de las tablas del contenido
+        if 'CustomTableCell' not in self.styles:
+            self.styles.add(ParagraphStyle(
+                name='CustomTableCell',
+                parent=self.styles['BodyText'],
+                fontSize=9,
+                leading=12,
+                fontName='Helvetica'
+            ))
+
+    def setup_table_styles(self):
+        """Estilos de las tablas de metadatos (entrada suelta y rama)"""
+        self.entry_table_style = self.metadata_table_style(font_size=10, padding=8)
+        self.branch_table_style = self.metadata_table_style(font_size=9, padding=6)
+
+        # Tablas escritas en el markdown (la cabecera, si la hay, resaltada)
+        self.content_table_style = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('PADDING', (0, 0), (-1, -1), 4),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e9d5ff')),
+        ])
+        self.content_header_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f3e8ff')),
+        ])
+
+    @staticmethod
+    def metadata_table_style(font_size, padding):
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f3e8ff')),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#6b21a8')),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), font_size),
+            ('PADDING', (0, 0), (-1, -1), padding),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e9d5ff')),
+        ])
+
     def generate_single_entry_pdf(self, entry_data, output_path):
         """
         Genera PDF de una sola entrada
 
         Args:
             entry_data: Dict con datos de la entrada
-            output_path: Ruta donde guardar el PDF
+            output_path: Ruta o archivo abierto en binario (BytesIO, ...) donde escribir el PDF
         """
+        start = time.perf_counter()
         doc = SimpleDocTemplate(
             output_path,
             pagesize=A4,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=72
+            rightMargin=PAGE_MARGIN,
+            leftMargin=PAGE_MARGIN,
+            topMargin=PAGE_MARGIN,
+            bottomMargin=PAGE_MARGIN
         )
 
         story = []
@@ -105,21 +289,14 @@ class PDFGenerator:
         ]
 
         t = Table(metadata, colWidths=[1.5 * inch, 4 * inch])
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f3e8ff')),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#6b21a8')),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('PADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e9d5ff')),
-        ]))
+        t.setStyle(self.entry_table_style)
 
         story.append(t)
         story.append(Spacer(1, 0.3 * inch))
 
         # Título de la entrada
         title = entry_data.get('commit_problema', 'Entrada de desarrollo')
-        story.append(Paragraph(title, self.styles['CustomHeading2']))
+        story.append(Paragraph(escape(str(title)), self.styles['CustomHeading2']))
         story.append(Spacer(1, 0.1 * inch))
 
         # Contenido (parsear markdown simple)
@@ -128,7 +305,9 @@ class PDFGenerator:
 
         # Construir PDF
         doc.build(story)
-        print(f"✅ PDF generado: {output_path}")
+        seconds = record_render('entry', doc, start)
+        log_event('pdf_rendered', f"✅ PDF generado: {describe_target(output_path)}",
+                  kind='entry', pages=doc.page, seconds=round(seconds, 3))
 
     def generate_branch_pdf(self, entries, branch_name, project_name, output_path):
         """
@@ -138,15 +317,16 @@ class PDFGenerator:
             entries: Lista de entradas ordenadas por fecha
             branch_name: Nombre de la rama
             project_name: Nombre del proyecto
-            output_path: Ruta donde guardar el PDF
+            output_path: Ruta o archivo abierto en binario (BytesIO, ...) donde escribir el PDF
         """
+        start = time.perf_counter()
         doc = SimpleDocTemplate(
             output_path,
             pagesize=A4,
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=72
+            rightMargin=PAGE_MARGIN,
+            leftMargin=PAGE_MARGIN,
+            topMargin=PAGE_MARGIN,
+            bottomMargin=PAGE_MARGIN
         )
 
         story = []
@@ -157,11 +337,11 @@ class PDFGenerator:
         story.append(Spacer(1, 0.3 * inch))
 
         story.append(Paragraph(
-            f"Proyecto: {project_name}",
+            f"Proyecto: {escape(str(project_name))}",
             self.styles['CustomHeading2']
         ))
         story.append(Paragraph(
-            f"Rama: {branch_name}",
+            f"Rama: {escape(str(branch_name))}",
             self.styles['CustomHeading2']
         ))
         story.append(Spacer(1, 0.2 * inch))
@@ -170,10 +350,14 @@ class PDFGenerator:
             f"Total de entradas: {len(entries)}",
             self.styles['CustomBody']
         ))
-        story.append(Paragraph(
-            f"Generado: {datetime.now().strftime('%Y-%m-%d %H:%M')}",
-            self.styles['CustomBody']
-        ))
+        # La fecha de la última entrada, no la de ahora: el PDF solo depende
+        # de las entradas y se puede servir desde la caché
+        newest = max((str(entry.get('fecha', '')) for entry in entries), default='')
+        if newest:
+            story.append(Paragraph(
+                f"Última entrada: {escape(newest)}",
+                self.styles['CustomBody']
+            ))
 
         story.append(PageBreak())
 
@@ -185,131 +369,144 @@ class PDFGenerator:
             title = entry.get('commit_problema', 'Sin título')
             fecha = entry.get('fecha', '')
             story.append(Paragraph(
-                f"{i}. {title} <i>({fecha})</i>",
+                f"{i}. {escape(str(title))} <i>({escape(str(fecha))})</i>",
                 self.styles['CustomBody']
             ))
 
         story.append(PageBreak())
 
-        # Entradas
-        for i, entry in enumerate(entries, 1):
-            story.append(Paragraph(
-                f"Entrada {i}/{len(entries)}",
-                self.styles['CustomHeading2']
-            ))
-            story.append(Spacer(1, 0.1 * inch))
-
-            # Metadata
-            metadata = [
-                ['📅 Fecha:', entry.get('fecha', 'N/A')],
-                ['💡 Commit:', entry.get('commit_problema', 'N/A')],
-                ['👤 Autor:', entry.get('autor', 'N/A')],
-            ]
-
-            t = Table(metadata, colWidths=[1.2 * inch, 4.3 * inch])
-            t.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f3e8ff')),
-                ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#6b21a8')),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('PADDING', (0, 0), (-1, -1), 6),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#e9d5ff')),
-            ]))
-
-            story.append(t)
-            story.append(Spacer(1, 0.2 * inch))
-
-            # Contenido
-            content = entry.get('content', '')
-            story.extend(self.parse_markdown_to_flowables(content))
-
-            if i < len(entries):
-                story.append(PageBreak())
+        # Entradas (markdown a flowables)
+        with phase('entry_stories'):
+            for i, entry_story in enumerate(self.entry_stories(entries), 1):
+                story.extend(entry_story)
+
+                if i < len(entries):
+                    story.append(PageBreak())
 
         # Construir PDF
-        doc.build(story)
-        print(f"✅ PDF de rama generado: {output_path}")
+        with phase('reportlab_build'):
+            doc.build(story)
+        seconds = record_render('branch', doc, start)
+        log_event('pdf_rendered', f"✅ PDF de rama generado: {describe_target(output_path)}",
+                  kind='branch', entries=len(entries), pages=doc.page, seconds=round(seconds, 3))
+
+    def entry_story(self, entry, number, total):
+        """Flowables de una entrada dentro del PDF de una rama"""
+        story = [
+            PrewrappedParagraph(f"Entrada {number}/{total}", self.styles['CustomHeading2']),
+            Spacer(1, 0.1 * inch)
+        ]
+
+        # Metadata
+        metadata = [
+            ['📅 Fecha:', entry.get('fecha', 'N/A')],
+            ['💡 Commit:', entry.get('commit_problema', 'N/A')],
+            ['👤 Autor:', entry.get('autor', 'N/A')],
+        ]
+
+        t = Table(metadata, colWidths=[1.2 * inch, 4.3 * inch])
+        t.setStyle(self.branch_table_style)
+
+        story.append(t)
+        story.append(Spacer(1, 0.2 * inch))
+
+        # Contenido
+        content = entry.get('content', '')
+        story.extend(self.parse_markdown_to_flowables(content))
+
+        return story
+
+    @property
+    def parallel_available(self):
+        """Si se pueden preparar las entradas en paralelo (pool arrancado)"""
+        return self.pool is not None and self.pool.available
+
+    def entry_stories(self, entries):
+        """
+        Flowables de cada entrada de una rama, en orden
+
+        Por encima de 'parallel_min_entries' se reparten entre los procesos
+        en lotes (menos viajes entre procesos); si el pool se rompe esta
+        rama se hace en serie y los procesos se recrean para la siguiente.
+        """
+        total = len(entries)
+        numbers = range(1, total + 1)
+
+        if self.parallel_available and total >= self.parallel_min_entries:
+            chunksize = max(1, total // (self.pool.processes * 4))
+
+            try:
+                return self.pool.map(_build_entry_story, entries, numbers, [total] * total,
+                                     chunksize=chunksize)
+            except PoolUnavailable:
+                pass
+
+        return [self.entry_story(entry, number, total) for entry, number in zip(entries, numbers)]
 
     def parse_markdown_to_flowables(self, markdown_text):
         """
-        Convierte markdown a elementos PDF (simple)
+        Convierte markdown a elementos PDF
 
         Args:
-            markdown_text: Texto en formato markdown
+            markdown_text: Texto en formato markdown (con o sin frontmatter)
 
         Returns:
             Lista de flowables para ReportLab
         """
+        return self.blocks_to_flowables(self.markdown_cache.parse(markdown_text))
+
+    def blocks_to_flowables(self, blocks):
+        """Flowables nuevos (ReportLab los modifica al maquetar) para unos bloques"""
+        styles = self.styles
         flowables = []
 
-        # Eliminar frontmatter
-        if markdown_text.startswith('---'):
-            parts = markdown_text.split('---', 2)
-            if len(parts) >= 3:
-                markdown_text = parts[2]
+        for block in blocks:
+            kind = block[0]
 
-        # Dividir en líneas
-        lines = markdown_text.split('\n')
+            if kind == BLANK:
+                flowables.append(Spacer(1, 0.1 * inch))
 
-        in_code_block = False
-        code_lines = []
+            elif kind == HEADING:
+                level, text = block[1], block[2]
+                if level == 1:
+                    flowables.append(PrewrappedParagraph(text, styles['CustomTitle']))
+                    flowables.append(Spacer(1, 0.1 * inch))
+                elif level == 2:
+                    flowables.append(PrewrappedParagraph(text, styles['CustomHeading2']))
+                else:
+                    flowables.append(PrewrappedParagraph(f"<b>{text}</b>", styles['CustomBody']))
 
-        for line in lines:
-            line = line.strip()
+            elif kind == PARAGRAPH:
+                flowables.append(PrewrappedParagraph(block[1], styles['CustomBody']))
 
-            if not line:
-                flowables.append(Spacer(1, 0.1 * inch))
-                continue
-
-            # Code blocks
-            if line.startswith('```'):
-                if in_code_block:
-                    # Fin del bloque de código
-                    code_text = '\n'.join(code_lines)
-                    flowables.append(Paragraph(
-                        f"<font face='Courier' size='9'>{code_text}</font>",
-                        self.styles['CustomCode']
-                    ))
-                    flowables.append(Spacer(1, 0.1 * inch))
-                    code_lines = []
-                in_code_block = not in_code_block
-                continue
-
-            if in_code_block:
-                code_lines.append(line)
-                continue
-
-            # Headers
-            if line.startswith('# '):
-                text = line.replace('# ', '')
-                flowables.append(Paragraph(text, self.styles['CustomTitle']))
+            elif kind == BULLET:
+                flowables.append(PrewrappedParagraph(f"• {block[1]}", styles['CustomBody']))
+
+            elif kind == NUMBERED:
+                flowables.append(PrewrappedParagraph(f"{block[1]}. {block[2]}", styles['CustomBody']))
+
+            elif kind == CODE:
+                flowables.append(CodeBlock(block[1], styles['CustomCode'], self.code_line_length))
                 flowables.append(Spacer(1, 0.1 * inch))
-            elif line.startswith('## '):
-                text = line.replace('## ', '')
-                flowables.append(Paragraph(text, self.styles['CustomHeading2']))
-            elif line.startswith('### '):
-                text = line.replace('### ', '')
-                flowables.append(Paragraph(f"<b>{text}</b>", self.styles['CustomBody']))
-
-            # Listas
-            elif line.startswith('- ') or line.startswith('* '):
-                text = line[2:]
-                flowables.append(Paragraph(f"• {text}", self.styles['CustomBody']))
-
-            # Código inline
-            elif '`' in line:
-                text = line.replace('`', '<font face="Courier" color="#6b21a8">')
-                text = text.replace('`', '</font>')
-                flowables.append(Paragraph(text, self.styles['CustomBody']))
-
-            # Texto normal
-            else:
-                # Procesar negritas y cursivas
-                text = line
-                text = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', text)
-                text = re.sub(r'\*(.*?)\*', r'<i>\1</i>', text)
-
-                if text.strip():
-                    flowables.append(Paragraph(text, self.styles['CustomBody']))
-
-        return flowables
\ No newline at end of file
+
+            elif kind == TABLE:
+                flowables.append(self.markdown_table(block[1], block[2]))
+
+        return flowables
+
+    def markdown_table(self, has_header, rows):
+        """Tabla del markdown a lo ancho del texto, con columnas iguales"""
+        columns = max(len(row) for row in rows)
+        cell_style = self.styles['CustomTableCell']
+
+        data = [
+            [Paragraph(cell, cell_style) for cell in row] + [''] * (columns - len(row))
+            for row in rows
+        ]
+
+        t = Table(data, colWidths=[CONTENT_WIDTH / columns] * columns, repeatRows=1 if has_header else 0)
+        t.setStyle(self.content_table_style)
+        if has_header:
+            t.setStyle(self.content_header_style)
+
+        return t
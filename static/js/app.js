@@ -118,6 +118,11 @@ document.addEventListener('DOMContentLoaded', function() {
                     loadBranches(project);
                 }
 
+                // La mejora con IA continúa en segundo plano
+                if (result.job_id) {
+                    watchEnrichmentJob(result.job_id);
+                }
+
                 // Restaurar después de 2 segundos
                 setTimeout(() => {
                     saveBtn.textContent = '💾 Guardar Entrada';
@@ -155,13 +160,58 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // ========== RECONOCIMIENTO DE VOZ CON VOSK ==========
 
+    // El modelo de Vosk se carga en segundo plano al arrancar el servidor:
+    // el selector indica si todavía no está listo
+    const voskOption = document.querySelector('#voiceMethod option[value="vosk"]');
+    const voskLabel = voskOption.textContent;
+
+    watchVoskStatus();
+
+    async function watchVoskStatus() {
+        try {
+            const response = await fetch('/api/transcribe/status');
+            const result = await response.json();
+            const state = result.vosk.state;
+
+            if (state === 'ready') {
+                voskOption.textContent = voskLabel;
+            } else if (state === 'loading' || state === 'idle') {
+                voskOption.textContent = `${voskLabel} (cargando…)`;
+                setTimeout(watchVoskStatus, 3000);
+            } else {
+                voskOption.textContent = `${voskLabel} (no disponible)`;
+            }
+        } catch (error) {
+            console.error('Error consultando estado de Vosk:', error);
+        }
+    }
+
     let mediaRecorder = null;
     let audioChunks = [];
     let audioStream = null;
 
+    // Configuración óptima del micrófono para Vosk
+    const MICROPHONE_CONSTRAINTS = {
+        audio: {
+            channelCount: 1,           // Mono (requerido por Vosk)
+            sampleRate: 48000,         // Alta calidad, se convertirá a 16kHz
+            echoCancellation: true,    // Cancelar eco
+            noiseSuppression: true,    // Reducir ruido de fondo
+            autoGainControl: true,     // Normalizar volumen automáticamente
+            latency: 0                 // Baja latencia
+        }
+    };
+
     recordBtn.addEventListener('click', async function() {
         if (!isRecording) {
-            await startRecording();
+            // Vosk transcribe mientras se graba; Google necesita el clip completo
+            if (document.getElementById('voiceMethod').value === 'vosk') {
+                await startStreamingRecording();
+            } else {
+                await startRecording();
+            }
+        } else if (streamSession) {
+            await stopStreamingRecording();
         } else {
             await stopRecording();
         }
@@ -170,16 +220,7 @@ document.addEventListener('DOMContentLoaded', function() {
  async function startRecording() {
     try {
         // Solicitar permiso con configuración óptima para Vosk
-        audioStream = await navigator.mediaDevices.getUserMedia({
-            audio: {
-                channelCount: 1,           // Mono (requerido por Vosk)
-                sampleRate: 48000,         // Alta calidad, se convertirá a 16kHz
-                echoCancellation: true,    // Cancelar eco
-                noiseSuppression: true,    // Reducir ruido de fondo
-                autoGainControl: true,     // Normalizar volumen automáticamente
-                latency: 0                 // Baja latencia
-            }
-        });
+        audioStream = await navigator.mediaDevices.getUserMedia(MICROPHONE_CONSTRAINTS);
 
         // Crear MediaRecorder con mejor calidad
         let options = { mimeType: 'audio/webm;codecs=opus' };
@@ -215,6 +256,11 @@ document.addEventListener('DOMContentLoaded', function() {
         console.log('💡 Habla claro y cerca del micrófono para mejor resultado');
 
     } catch (error) {
+        showMicrophoneError(error);
+    }
+}
+
+    function showMicrophoneError(error) {
         console.error('❌ Error al acceder al micrófono:', error);
 
         if (error.name === 'NotAllowedError') {
@@ -225,7 +271,6 @@ document.addEventListener('DOMContentLoaded', function() {
             alert('❌ Error al acceder al micrófono:\n' + error.message);
         }
     }
-}
 
     async function stopRecording() {
         if (mediaRecorder && mediaRecorder.state === 'recording') {
@@ -278,55 +323,262 @@ document.addEventListener('DOMContentLoaded', function() {
 
         const result = await response.json();
 
-        if (result.success) {
-            const transcription = result.transcription;
+        handleTranscriptionResult(result);
 
-            if (transcription) {
-                // Añadir transcripción al textarea
-                const notesTextarea = document.getElementById('notes');
-                const currentText = notesTextarea.value;
+        } catch (error) {
+            showTranscriptionError(error);
+        } finally {
+            // Restaurar botón
+            recordBtn.textContent = '🎤 Grabar';
+            recordBtn.classList.remove('recording');
+            recordBtn.disabled = false;
 
-                if (currentText.trim()) {
-                    notesTextarea.value = currentText + '\n\n' + transcription;
-                } else {
-                    notesTextarea.value = transcription;
-                }
+            // Limpiar
+            audioChunks = [];
+        }
+    }
+
+    function handleTranscriptionResult(result) {
+        if (!result.success) {
+            throw new Error(result.message || 'Error al transcribir');
+        }
 
-                console.log(`✅ Transcripción completada (${result.method}):`, transcription);
+        const transcription = result.transcription;
 
-                // Mostrar notificación visual con método usado
-                showTranscriptionSuccess(transcription, result.method);
+        if (transcription) {
+            // Añadir transcripción al textarea
+            const notesTextarea = document.getElementById('notes');
+            const currentText = notesTextarea.value;
+
+            if (currentText.trim()) {
+                notesTextarea.value = currentText + '\n\n' + transcription;
             } else {
-                alert('⚠️ No se detectó voz en la grabación.\n\nConsejos:\n- Habla más cerca del micrófono\n- Habla más alto y claro\n- Reduce el ruido de fondo');
+                notesTextarea.value = transcription;
             }
+
+            console.log(`✅ Transcripción completada (${result.method}):`, transcription);
+
+            // Mostrar notificación visual con método usado
+            showTranscriptionSuccess(transcription, result.method);
         } else {
-            throw new Error(result.message || 'Error al transcribir');
+            alert('⚠️ No se detectó voz en la grabación.\n\nConsejos:\n- Habla más cerca del micrófono\n- Habla más alto y claro\n- Reduce el ruido de fondo');
+        }
+    }
+
+    function showTranscriptionError(error) {
+        console.error('❌ Error procesando audio:', error);
+
+        // Mensaje más específico según el error
+        let errorMsg = '❌ Error al transcribir el audio';
+
+        if (error.message.includes('internet') || error.message.includes('Google')) {
+            errorMsg += '\n\n🌐 Problema de conexión a internet.\nPrueba con el modo Offline (Vosk).';
+        } else {
+            errorMsg += ':\n' + error.message;
         }
 
+        alert(errorMsg);
+    }
+
+    // ========== DICTADO EN STREAMING (VOSK) ==========
+    // El audio se envía en trozos PCM de 16 bits a 16kHz mientras se graba
+    // y el servidor devuelve el texto reconocido en el momento
+
+    const STREAM_SAMPLE_RATE = 16000;
+    const STREAM_FLUSH_MS = 250;  // Cada cuánto se envía un trozo
+
+    const liveTranscript = document.getElementById('liveTranscript');
+    let streamSession = null;
+
+    async function startStreamingRecording() {
+        try {
+            audioStream = await navigator.mediaDevices.getUserMedia(MICROPHONE_CONSTRAINTS);
         } catch (error) {
-            console.error('❌ Error procesando audio:', error);
+            showMicrophoneError(error);
+            return;
+        }
 
-            // Mensaje más específico según el error
-            let errorMsg = '❌ Error al transcribir el audio';
+        try {
+            const response = await fetch('/api/transcribe/stream', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ sample_rate: STREAM_SAMPLE_RATE })
+            });
+            const result = await response.json();
 
-            if (error.message.includes('internet') || error.message.includes('Google')) {
-                errorMsg += '\n\n🌐 Problema de conexión a internet.\nPrueba con el modo Offline (Vosk).';
-            } else {
-                errorMsg += ':\n' + error.message;
+            if (!result.success) {
+                throw new Error(result.message || 'No se pudo iniciar el dictado');
             }
 
-            alert(errorMsg);
+            const context = new (window.AudioContext || window.webkitAudioContext)();
+            const source = context.createMediaStreamSource(audioStream);
+            const processor = context.createScriptProcessor(4096, 1, 1);
+
+            streamSession = {
+                id: result.session_id,
+                context: context,
+                source: source,
+                processor: processor,
+                buffered: [],
+                bufferedSamples: 0,
+                sending: Promise.resolve(),
+                failed: null,
+                finalText: []
+            };
+
+            const session = streamSession;
+            const flushSamples = STREAM_SAMPLE_RATE * STREAM_FLUSH_MS / 1000;
+
+            processor.onaudioprocess = (event) => {
+                const pcm = downsampleToInt16(
+                    event.inputBuffer.getChannelData(0),
+                    context.sampleRate,
+                    STREAM_SAMPLE_RATE
+                );
+                session.buffered.push(pcm);
+                session.bufferedSamples += pcm.length;
+
+                if (session.bufferedSamples >= flushSamples) {
+                    flushStreamBuffer(session);
+                }
+            };
+
+            source.connect(processor);
+            processor.connect(context.destination);
+
+            isRecording = true;
+
+            // Actualizar UI
+            recordBtn.textContent = '🔴 Grabando...';
+            recordBtn.classList.add('recording');
+            renderLiveTranscript(session, '');
+            liveTranscript.classList.remove('hidden');
+
+            console.log(`🎤 Dictado en streaming iniciado (${context.sampleRate} Hz → ${STREAM_SAMPLE_RATE} Hz)`);
+
+        } catch (error) {
+            audioStream.getTracks().forEach(track => track.stop());
+            streamSession = null;
+            showTranscriptionError(error);
+        }
+    }
+
+    async function stopStreamingRecording() {
+        const session = streamSession;
+
+        // Dejar de capturar y enviar lo que quede en el búfer
+        session.processor.onaudioprocess = null;
+        session.source.disconnect();
+        session.processor.disconnect();
+        audioStream.getTracks().forEach(track => track.stop());
+        session.context.close();
+        flushStreamBuffer(session);
+
+        isRecording = false;
+
+        recordBtn.textContent = '⏳ Transcribiendo...';
+        recordBtn.disabled = true;
+
+        try {
+            // Esperar a que lleguen todos los trozos antes de cerrar
+            await session.sending;
+
+            if (session.failed) {
+                throw session.failed;
+            }
+
+            const response = await fetch(`/api/transcribe/stream/${encodeURIComponent(session.id)}/finish`, {
+                method: 'POST'
+            });
+
+            handleTranscriptionResult(await response.json());
+
+        } catch (error) {
+            fetch(`/api/transcribe/stream/${encodeURIComponent(session.id)}`, { method: 'DELETE' });
+            showTranscriptionError(error);
         } finally {
-            // Restaurar botón
+            streamSession = null;
+            liveTranscript.classList.add('hidden');
+            liveTranscript.textContent = '';
+
             recordBtn.textContent = '🎤 Grabar';
             recordBtn.classList.remove('recording');
             recordBtn.disabled = false;
+        }
+    }
 
-            // Limpiar
-            audioChunks = [];
+    function flushStreamBuffer(session) {
+        if (!session.bufferedSamples) return;
+
+        // Unir los fragmentos capturados en un único trozo
+        const chunk = new Int16Array(session.bufferedSamples);
+        let offset = 0;
+        session.buffered.forEach(part => {
+            chunk.set(part, offset);
+            offset += part.length;
+        });
+        session.buffered = [];
+        session.bufferedSamples = 0;
+
+        // Los trozos se envían de uno en uno y en orden
+        session.sending = session.sending.then(() => sendStreamChunk(session, chunk));
+    }
+
+    async function sendStreamChunk(session, chunk) {
+        if (session.failed) return;
+
+        try {
+            const response = await fetch(`/api/transcribe/stream/${encodeURIComponent(session.id)}`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/octet-stream' },
+                body: chunk.buffer
+            });
+            const result = await response.json();
+
+            if (!result.success) {
+                throw new Error(result.message || 'Error al transcribir');
+            }
+
+            session.finalText.push(...result.final);
+            renderLiveTranscript(session, result.partial);
+
+        } catch (error) {
+            session.failed = error;
         }
     }
 
+    function renderLiveTranscript(session, partial) {
+        liveTranscript.textContent = session.finalText.join('. ');
+
+        const partialSpan = document.createElement('span');
+        partialSpan.className = 'partial';
+        partialSpan.textContent = partial ? ` ${partial}…` : (session.finalText.length ? '' : 'Escuchando…');
+        liveTranscript.appendChild(partialSpan);
+    }
+
+    function downsampleToInt16(input, inputRate, outputRate) {
+        /**
+         * Pasa muestras float32 a PCM de 16 bits a 'outputRate'
+         * (promediando las muestras que caen en cada salida)
+         */
+        const ratio = inputRate / outputRate;
+        const length = Math.floor(input.length / ratio);
+        const output = new Int16Array(length);
+
+        for (let i = 0; i < length; i++) {
+            const start = Math.floor(i * ratio);
+            const end = Math.max(start + 1, Math.floor((i + 1) * ratio));
+            let sum = 0;
+            for (let j = start; j < end; j++) {
+                sum += input[j];
+            }
+            const s = Math.max(-1, Math.min(1, sum / (end - start)));
+            output[i] = s < 0 ? s * 0x8000 : s * 0x7FFF;
+        }
+
+        return output;
+    }
+
     async function audioBufferToWav(audioBuffer) {
         /**
          * Convierte AudioBuffer a WAV mono 16kHz
@@ -411,6 +663,64 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // Consultar periódicamente el estado de la mejora con IA
+    function watchEnrichmentJob(jobId) {
+        const pollInterval = 2000;
+
+        const poll = async () => {
+            try {
+                const response = await fetch(`/api/jobs/${encodeURIComponent(jobId)}`);
+                const result = await response.json();
+
+                if (!result.success) return;
+
+                const job = result.job;
+                if (job.status === 'done' && job.result && job.result.edited) {
+                    showJobNotification('✋ La entrada se editó antes de acabar la IA; se conserva tu versión', false);
+                } else if (job.status === 'done' && job.result && job.result.unchanged) {
+                    showJobNotification('ℹ️ La IA no propuso cambios; se conservan tus notas', false);
+                } else if (job.status === 'done') {
+                    showJobNotification('✨ Entrada mejorada con IA', true);
+                } else if (job.status === 'error') {
+                    showJobNotification(`⚠️ No se pudo mejorar con IA: ${job.error}`, false);
+                } else {
+                    setTimeout(poll, pollInterval);
+                }
+            } catch (error) {
+                console.error('Error consultando trabajo:', error);
+                setTimeout(poll, pollInterval * 2);
+            }
+        };
+
+        setTimeout(poll, pollInterval);
+    }
+
+    function showJobNotification(text, ok) {
+        const notification = document.createElement('div');
+
+        notification.style.cssText = `
+            position: fixed;
+            top: 20px;
+            right: 20px;
+            background: ${ok ? 'linear-gradient(135deg, #a855f7, #7e22ce)' : 'linear-gradient(135deg, #f59e0b, #d97706)'};
+            color: white;
+            padding: 16px 24px;
+            border-radius: 12px;
+            box-shadow: 0 8px 20px rgba(168, 85, 247, 0.4);
+            z-index: 10000;
+            max-width: 400px;
+            animation: slideIn 0.3s ease-out;
+        `;
+        notification.textContent = text;
+
+        document.body.appendChild(notification);
+
+        setTimeout(() => {
+            notification.style.animation = 'slideOut 0.3s ease-out';
+            setTimeout(() => notification.remove(), 300);
+        }, 4000);
+    }
+
     function showTranscriptionSuccess(text, method) {
     // Crear notificación temporal
     const notification = document.createElement('div');
@@ -98,7 +98,7 @@ document.addEventListener('DOMContentLoaded', function() {
         try {
             const project = projectContext.value;
 
-            const response = await fetch('/api/assistant', {
+            const response = await fetch('/api/assistant/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -110,34 +110,63 @@ document.addEventListener('DOMContentLoaded', function() {
                 })
             });
 
-            const result = await response.json();
+            if (!response.ok || !response.body) {
+                const result = await response.json();
+                throw new Error(result.message || `HTTP ${response.status}`);
+            }
 
-            // Remover loading
-            loadingMsg.remove();
+            // Renderizar la respuesta a medida que llegan los tokens
+            let answer = '';
+            let answerMsg = null;
+            let renderPending = false;
 
-            if (result.success) {
-                // Renderizar respuesta con Markdown
-                const html = marked.parse(result.response);
-                addMessage('assistant', html, true);
-
-                // Mostrar archivos referenciados
-                if (result.referenced_files && result.referenced_files.length > 0) {
-                    currentReferences = result.referenced_files;
-                    displayReferences(result.referenced_files);
-                }
+            const render = () => {
+                renderPending = false;
+                answerMsg.querySelector('.message-content').innerHTML = marked.parse(answer);
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+            };
 
-                // Mostrar contador de contexto
-                if (result.context_used > 0) {
-                    addContextInfo(result.context_used);
+            await readEventStream(response, (event, data) => {
+                if (event === 'token') {
+                    if (!answerMsg) {
+                        // Primer token: sustituir el loading por la respuesta
+                        loadingMsg.remove();
+                        answerMsg = addMessage('assistant', '', true);
+                    }
+
+                    answer += data.token;
+                    if (!renderPending) {
+                        renderPending = true;
+                        requestAnimationFrame(render);
+                    }
+                } else if (event === 'done') {
+                    // Mostrar archivos referenciados
+                    if (data.referenced_files && data.referenced_files.length > 0) {
+                        currentReferences = data.referenced_files;
+                        displayReferences(data.referenced_files);
+                    }
+
+                    // Mostrar contador de contexto
+                    if (data.context_used > 0) {
+                        addContextInfo(data.context_used);
+                    }
+                } else if (event === 'error') {
+                    throw new Error(data.message);
                 }
+            });
+
+            loadingMsg.remove();
+
+            if (answerMsg) {
+                render();
             } else {
-                addMessage('assistant', `❌ Error: ${result.message}`);
+                addMessage('assistant', '⚠️ No pude generar una respuesta. Intenta reformular tu pregunta.');
             }
 
         } catch (error) {
             loadingMsg.remove();
             console.error('Error:', error);
-            addMessage('assistant', '❌ Error al comunicarse con el asistente. Verifica que Ollama esté corriendo.');
+            addMessage('assistant', `❌ Error al comunicarse con el asistente: ${error.message}. Verifica que Ollama esté corriendo.`);
         } finally {
             // Rehabilitar input
             questionInput.disabled = false;
@@ -146,6 +175,38 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // Leer un stream Server-Sent Events de una respuesta fetch (POST)
+    async function readEventStream(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+
+            // Los eventos van separados por una línea en blanco
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                });
+
+                if (data) {
+                    onEvent(event, JSON.parse(data));
+                }
+            }
+        }
+    }
+
     // Añadir mensaje al chat
     function addMessage(sender, content, isHtml = false) {
         const messageDiv = document.createElement('div');
@@ -3,20 +3,39 @@
 document.addEventListener('DOMContentLoaded', function() {
     const entriesGrid = document.getElementById('entriesGrid');
     const projectFilter = document.getElementById('projectFilter');
+    const branchFilter = document.getElementById('branchFilter');
+    const authorFilter = document.getElementById('authorFilter');
+    const dateFromFilter = document.getElementById('dateFromFilter');
+    const dateToFilter = document.getElementById('dateToFilter');
     const searchInput = document.getElementById('searchInput');
+    const loadMoreSentinel = document.getElementById('loadMoreSentinel');
     const entryModal = document.getElementById('entryModal');
     const closeModal = document.getElementById('closeModal');
     const shutdownBtn = document.getElementById('shutdownBtn');
+    const exportProjectBtn = document.getElementById('exportProjectBtn');
 
-    let allEntries = [];
+    const PAGE_SIZE = 50;
+
+    // Estado de la paginación
+    let nextCursor = null;
+    let isLoading = false;
+    let requestId = 0;
+    let searchTimeout = null;
 
     // Cargar entradas al iniciar
-    loadEntries();
+    loadEntries(true);
     loadProjects();
 
-    // Event listeners
-    projectFilter.addEventListener('change', filterEntries);
-    searchInput.addEventListener('input', filterEntries);
+    // Event listeners (los filtros se aplican en el servidor)
+    projectFilter.addEventListener('change', async () => {
+        await loadBranches(projectFilter.value);
+        loadEntries(true);
+    });
+    branchFilter.addEventListener('change', () => loadEntries(true));
+    dateFromFilter.addEventListener('change', () => loadEntries(true));
+    dateToFilter.addEventListener('change', () => loadEntries(true));
+    authorFilter.addEventListener('input', debouncedReload);
+    searchInput.addEventListener('input', debouncedReload);
     closeModal.addEventListener('click', () => entryModal.classList.add('hidden'));
     entryModal.addEventListener('click', (e) => {
         if (e.target === entryModal) {
@@ -24,6 +43,14 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    // Cargar la siguiente página cuando el marcador entra en pantalla
+    const observer = new IntersectionObserver((observed) => {
+        if (observed[0].isIntersecting && nextCursor && !isLoading) {
+            loadEntries(false);
+        }
+    }, { rootMargin: '400px' });
+    observer.observe(loadMoreSentinel);
+
     // Detener aplicación
     shutdownBtn.addEventListener('click', async function() {
         if (confirm('¿Seguro que quieres detener la aplicación?')) {
@@ -38,19 +65,163 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
-    // Cargar todas las entradas
-    async function loadEntries() {
+    // Exportar el proyecto entero (un PDF por rama) en segundo plano
+    exportProjectBtn.addEventListener('click', exportProject);
+
+    async function exportProject() {
+        const project = projectFilter.value;
+        if (!project) {
+            alert('Elige primero un proyecto en el filtro');
+            return;
+        }
+
+        const options = {};
+        if (branchFilter.value) options.branches = [branchFilter.value];
+        if (dateFromFilter.value) options.date_from = dateFromFilter.value;
+        if (dateToFilter.value) options.date_to = dateToFilter.value;
+
+        const originalText = exportProjectBtn.textContent;
+        exportProjectBtn.disabled = true;
+        exportProjectBtn.textContent = '⏳ En cola...';
+
+        try {
+            const response = await fetch(`/api/export_project/${encodeURIComponent(project)}`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(options)
+            });
+            const result = await response.json();
+
+            if (!result.success) {
+                throw new Error(result.message || 'No se pudo iniciar la exportación');
+            }
+
+            await waitForExport(result.job_id);
+
+            // El ZIP ya está en disco: descarga directa, sin pasar por un blob
+            const a = document.createElement('a');
+            a.href = `/api/export_project/download/${encodeURIComponent(result.job_id)}`;
+            document.body.appendChild(a);
+            a.click();
+            a.remove();
+
+            exportProjectBtn.textContent = '✅ Descargado';
+            setTimeout(() => {
+                exportProjectBtn.textContent = originalText;
+                exportProjectBtn.disabled = false;
+            }, 2000);
+        } catch (error) {
+            console.error('Error:', error);
+            alert('Error al exportar el proyecto: ' + error.message);
+            exportProjectBtn.textContent = originalText;
+            exportProjectBtn.disabled = false;
+        }
+    }
+
+    // Consultar el trabajo hasta que termine, mostrando las ramas hechas
+    async function waitForExport(jobId) {
+        const pollInterval = 1000;
+
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, pollInterval));
+
+            const response = await fetch(`/api/jobs/${encodeURIComponent(jobId)}`);
+            const result = await response.json();
+            if (!result.success) throw new Error(result.message);
+
+            const job = result.job;
+            if (job.status === 'done') return job;
+            if (job.status === 'error') throw new Error(job.error);
+
+            const progress = job.progress;
+            exportProjectBtn.textContent = progress
+                ? `⏳ ${progress.done}/${progress.total} ramas...`
+                : '⏳ En cola...';
+        }
+    }
+
+    function debouncedReload() {
+        clearTimeout(searchTimeout);
+        searchTimeout = setTimeout(() => loadEntries(true), 300);
+    }
+
+    function buildEntriesUrl() {
+        const params = new URLSearchParams({ limit: PAGE_SIZE });
+        const filters = {
+            project: projectFilter.value,
+            branch: branchFilter.value,
+            author: authorFilter.value.trim(),
+            date_from: dateFromFilter.value,
+            date_to: dateToFilter.value,
+            q: searchInput.value.trim()
+        };
+
+        Object.entries(filters).forEach(([key, value]) => {
+            if (value) params.set(key, value);
+        });
+
+        if (nextCursor) params.set('after', nextCursor);
+
+        return `/api/entries?${params.toString()}`;
+    }
+
+    // Cargar entradas página a página (reset = volver a la primera)
+    async function loadEntries(reset) {
+        const currentRequest = reset ? ++requestId : requestId;
+
+        if (reset) {
+            nextCursor = null;
+        }
+
+        isLoading = true;
+
         try {
-            const response = await fetch('/api/entries');
+            const response = await fetch(buildEntriesUrl());
             const result = await response.json();
 
+            // Ignorar respuestas de filtros que ya han cambiado
+            if (currentRequest !== requestId) return;
+
             if (result.success) {
-                allEntries = result.entries;
-                displayEntries(allEntries);
+                if (reset) {
+                    displayEntries(result.entries);
+                } else {
+                    appendEntries(result.entries);
+                }
+
+                nextCursor = result.next_cursor;
+                loadMoreSentinel.classList.toggle('hidden', !result.has_more);
             }
         } catch (error) {
             console.error('Error cargando entradas:', error);
             entriesGrid.innerHTML = '<p style="color: white; text-align: center;">Error cargando entradas</p>';
+        } finally {
+            if (currentRequest === requestId) {
+                isLoading = false;
+            }
+        }
+    }
+
+    // Cargar ramas del proyecto seleccionado
+    async function loadBranches(project) {
+        branchFilter.innerHTML = '<option value="">Todas las ramas</option>';
+
+        if (!project) return;
+
+        try {
+            const response = await fetch(`/api/branches/${encodeURIComponent(project)}`);
+            const result = await response.json();
+
+            if (result.success) {
+                result.branches.forEach(branch => {
+                    const option = document.createElement('option');
+                    option.value = branch;
+                    option.textContent = branch;
+                    branchFilter.appendChild(option);
+                });
+            }
+        } catch (error) {
+            console.error('Error cargando ramas:', error);
         }
     }
 
@@ -86,12 +257,21 @@ document.addEventListener('DOMContentLoaded', function() {
         return;
     }
 
-    entriesGrid.innerHTML = entries.map(entry => {
+    entriesGrid.innerHTML = renderEntries(entries);
+}
+
+    // Añadir una página más al final del grid
+    function appendEntries(entries) {
+        entriesGrid.insertAdjacentHTML('beforeend', renderEntries(entries));
+    }
+
+    function renderEntries(entries) {
+    return entries.map(entry => {
         const title = entry.commit_problema || 'Sin título';
         const author = entry.autor || 'Anónimo';
         const branch = entry.rama || 'sin-rama';
         const date = formatDate(entry.fecha);
-        const preview = extractPreview(entry.content);
+        const preview = entry.preview || '';
 
         return `
             <div class="entry-card">
@@ -120,23 +300,6 @@ document.addEventListener('DOMContentLoaded', function() {
     }).join('');
 }
 
-    // Filtrar entradas
-    function filterEntries() {
-        const projectValue = projectFilter.value.toLowerCase();
-        const searchValue = searchInput.value.toLowerCase();
-
-        const filtered = allEntries.filter(entry => {
-            const matchProject = !projectValue || entry.project.toLowerCase() === projectValue;
-            const matchSearch = !searchValue ||
-                (entry.commit_problema && entry.commit_problema.toLowerCase().includes(searchValue)) ||
-                (entry.content && entry.content.toLowerCase().includes(searchValue));
-
-            return matchProject && matchSearch;
-        });
-
-        displayEntries(filtered);
-    }
-
     // Abrir modal con entrada completa
     window.openEntry = async function(project, filename) {
         try {
@@ -159,17 +322,6 @@ document.addEventListener('DOMContentLoaded', function() {
     };
 
     // Utilidades
-    function extractPreview(content) {
-        // Extraer texto después del frontmatter y primera línea
-        const parts = content.split('---');
-        if (parts.length >= 3) {
-            const body = parts[2].trim();
-            const lines = body.split('\n').filter(l => l.trim() && !l.startsWith('#'));
-            return lines.slice(0, 3).join(' ').substring(0, 150) + '...';
-        }
-        return content.substring(0, 150) + '...';
-    }
-
     function formatDate(dateStr) {
         if (!dateStr) return 'Fecha desconocida';
 
@@ -0,0 +1,21 @@
+import importlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Los tests importan los módulos de la app desde la raíz del repositorio
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    """app.py importado una sola vez, con un diario vacío y perfilado con token 'secret'"""
+    os.environ['DIARY_BASE_PATH'] = tempfile.mkdtemp(prefix='diary-test-')
+    os.environ['DIARY_PROFILING_TOKEN'] = 'secret'
+    module = importlib.import_module('app')
+    # Sin cola, watcher ni procesos: cada test arranca lo que necesita
+    module._background_started = True
+    return module
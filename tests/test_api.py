@@ -0,0 +1,52 @@
+def test_projects_include_folders_without_entries(app_module):
+    base = app_module.BASE_PATH
+    (base / 'sin-entradas').mkdir(exist_ok=True)
+    entries = base / 'con-entradas' / 'entries'
+    entries.mkdir(parents=True, exist_ok=True)
+    (entries / 'a.md').write_text('---\nproyecto: con-entradas\nfecha: 2024-01-01\n---\n\nHola\n',
+                                  encoding='utf-8')
+
+    projects = app_module.app.test_client().get('/api/projects').get_json()['projects']
+
+    assert {'sin-entradas', 'con-entradas'} <= set(projects)
+    assert not any(project.startswith('.') for project in projects)
+
+
+def write_page_entries(app_module, count):
+    entries = app_module.BASE_PATH / 'paginas' / 'entries'
+    entries.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        (entries / f'{i}.md').write_text(
+            f'---\nproyecto: paginas\nrama: main\ncommit_problema: Entrada {i}\n'
+            f'fecha: 2024-02-01 10:00:00\n---\n\nContenido {i}\n', encoding='utf-8')
+    app_module.ENTRY_INDEX.refresh()
+
+
+def test_entries_are_paged_without_content_by_default(app_module):
+    write_page_entries(app_module, 3)
+    client = app_module.app.test_client()
+
+    first = client.get('/api/entries?project=paginas&limit=2').get_json()
+    assert first['count'] == 2 and first['has_more']
+    assert all('content' not in entry for entry in first['entries'])
+
+    second = client.get(f"/api/entries?project=paginas&limit=2&after={first['next_cursor']}").get_json()
+    assert second['count'] == 1 and not second['has_more'] and second['next_cursor'] is None
+    filenames = [entry['filename'] for entry in first['entries'] + second['entries']]
+    assert sorted(filenames) == ['0.md', '1.md', '2.md']
+
+
+def test_entries_include_content_only_with_fields_full(app_module):
+    write_page_entries(app_module, 1)
+    client = app_module.app.test_client()
+
+    entries = client.get('/api/entries?project=paginas&fields=full&limit=200').get_json()['entries']
+
+    assert entries and all('Contenido' in entry['content'] for entry in entries)
+
+
+def test_entries_reject_bad_limit_and_cursor(app_module):
+    client = app_module.app.test_client()
+
+    assert client.get('/api/entries?limit=muchas').status_code == 400
+    assert client.get('/api/entries?after=basura').status_code == 400
@@ -0,0 +1,74 @@
+import json
+import uuid
+
+import pytest
+
+from benchmarks.ollama_stub import RESPONSE_TOKENS, OllamaStub
+
+
+@pytest.fixture
+def stub(app_module, monkeypatch):
+    stub = OllamaStub().start()
+    monkeypatch.setattr(app_module.OLLAMA_CLIENT, 'base_url', stub.url)
+    monkeypatch.setattr(app_module, 'SEMANTIC_SEARCH', False)
+
+    entries = app_module.BASE_PATH / 'asistente' / 'entries'
+    entries.mkdir(parents=True, exist_ok=True)
+    (entries / 'timeout.md').write_text(
+        '---\nproyecto: asistente\nrama: fix/timeout\ncommit_problema: Timeout de la conexión\n'
+        'fecha: 2024-04-01 10:00:00\n---\n\nEl timeout de la zarandaja cortaba el guardado.\n',
+        encoding='utf-8')
+    app_module.ENTRY_INDEX.refresh()
+
+    yield stub
+    stub.stop()
+
+
+def ask(app_module, question):
+    response = app_module.app.test_client().post(
+        '/api/assistant/stream',
+        json={'question': question, 'project': 'asistente', 'mode': 'search'}
+    )
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+
+    events = []
+    body = response.get_data(as_text=True)
+    assert body.endswith('\n\n')
+    for block in body.split('\n\n')[:-1]:
+        event_line, data_line = block.split('\n')
+        assert event_line.startswith('event: ') and data_line.startswith('data: ')
+        events.append((event_line[len('event: '):], json.loads(data_line[len('data: '):])))
+    return events
+
+
+def test_stream_sends_tokens_then_done_with_context(app_module, stub):
+    # Pregunta única: la respuesta no puede venir de la caché del LLM
+    events = ask(app_module, f'timeout zarandaja {uuid.uuid4().hex}')
+
+    names = [name for name, _data in events]
+    assert names == ['token'] * len(RESPONSE_TOKENS) + ['done']
+    assert ''.join(data['token'] for name, data in events if name == 'token').split() == RESPONSE_TOKENS
+
+    # Otras entradas del diario compartido pueden entrar también en el contexto
+    done = events[-1][1]
+    references = [(ref['project'], ref['filename']) for ref in done['referenced_files']]
+    assert references[0] == ('asistente', 'timeout.md')
+    assert done['context_used'] == len(references)
+    assert stub.calls['generate'] == 1
+
+
+def test_stream_reports_ollama_failure_as_error_event(app_module, stub, monkeypatch):
+    # Ruta que el stub no conoce: Ollama contesta 404
+    monkeypatch.setattr(app_module.OLLAMA_CLIENT, 'base_url', stub.url + '/otra')
+
+    events = ask(app_module, f'¿Qué pasó con el timeout? {uuid.uuid4().hex}')
+
+    assert [name for name, _data in events] == ['error']
+    assert 'HTTP 404' in events[0][1]['message']
+
+
+def test_stream_requires_a_question(app_module):
+    response = app_module.app.test_client().post('/api/assistant/stream', json={'question': ''})
+
+    assert response.status_code == 400
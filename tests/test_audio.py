@@ -0,0 +1,40 @@
+import numpy as np
+
+from core.audio import normalize_gain, prepare_for_recognition, speech_segments
+
+
+RATE = 16000
+
+
+def tone(seconds, amplitude=0.5, frequency=220.0):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def test_constant_energy_signal_is_one_segment():
+    samples = normalize_gain(tone(2.0))
+
+    assert speech_segments(samples, RATE) == [(0, len(samples))]
+
+
+def test_silence_has_no_segments():
+    assert speech_segments(np.zeros(RATE * 2, dtype=np.float32), RATE) == []
+
+
+def test_speech_between_silences_is_trimmed():
+    silence = np.zeros(RATE, dtype=np.float32)
+    samples = np.concatenate((silence, tone(1.0), silence))
+
+    [(start, end)] = speech_segments(samples, RATE)
+
+    assert 0 < start < RATE
+    assert 2 * RATE < end < len(samples)
+
+
+def test_constant_dictation_is_not_dropped():
+    pcm = (tone(2.0) * 32767).astype('<i2').tobytes()
+
+    prepared = prepare_for_recognition(pcm, RATE, 1, 2)
+
+    assert len(prepared['segments']) == 1
+    assert prepared['voiced_seconds'] == 2.0
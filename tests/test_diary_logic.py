@@ -0,0 +1,174 @@
+import os
+
+import pytest
+
+from core import diary_logic
+from core.diary_logic import EntryIndex, IndexWatcher
+
+
+def write_entry(base, project, name, title, mtime=None):
+    path = base / project / 'entries' / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f'---\nproyecto: {project}\ncommit_problema: {title}\nfecha: 2024-01-01\n---\n\nCuerpo\n',
+                    encoding='utf-8')
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_refresh_counts_only_indexed_entries(tmp_path):
+    index = EntryIndex(tmp_path)
+    write_entry(tmp_path, 'app', 'ok.md', 'Bien')
+    broken = tmp_path / 'app' / 'entries' / 'broken.md'
+    broken.write_bytes(b'---\ncommit_problema: \xff\xfe\n---\n')
+
+    changes = index.refresh()
+
+    assert changes == {'added': 1, 'modified': 0, 'deleted': 0}
+    assert [entry['filename'] for entry in index.list_entries('app')] == ['ok.md']
+
+
+def test_change_during_read_is_picked_up_by_next_refresh(tmp_path, monkeypatch):
+    index = EntryIndex(tmp_path)
+    path = write_entry(tmp_path, 'app', 'a.md', 'Viejo', mtime=1_700_000_000)
+    real_fstat = os.fstat
+
+    def fstat_then_edit(fd):
+        stat = real_fstat(fd)
+        monkeypatch.setattr(diary_logic.os, 'fstat', real_fstat)
+        write_entry(tmp_path, 'app', 'a.md', 'Nuevo con más texto', mtime=1_700_000_100)
+        return stat
+
+    monkeypatch.setattr(diary_logic.os, 'fstat', fstat_then_edit)
+    index.refresh()
+
+    assert index.refresh() == {'added': 0, 'modified': 1, 'deleted': 0}
+    assert index.get_entry('app', 'a.md')['commit_problema'] == 'Nuevo con más texto'
+    assert path.stat().st_mtime == 1_700_000_100
+
+
+def write_branch_entry(base, project, name, branch, author='Ana'):
+    path = base / project / 'entries' / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f'---\nautor: {author}\nrama: {branch}\nfecha: 2024-01-01\n---\n\nCuerpo\n', encoding='utf-8')
+
+
+def test_branch_and_author_match_ignores_case_beyond_ascii(tmp_path):
+    index = EntryIndex(tmp_path)
+    write_branch_entry(tmp_path, 'app', 'a.md', 'Ñandú/Árbol', author='Íñigo')
+    write_branch_entry(tmp_path, 'app', 'b.md', 'otra')
+    index.refresh()
+
+    entries = index.list_entries(project='app', branch='ñandú/árbol')
+    assert [entry['filename'] for entry in entries] == ['a.md']
+
+    matches, _cursor = index.query_entries(project='app', author='ÍÑIGO')
+    assert [entry['filename'] for entry in matches] == ['a.md']
+
+
+def test_listings_keep_code_point_order(tmp_path):
+    index = EntryIndex(tmp_path)
+    names = ['zeta', 'Árbol', 'alpha', 'Beta']
+    for i, name in enumerate(names):
+        write_branch_entry(tmp_path, name, 'a.md', f'rama-{name}')
+        write_branch_entry(tmp_path, 'app', f'{i}.md', name)
+    index.refresh()
+
+    assert index.list_projects() == sorted(names + ['app'])
+    assert index.list_branches('app') == sorted(names)
+
+
+@pytest.mark.skipif(not IndexWatcher.is_supported(), reason='inotify solo existe en Linux')
+def test_inotify_overflow_refreshes_every_project(tmp_path):
+    index = EntryIndex(tmp_path)
+    write_entry(tmp_path, 'app', 'a.md', 'Primera')
+    index.refresh()
+    watcher = IndexWatcher(index)
+
+    # Cambios cuyos eventos se perdieron, incluido un proyecto nuevo sin vigilar
+    write_entry(tmp_path, 'app', 'b.md', 'Segunda')
+    write_entry(tmp_path, 'nuevo', 'c.md', 'Tercera')
+    overflow = IndexWatcher.EVENT_HEADER.pack(-1, IndexWatcher.IN_Q_OVERFLOW, 0, 0)
+
+    try:
+        projects = watcher._parse_events(overflow)
+        assert None in projects
+        watcher._refresh(projects)
+    finally:
+        os.close(watcher._fd)
+
+    assert {(entry['project'], entry['filename']) for entry in index.list_entries()} == {
+        ('app', 'a.md'), ('app', 'b.md'), ('nuevo', 'c.md')
+    }
+    assert 'nuevo' in watcher._watches.values()
+
+
+def write_meta_entry(base, project, name, fecha, rama='main', autor='ana', title='Entrada', body='Cuerpo'):
+    path = base / project / 'entries' / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(f'---\nautor: {autor}\nproyecto: {project}\nrama: {rama}\ncommit_problema: {title}\n'
+                    f'fecha: {fecha}\n---\n\n{body}\n', encoding='utf-8')
+    return path
+
+
+def all_pages(index, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        entries, cursor = index.query_entries(after=cursor, limit=limit, **filters)
+        pages.append([(entry['project'], entry['filename']) for entry in entries])
+        if cursor is None:
+            return pages
+
+
+def test_query_cursor_is_stable_across_identical_dates(tmp_path):
+    index = EntryIndex(tmp_path)
+    for project in ('app', 'web'):
+        for i in range(5):
+            write_meta_entry(tmp_path, project, f'{i}.md', '2024-03-01 10:00:00')
+    write_meta_entry(tmp_path, 'app', 'nueva.md', '2024-03-02 09:00:00')
+    index.refresh()
+
+    pages = all_pages(index, limit=3)
+    seen = [key for page in pages for key in page]
+
+    assert [len(page) for page in pages] == [3, 3, 3, 2]
+    assert len(set(seen)) == 11
+    assert seen[0] == ('app', 'nueva.md')
+    # Misma fecha: desempata por proyecto y archivo, de mayor a menor
+    assert seen[1:] == sorted(seen[1:], reverse=True)
+
+    # Una entrada nueva no desplaza las páginas ya pedidas
+    _first, cursor = index.query_entries(limit=3)
+    write_meta_entry(tmp_path, 'web', '9.md', '2024-03-05 10:00:00')
+    index.refresh()
+    second, _cursor = index.query_entries(after=cursor, limit=3)
+    assert [(entry['project'], entry['filename']) for entry in second] == pages[1]
+
+
+def test_query_filters_combine(tmp_path):
+    index = EntryIndex(tmp_path)
+    write_meta_entry(tmp_path, 'app', 'a.md', '2024-01-10 10:00:00', rama='main', autor='Ana')
+    write_meta_entry(tmp_path, 'app', 'b.md', '2024-01-20 10:00:00', rama='Main', autor='luis')
+    write_meta_entry(tmp_path, 'app', 'c.md', '2024-01-31 18:00:00', rama='feature/x', autor='ana',
+                     title='Fallo del parser', body='Error de sintaxis en el lexer')
+    write_meta_entry(tmp_path, 'web', 'd.md', '2024-01-15 10:00:00', rama='main', autor='ana')
+    index.refresh()
+
+    def names(**filters):
+        return [entry['filename'] for entry in index.query_entries(limit=50, **filters)[0]]
+
+    assert names(project='app', branch='MAIN') == ['b.md', 'a.md']
+    assert names(branch='main', author='ANA') == ['d.md', 'a.md']
+    assert names(date_from='2024-01-15', date_to='2024-01-20') == ['b.md', 'd.md']
+    # date_to sin hora incluye el día entero
+    assert names(project='app', date_to='2024-01-31') == ['c.md', 'b.md', 'a.md']
+    assert names(author='ana', text='parser') == ['c.md']
+    assert names(project='app', text='lexer sintaxis') == ['c.md']
+    assert names(project='web', text='parser') == []
+
+
+def test_query_rejects_invalid_cursor(tmp_path):
+    index = EntryIndex(tmp_path)
+
+    with pytest.raises(ValueError):
+        index.query_entries(after='no-es-un-cursor')
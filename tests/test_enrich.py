@@ -0,0 +1,57 @@
+import pytest
+
+
+@pytest.fixture
+def saved_entry(app_module):
+    data = {'author': 'ana', 'project': 'enrich', 'branch': 'main',
+            'commit_problem': 'Arreglo', 'notes': 'notas originales'}
+    filepath = app_module.ENTRY_INDEX.entry_path('enrich', 'entrada.md')
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    filepath.write_text(app_module.generate_markdown(data, data['notes'], 'ts', '2024-01-01 10:00:00'),
+                        encoding='utf-8')
+
+    payload = {'data': data, 'project': 'enrich', 'filename': 'entrada.md', 'timestamp': 'ts',
+               'fecha': '2024-01-01 10:00:00', 'signature': app_module.file_signature(filepath)}
+    return filepath, payload
+
+
+def test_enrich_rewrites_untouched_entry(app_module, saved_entry, monkeypatch):
+    filepath, payload = saved_entry
+    monkeypatch.setattr(app_module, 'improve_with_ai', lambda data: 'Resumen mejorado')
+
+    result = app_module.enrich_entry_job('job-1', payload)
+
+    assert result['characters'] == len('Resumen mejorado')
+    assert 'Resumen mejorado' in filepath.read_text(encoding='utf-8')
+
+
+def test_enrich_keeps_hand_edits_made_before_it_runs(app_module, saved_entry, monkeypatch):
+    filepath, payload = saved_entry
+    filepath.write_text('editada a mano', encoding='utf-8')
+    monkeypatch.setattr(app_module, 'improve_with_ai', lambda data: pytest.fail('no debe llamar a la IA'))
+
+    assert app_module.enrich_entry_job('job-2', payload)['edited'] is True
+    assert filepath.read_text(encoding='utf-8') == 'editada a mano'
+
+
+def test_enrich_keeps_hand_edits_made_while_ai_runs(app_module, saved_entry, monkeypatch):
+    filepath, payload = saved_entry
+
+    def improve(data):
+        filepath.write_text('editada mientras tanto', encoding='utf-8')
+        return 'Resumen mejorado'
+
+    monkeypatch.setattr(app_module, 'improve_with_ai', improve)
+
+    assert app_module.enrich_entry_job('job-3', payload)['edited'] is True
+    assert filepath.read_text(encoding='utf-8') == 'editada mientras tanto'
+    assert not filepath.with_suffix('.md.tmp').exists()
+
+
+def test_enrich_without_improvement_is_not_an_error(app_module, saved_entry, monkeypatch):
+    filepath, payload = saved_entry
+    before = filepath.read_text(encoding='utf-8')
+    monkeypatch.setattr(app_module, 'improve_with_ai', lambda data: data['notes'])
+
+    assert app_module.enrich_entry_job('job-4', payload)['unchanged'] is True
+    assert filepath.read_text(encoding='utf-8') == before
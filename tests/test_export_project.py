@@ -0,0 +1,97 @@
+import io
+import zipfile
+
+import pytest
+
+pytest.importorskip('reportlab')
+
+
+@pytest.fixture
+def export_project(app_module):
+    entries = app_module.BASE_PATH / 'exportar' / 'entries'
+    entries.mkdir(parents=True, exist_ok=True)
+    for name, rama, fecha in [('a.md', 'main', '2024-01-10 10:00:00'),
+                              ('b.md', 'feature/x', '2024-02-10 10:00:00'),
+                              ('c.md', 'Main', '2024-03-10 10:00:00'),
+                              ('d.md', 'docs', '2024-02-20 10:00:00')]:
+        (entries / name).write_text(
+            f'---\nproyecto: exportar\nrama: {rama}\ncommit_problema: Entrada {name}\n'
+            f'fecha: {fecha}\n---\n\nContenido de {name}\n', encoding='utf-8')
+    app_module.ENTRY_INDEX.refresh()
+    return 'exportar'
+
+
+def run_job(app_module, job_id, monkeypatch):
+    """Ejecuta el trabajo en este hilo y devuelve el avance que fue informando"""
+    progress = []
+    set_progress = app_module.JOB_QUEUE.set_progress
+
+    def record(job, **fields):
+        progress.append(fields)
+        set_progress(job, **fields)
+
+    monkeypatch.setattr(app_module.JOB_QUEUE, 'set_progress', record)
+    app_module.JOB_QUEUE._run(job_id)
+    return progress
+
+
+def test_export_filters_by_date_and_branch(app_module, export_project, monkeypatch):
+    client = app_module.app.test_client()
+    response = client.post(f'/api/export_project/{export_project}', json={
+        'date_from': '2024-01-01', 'date_to': '2024-02-28', 'branches': ['MAIN', 'feature/x']
+    })
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+
+    # Aún pendiente: no se puede descargar
+    assert client.get(f'/api/export_project/download/{job_id}').status_code == 409
+
+    progress = run_job(app_module, job_id, monkeypatch)
+
+    assert progress[0] == {'done': 0, 'total': 2, 'current': 'main'}
+    assert [step['done'] for step in progress] == [0, 1, 2]
+    assert progress[-1] == {'done': 2, 'total': 2}
+
+    job = client.get(f'/api/jobs/{job_id}').get_json()['job']
+    assert job['status'] == 'done'
+    assert job['progress'] == {'done': 2, 'total': 2}
+    assert job['result']['entries'] == 2
+    assert job['result']['filename'] == 'exportar_2024-01-01_2024-02-28.zip'
+
+    download = client.get(f'/api/export_project/download/{job_id}')
+    assert download.status_code == 200
+    assert 'exportar_2024-01-01_2024-02-28.zip' in download.headers['Content-Disposition']
+    with zipfile.ZipFile(io.BytesIO(download.data)) as archive:
+        assert sorted(archive.namelist()) == ['exportar_feature-x.pdf', 'exportar_main.pdf']
+        assert archive.read('exportar_main.pdf').startswith(b'%PDF')
+
+
+def test_export_without_matching_entries_fails(app_module, export_project, monkeypatch):
+    client = app_module.app.test_client()
+    job_id = client.post(f'/api/export_project/{export_project}',
+                         json={'branches': ['no-existe']}).get_json()['job_id']
+
+    run_job(app_module, job_id, monkeypatch)
+
+    job = app_module.JOB_QUEUE.get(job_id)
+    assert job['status'] == 'error'
+    assert 'No hay entradas' in job['error']
+    assert client.get(f'/api/export_project/download/{job_id}').status_code == 409
+
+
+def test_download_refuses_unknown_and_foreign_jobs(app_module, export_project):
+    client = app_module.app.test_client()
+    other_job = app_module.JOB_QUEUE.submit('enrich', {})
+
+    assert client.get('/api/export_project/download/no-existe').status_code == 404
+    assert client.get(f'/api/export_project/download/{other_job}').status_code == 404
+
+
+def test_export_validates_request(app_module, export_project):
+    client = app_module.app.test_client()
+
+    assert client.post('/api/export_project/no-existe', json={}).status_code == 404
+    assert client.post(f'/api/export_project/{export_project}',
+                       json={'date_from': '10/01/2024'}).status_code == 400
+    assert client.post(f'/api/export_project/{export_project}',
+                       json={'branches': 'main'}).status_code == 400
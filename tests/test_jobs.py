@@ -0,0 +1,98 @@
+import threading
+import time
+
+from core.jobs import JobQueue, DONE, PENDING, RUNNING
+
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] not in (PENDING, RUNNING):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'El trabajo {job_id} no terminó')
+
+
+def test_job_is_claimed_by_a_single_queue(tmp_path):
+    runs = []
+    lock = threading.Lock()
+
+    def handler(job_id, payload):
+        with lock:
+            runs.append(job_id)
+        time.sleep(0.05)
+        return {}
+
+    queues = [JobQueue(tmp_path / 'jobs.db', workers=2) for _ in range(2)]
+    for queue in queues:
+        queue.register('work', handler)
+
+    for queue in queues:
+        queue.start()
+
+    job_id = queues[0].submit('work', {})
+    # Simula que otro proceso con la misma base también intenta ejecutarlo
+    queues[1]._executor.submit(queues[1]._run, job_id)
+
+    assert wait_for(queues[0], job_id)['status'] == DONE
+    for queue in queues:
+        queue.shutdown()
+
+    assert runs == [job_id]
+
+
+def test_interrupted_job_is_resumed_on_start(tmp_path):
+    queue = JobQueue(tmp_path / 'jobs.db')
+    queue.register('work', lambda job_id, payload: {'ok': True})
+    job_id = queue.submit('work', {})
+    queue._update(job_id, status=RUNNING)
+
+    queue.start()
+    try:
+        assert wait_for(queue, job_id)['result'] == {'ok': True}
+    finally:
+        queue.shutdown()
+
+
+def test_unique_submit_reuses_the_pending_job(tmp_path):
+    queue = JobQueue(tmp_path / 'jobs.db')
+    queue.register('scan', lambda job_id, payload: {}, background=True)
+
+    first = queue.submit('scan', {}, unique=True)
+    assert queue.submit('scan', {}, unique=True) == first
+    assert queue.counts() == {PENDING: 1}
+
+
+def test_background_jobs_do_not_delay_user_jobs(tmp_path):
+    release = threading.Event()
+    queue = JobQueue(tmp_path / 'jobs.db', workers=1, background_workers=1)
+    queue.register('scan', lambda job_id, payload: release.wait(5) and {}, background=True)
+    queue.register('work', lambda job_id, payload: {'ok': True})
+    queue.start()
+
+    try:
+        for _ in range(3):
+            queue.submit('scan', {})
+        job_id = queue.submit('work', {})
+        assert wait_for(queue, job_id, timeout=2)['status'] == DONE
+    finally:
+        release.set()
+        queue.shutdown()
+
+
+def test_start_prunes_old_finished_jobs(tmp_path):
+    queue = JobQueue(tmp_path / 'jobs.db', retention_days=7)
+    queue.register('work', lambda job_id, payload: {})
+    old = queue.submit('work', {})
+    recent = queue.submit('work', {})
+    queue._update(recent, status=DONE)
+    queue._update(old, status=DONE)
+    with queue._conn:
+        queue._conn.execute('UPDATE jobs SET updated_at = ? WHERE id = ?', (time.time() - 8 * 86400, old))
+
+    queue.start()
+    queue.shutdown()
+
+    assert queue.get(old) is None
+    assert queue.get(recent)['status'] == DONE
@@ -0,0 +1,139 @@
+import threading
+
+import pytest
+
+from core import llm_cache
+from core.llm_cache import LLMCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = LLMCache(tmp_path / 'cache.db', ttl=60)
+    cache.put('k', 'respuesta')
+
+    clock[0] += 59
+    assert cache.get('k') == 'respuesta'
+
+    clock[0] += 2
+    assert cache.get('k') is None
+    assert cache.stats()['entries'] == 0
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted_by_size(tmp_path, clock):
+    cache = LLMCache(tmp_path / 'cache.db', max_bytes=30)
+
+    for key in ('vieja', 'usada', 'media'):
+        cache.put(key, 'x' * 10)
+        clock[0] += 1
+
+    # Leer 'vieja' la convierte en la más reciente
+    assert cache.get('vieja') is not None
+    clock[0] += 1
+    cache.put('nueva', 'x' * 10)
+
+    assert cache.get('usada') is None
+    assert all(cache.get(key) is not None for key in ('vieja', 'media', 'nueva'))
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] == 30
+
+
+def test_max_entries_limit(tmp_path, clock):
+    cache = LLMCache(tmp_path / 'cache.db', max_entries=2)
+
+    for key in ('a', 'b', 'c'):
+        cache.put(key, key)
+        clock[0] += 1
+
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 2
+
+
+def test_different_tag_invalidates_entry(tmp_path):
+    cache = LLMCache(tmp_path / 'cache.db')
+    cache.put('k', 'respuesta', tag=3)
+
+    # La etiqueta se compara como texto: 3 y '3' son la misma generación
+    assert cache.get('k', tag='3') == 'respuesta'
+    assert cache.get('k', tag=4) is None
+    # Se borró al detectarla obsoleta: tampoco vale con la etiqueta vieja
+    assert cache.get('k', tag=3) is None
+
+
+def test_make_key_depends_on_model_prompt_and_options():
+    key = LLMCache.make_key('llama', 'hola', {'temperature': 0.2, 'top_p': 0.9})
+
+    assert key == LLMCache.make_key('llama', 'hola', {'top_p': 0.9, 'temperature': 0.2})
+    assert key != LLMCache.make_key('llama', 'hola', {'temperature': 0.3, 'top_p': 0.9})
+    assert key != LLMCache.make_key('otro', 'hola', {'temperature': 0.2, 'top_p': 0.9})
+
+
+def test_identical_requests_in_flight_compute_once(tmp_path):
+    cache = LLMCache(tmp_path / 'cache.db')
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'respuesta'
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute)))
+    owner.start()
+    assert started.wait(5)
+
+    waiters = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute)))
+               for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+
+    release.set()
+    for thread in [owner, *waiters]:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ['respuesta'] * 4
+
+
+def test_failed_computation_lets_waiter_retry(tmp_path):
+    cache = LLMCache(tmp_path / 'cache.db')
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('Ollama caído')
+
+    errors = []
+
+    def run_owner():
+        try:
+            cache.get_or_compute('k', failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    owner = threading.Thread(target=run_owner)
+    owner.start()
+    assert started.wait(5)
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(cache.get_or_compute('k', lambda: 'segunda')))
+    waiter.start()
+
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+
+    assert len(errors) == 1
+    assert results == ['segunda']
+    assert cache.get('k') == 'segunda'
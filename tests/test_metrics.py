@@ -0,0 +1,61 @@
+import pytest
+
+from core.metrics import Registry
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    registry = Registry()
+    histogram = registry.histogram('diary_test_seconds', 'Duración', ['endpoint'], buckets=(1, 0.1, 0.5))
+
+    for value in (0.05, 0.1, 0.3, 2):
+        histogram.observe(value, endpoint='/api/entries')
+
+    assert registry.render() == (
+        '# HELP diary_test_seconds Duración\n'
+        '# TYPE diary_test_seconds histogram\n'
+        'diary_test_seconds_bucket{endpoint="/api/entries",le="0.1"} 2\n'
+        'diary_test_seconds_bucket{endpoint="/api/entries",le="0.5"} 3\n'
+        'diary_test_seconds_bucket{endpoint="/api/entries",le="1"} 3\n'
+        'diary_test_seconds_bucket{endpoint="/api/entries",le="+Inf"} 4\n'
+        'diary_test_seconds_sum{endpoint="/api/entries"} 2.45\n'
+        'diary_test_seconds_count{endpoint="/api/entries"} 4\n'
+    )
+
+
+def test_label_values_and_help_are_escaped():
+    registry = Registry()
+    counter = registry.counter('diary_test_total', 'Línea 1\nruta C:\\diario', ['project'])
+    counter.inc(project='a"b\\c\nd')
+
+    assert registry.render().splitlines() == [
+        '# HELP diary_test_total Línea 1\\nruta C:\\\\diario',
+        '# TYPE diary_test_total counter',
+        'diary_test_total{project="a\\"b\\\\c\\nd"} 1',
+    ]
+
+
+def test_unlabelled_metrics_start_at_zero_and_render_sorted():
+    registry = Registry()
+    gauge = registry.gauge('diary_b_gauge', 'B')
+    registry.counter('diary_a_total', 'A')
+    registry.collector(lambda: gauge.set(1.5))
+
+    assert registry.render().splitlines() == [
+        '# HELP diary_a_total A',
+        '# TYPE diary_a_total counter',
+        'diary_a_total 0',
+        '# HELP diary_b_gauge B',
+        '# TYPE diary_b_gauge gauge',
+        'diary_b_gauge 1.5',
+    ]
+
+
+def test_registration_is_idempotent_but_rejects_conflicts():
+    registry = Registry()
+    counter = registry.counter('diary_test_total', 'Total', ['kind'])
+
+    assert registry.counter('diary_test_total', 'Total', ['kind']) is counter
+    with pytest.raises(ValueError):
+        registry.gauge('diary_test_total', 'Total', ['kind'])
+    with pytest.raises(ValueError):
+        counter.inc(other='x')
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+import requests
+
+from core.ollama_client import OLLAMA_SECONDS, OllamaBusyError, OllamaClient, OllamaError
+
+
+class FakeResponse:
+    def __init__(self, body=None, lines=(), status_code=200):
+        self.body = body
+        self.lines = lines
+        self.status_code = status_code
+
+    def json(self):
+        if isinstance(self.body, str):
+            return json.loads(self.body)
+        return self.body
+
+    def iter_lines(self):
+        return iter(self.lines)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+def make_client(response, **kwargs):
+    client = OllamaClient('http://ollama.test', max_retries=0, **kwargs)
+    client.session.post = lambda *args, **kw: response
+    return client
+
+
+def test_generate_wraps_invalid_json():
+    client = make_client(FakeResponse('<html>proxy error</html>'))
+
+    with pytest.raises(OllamaError):
+        client.generate('model', 'prompt')
+
+
+def test_stream_wraps_invalid_json_line():
+    lines = [json.dumps({'response': 'Hola'}).encode(), b'{"response": "trunc']
+    client = make_client(FakeResponse(lines=lines))
+
+    tokens = []
+    with pytest.raises(OllamaError):
+        for token in client.stream_generate('model', 'prompt'):
+            tokens.append(token)
+
+    assert tokens == ['Hola']
+    assert client._slots.acquire(blocking=False)
+
+
+def stream_observations(outcome):
+    series = OLLAMA_SECONDS._values.get(OLLAMA_SECONDS._key({'operation': 'stream', 'outcome': outcome}))
+    return sum(series[:-1]) if series else 0
+
+
+def test_stream_wraps_connection_cut_after_first_token():
+    class CutResponse(FakeResponse):
+        def iter_lines(self):
+            yield json.dumps({'response': 'Hola'}).encode()
+            raise requests.exceptions.ChunkedEncodingError('Connection broken: IncompleteRead')
+
+    client = make_client(CutResponse())
+    errors = stream_observations('error')
+
+    tokens = []
+    with pytest.raises(OllamaError, match='cortada'):
+        for token in client.stream_generate('model', 'prompt'):
+            tokens.append(token)
+
+    assert tokens == ['Hola']
+    assert stream_observations('error') == errors + 1
+    assert client._slots.acquire(blocking=False)
+
+
+def test_embed_wraps_invalid_json():
+    client = make_client(FakeResponse('not json'))
+
+    with pytest.raises(OllamaError):
+        client.embed('model', 'text')
+
+
+def test_embed_takes_a_slot():
+    client = make_client(FakeResponse({'embedding': [0.1, 0.2]}), max_in_flight=1, queue_timeout=0.05)
+
+    assert client.embed('model', 'text') == [0.1, 0.2]
+
+    client._slots.acquire()
+    try:
+        with pytest.raises(OllamaBusyError):
+            client.embed('model', 'text')
+    finally:
+        client._slots.release()
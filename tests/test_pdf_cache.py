@@ -0,0 +1,75 @@
+import os
+
+from diary.pdf_cache import PDFCache
+
+
+def renderer(content, calls):
+    def render(target):
+        calls.append(content)
+        target.write(content)
+    return render
+
+
+def read(result):
+    f, size = result
+    with f:
+        return f.read(), size
+
+
+def test_second_request_is_served_from_cache(tmp_path):
+    cache = PDFCache(tmp_path)
+    calls = []
+    key = cache.make_key('1', 'branch', 'app', 'main', 'a.md', 'hola')
+
+    assert read(cache.get_or_render(key, renderer(b'%PDF-uno', calls))) == (b'%PDF-uno', 8)
+    assert read(cache.get_or_render(key, renderer(b'%PDF-otro', calls))) == (b'%PDF-uno', 8)
+
+    assert calls == [b'%PDF-uno']
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['entries'] == 1
+
+
+def test_key_changes_with_content_and_part_boundaries():
+    assert PDFCache.make_key('ab', 'c') != PDFCache.make_key('a', 'bc')
+    assert PDFCache.make_key('1', 'a.md', 'hola') != PDFCache.make_key('1', 'a.md', 'hola!')
+
+
+def test_least_recently_used_pdfs_are_evicted_by_size(tmp_path):
+    cache = PDFCache(tmp_path, max_bytes=30)
+    calls = []
+
+    for age, name in enumerate(['vieja', 'usada', 'media'], start=1):
+        read(cache.get_or_render(name, renderer(b'x' * 10, calls)))
+        # El mtime hace de último acceso: 'vieja' es la más antigua
+        os.utime(cache.path_for(name), (1000 * age, 1000 * age))
+
+    # Consultar 'vieja' la marca como recién usada
+    assert cache.get('vieja') is not None
+    read(cache.get_or_render('nueva', renderer(b'x' * 10, calls)))
+
+    remaining = {path.stem for path in tmp_path.glob('*.pdf')}
+    assert remaining == {'vieja', 'media', 'nueva'}
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] <= 30
+
+
+def test_pdf_larger_than_the_cache_is_still_served(tmp_path):
+    cache = PDFCache(tmp_path, max_bytes=5)
+
+    assert read(cache.get_or_render('grande', renderer(b'x' * 10, []))) == (b'x' * 10, 10)
+    assert cache.path_for('grande').exists()
+
+
+def test_remove_orphans_only_deletes_interrupted_renders(tmp_path):
+    cache = PDFCache(tmp_path)
+    read(cache.get_or_render('buena', renderer(b'%PDF', [])))
+    (tmp_path / 'abc.tmp').write_bytes(b'a medias')
+
+    # Crear la caché no borra nada: puede haber otro proceso renderizando
+    PDFCache(tmp_path)
+    assert (tmp_path / 'abc.tmp').exists()
+
+    cache.remove_orphans()
+    assert not (tmp_path / 'abc.tmp').exists()
+    assert cache.path_for('buena').exists()
@@ -0,0 +1,35 @@
+import io
+
+import pytest
+
+pytest.importorskip('reportlab')
+
+from diary.pdf_generator import PDFGenerator  # noqa: E402
+
+TITLE = 'Fix a<b && c>d en <module>'
+PROJECT = 'R&D <interno>'
+BRANCH = 'fix/a<b>'
+
+
+def make_entry():
+    return {
+        'filename': '2024-01-01_10-00-00_main.md',
+        'proyecto': PROJECT,
+        'rama': BRANCH,
+        'autor': 'Ana & Luis',
+        'fecha': '2024-01-01 10:00:00',
+        'commit_problema': TITLE,
+        'content': f'# {TITLE}\n\nTexto con a<b & c>d.'
+    }
+
+
+def test_single_entry_pdf_escapes_metadata():
+    buffer = io.BytesIO()
+    PDFGenerator().generate_single_entry_pdf(make_entry(), buffer)
+    assert buffer.getvalue().startswith(b'%PDF')
+
+
+def test_branch_pdf_escapes_metadata():
+    buffer = io.BytesIO()
+    PDFGenerator().generate_branch_pdf([make_entry()], BRANCH, PROJECT, buffer)
+    assert buffer.getvalue().startswith(b'%PDF')
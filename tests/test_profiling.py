@@ -0,0 +1,31 @@
+import json
+
+from flask import Response
+
+from core.profiling import phase
+
+
+def test_streamed_response_is_profiled_until_closed(app_module, monkeypatch):
+    @app_module.profiled
+    def streamed():
+        def generate():
+            with phase('body'):
+                yield 'a'
+                yield 'b'
+        return Response(generate(), mimetype='text/plain')
+
+    # La app es compartida: otros tests pueden haberle hecho ya peticiones
+    monkeypatch.setattr(app_module.app, '_got_first_request', False)
+    app_module.app.add_url_rule('/_test/streamed', 'test_streamed', streamed)
+    client = app_module.app.test_client()
+
+    response = client.get('/_test/streamed', headers={'X-Profile': 'secret'}, buffered=False)
+    profile_id = response.headers['X-Profile-Id']
+    assert app_module.PROFILER.path(profile_id, '.json') is None
+
+    assert response.get_data(as_text=True) == 'ab'
+    response.close()
+
+    with open(app_module.PROFILER.path(profile_id, '.json'), encoding='utf-8') as f:
+        summary = json.load(f)
+    assert summary['phases']['body']['calls'] == 1
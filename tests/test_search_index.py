@@ -0,0 +1,40 @@
+import sqlite3
+import threading
+
+import pytest
+
+from core.search_index import SearchIndex, extract_keywords
+
+
+@pytest.fixture
+def index():
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return SearchIndex(conn, threading.RLock())
+
+
+def test_markdown_wrapped_terms_are_plain_tokens():
+    text = 'Cambiamos **redis** por `memcached`, _cache_ en #deploy y src/worker/queue.py'
+    assert extract_keywords(text) == ['cambiamos', 'redis', 'memcached', 'cache', 'deploy', 'worker', 'queue']
+
+
+def test_plain_query_finds_markdown_wrapped_terms(index):
+    with index._lock, index._conn:
+        index.index_document(1, 'api', '## Fix\n\nEl **timeout** de `pytest` en _celery_ (#redis)')
+        index.index_document(2, 'api', 'Notas sin relación con lo anterior')
+
+    for question in ('timeout', 'pytest', 'celery', 'redis'):
+        hits = index.search(extract_keywords(question))
+        assert [hit['entry_id'] for hit in hits] == [1], question
+
+
+def test_project_filter_ignores_case_beyond_ascii(index):
+    with index._lock, index._conn:
+        index.index_document(1, 'otro', 'Notas sobre despliegues')
+        index.index_document(2, 'Ñandú', 'Notas sobre despliegues')
+        index.index_document(3, 'Ñandú', 'Nada que ver')
+
+    hits = index.search(extract_keywords('despliegues'), project_filter='ñandú')
+
+    assert hits[0]['entry_id'] == 2
+    assert 3 in [hit['entry_id'] for hit in hits]
@@ -0,0 +1,88 @@
+import json
+import threading
+import time
+
+from core.server import RequestTracker
+
+
+def ok_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'ok']
+
+
+def call(tracker, path='/'):
+    status = []
+    response = tracker({'PATH_INFO': path}, lambda s, headers: status.append(s))
+    body = b''.join(response)
+    if hasattr(response, 'close'):
+        response.close()
+    return status[0], body
+
+
+def test_drain_waits_for_pending_work_and_lets_it_finish():
+    open_sessions = {'abc'}
+    tracker = RequestTracker(
+        ok_app,
+        keep_open=lambda environ: environ['PATH_INFO'].strip('/') in open_sessions,
+        pending=lambda: len(open_sessions)
+    )
+    tracker.PENDING_POLL_SECONDS = 0.01
+
+    result = []
+    drainer = threading.Thread(target=lambda: result.append(tracker.drain(5)))
+    drainer.start()
+    while not tracker.draining:
+        time.sleep(0.01)
+
+    # Las peticiones nuevas se rechazan, las del trabajo abierto no
+    assert call(tracker, '/otra')[0].startswith('503')
+    assert call(tracker, '/abc') == ('200 OK', b'ok')
+    assert drainer.is_alive()
+
+    open_sessions.clear()
+    drainer.join(5)
+    assert result == [0]
+
+
+def test_drain_gives_up_on_pending_work_after_timeout():
+    tracker = RequestTracker(ok_app, pending=lambda: 1)
+    tracker.PENDING_POLL_SECONDS = 0.01
+
+    assert tracker.drain(0.05) == 1
+
+
+class FakeRecognizer:
+    def AcceptWaveform(self, data):
+        return False
+
+    def PartialResult(self):
+        return json.dumps({'partial': 'hola'})
+
+    def FinalResult(self):
+        return json.dumps({'text': 'hola'})
+
+    def Reset(self):
+        pass
+
+
+def test_open_dictation_keeps_streaming_while_draining(app_module):
+    tracker = app_module.REQUEST_TRACKER
+    sessions = app_module.TRANSCRIPTION_SESSIONS
+    session_id = sessions.create(FakeRecognizer(), 16000)
+    client = app_module.app.test_client()
+
+    tracker.draining = True
+    try:
+        assert tracker._pending() == 1
+        assert client.get('/api/projects').status_code == 503
+        assert client.post('/api/transcribe/stream/desconocida', data=b'\x00\x00').status_code == 503
+
+        response = client.post(f'/api/transcribe/stream/{session_id}', data=b'\x00\x00' * 10,
+                               content_type='application/octet-stream')
+        assert response.status_code == 200
+        assert response.get_json()['partial'] == 'hola'
+    finally:
+        sessions.close(session_id)
+        tracker.draining = False
+
+    assert tracker._pending() == 0
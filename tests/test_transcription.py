@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from core import transcription
+from core.process_pool import ProcessPool
+from core.transcription import ParallelDecoder
+
+pytestmark = pytest.mark.skipif('forkserver' not in multiprocessing.get_all_start_methods(),
+                                reason='sin fork ni forkserver en esta plataforma')
+
+
+def _fake_decode(data, sample_rate, model_path):
+    """Sustituye a _decode_segment en los procesos: 'die' mata al proceso"""
+    if data == b'die':
+        os._exit(1)
+    return [data.decode()]
+
+
+def wait_for_single_thread():
+    # Los hilos de pools de otros tests tardan un poco en terminar
+    deadline = time.monotonic() + 5
+    while threading.active_count() > 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(transcription, '_decode_segment', _fake_decode)
+    wait_for_single_thread()
+
+    pool = ProcessPool(processes=2)
+    assert pool.start()
+    yield pool
+    pool.shutdown()
+
+
+def test_decode_keeps_order(pool):
+    decoder = ParallelDecoder(pool)
+    assert decoder.decode('modelo', [b'uno', b'dos', b'tres'], 16000) == ['uno', 'dos', 'tres']
+
+
+def test_killed_worker_falls_back_then_pool_is_recreated(pool):
+    decoder = ParallelDecoder(pool)
+    assert decoder.decode('modelo', [b'uno', b'die', b'tres'], 16000) is None
+
+    status = decoder.status()
+    assert status['active'] and not status['running']
+    assert status['failures'] == 1
+
+    # El siguiente uso recrea los procesos (con hilos ya vivos: forkserver)
+    assert decoder.decode('modelo', [b'uno', b'dos'], 16000) == ['uno', 'dos']
+    assert decoder.status()['running']
+
+
+def test_pool_starts_with_forkserver_when_other_threads_exist(monkeypatch):
+    monkeypatch.setattr(transcription, '_decode_segment', _fake_decode)
+    release = threading.Event()
+    thread = threading.Thread(target=release.wait)
+    thread.start()
+    pool = ProcessPool(processes=2)
+    try:
+        assert pool.start()
+        assert pool.start_method == 'forkserver'
+        assert ParallelDecoder(pool).decode('modelo', [b'a', b'b'], 16000) == ['a', 'b']
+    finally:
+        pool.shutdown()
+        release.set()
+        thread.join()
+
+
+def test_pool_forks_when_single_threaded(pool):
+    assert pool.start_method == 'fork'
+
+
+def test_shutdown_pool_is_not_recreated(pool):
+    pool.shutdown()
+    assert ParallelDecoder(pool).decode('modelo', [b'a'], 16000) is None
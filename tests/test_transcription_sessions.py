@@ -0,0 +1,77 @@
+import json
+import threading
+
+import pytest
+
+from core.transcription import SessionClosedError, TranscriptionSession, TranscriptionSessions
+
+
+class FakeRecognizer:
+    """Reconocedor que anota las llamadas; 'gate' permite pausar AcceptWaveform"""
+
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.entered = threading.Event()
+        self.calls = []
+
+    def AcceptWaveform(self, data):
+        self.calls.append('accept')
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        return False
+
+    def PartialResult(self):
+        return json.dumps({'partial': 'hola'})
+
+    def FinalResult(self):
+        self.calls.append('final')
+        return json.dumps({'text': 'hola mundo'})
+
+
+def test_feed_after_finish_does_not_touch_the_recognizer():
+    recognizer = FakeRecognizer()
+    session = TranscriptionSession(recognizer, 16000)
+    session.feed(b'\x00\x00' * 10)
+
+    assert session.finish() == 'Hola mundo.'
+    with pytest.raises(SessionClosedError):
+        session.feed(b'\x00\x00')
+    with pytest.raises(SessionClosedError):
+        session.finish()
+
+    assert recognizer.calls == ['accept', 'final']
+
+
+def test_finish_waits_for_the_chunk_being_decoded():
+    gate = threading.Event()
+    recognizer = FakeRecognizer(gate)
+    session = TranscriptionSession(recognizer, 16000)
+
+    feeder = threading.Thread(target=session.feed, args=(b'\x00\x00' * 10,))
+    feeder.start()
+    assert recognizer.entered.wait(5)
+
+    finished = []
+    finisher = threading.Thread(target=lambda: finished.append(session.finish()))
+    finisher.start()
+    finisher.join(0.1)
+    assert not finished  # el trozo en curso todavía usa el reconocedor
+
+    gate.set()
+    feeder.join(5)
+    finisher.join(5)
+    assert finished == ['Hola mundo.']
+    assert recognizer.calls == ['accept', 'final']
+
+
+def test_expired_session_is_closed_before_release():
+    released = []
+    sessions = TranscriptionSessions(idle_timeout=0, on_expire=lambda session: released.append(session.closed))
+    session_id = sessions.create(FakeRecognizer(), 16000)
+    session = sessions._sessions[session_id]
+
+    assert sessions.get(session_id) is None
+    assert released == [True]
+    with pytest.raises(SessionClosedError):
+        session.feed(b'\x00\x00')
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from core.vector_store import VectorStore  # noqa: E402
+
+
+def unit(i, dim=4):
+    vector = [0.0] * dim
+    vector[i] = 1.0
+    return vector
+
+
+def test_query_orders_by_similarity_and_respects_k(tmp_path):
+    store = VectorStore(tmp_path)
+    store.upsert('app/a.md', [[1.0, 0.0, 0.0, 0.0]])
+    store.upsert('app/b.md', [[0.8, 0.6, 0.0, 0.0]])
+    store.upsert('app/c.md', [[0.0, 1.0, 0.0, 0.0]])
+    store.upsert('app/d.md', [[0.0, 0.0, 1.0, 0.0]])
+
+    results = store.query([1.0, 0.1, 0.0, 0.0], k=3)
+
+    assert [key for key, _score in results] == ['app/a.md', 'app/b.md', 'app/c.md']
+    scores = [score for _key, score in results]
+    assert scores == sorted(scores, reverse=True)
+    assert scores[0] == pytest.approx(1 / np.linalg.norm([1.0, 0.1]), rel=1e-5)
+    assert [key for key, _score in store.query([1.0, 0.1, 0.0, 0.0], k=3, min_score=0.5)] == ['app/a.md', 'app/b.md']
+
+
+def test_entry_with_several_chunks_appears_once_with_best_score(tmp_path):
+    store = VectorStore(tmp_path)
+    store.upsert('app/larga.md', [unit(0), unit(1), [0.9, 0.0, 0.1, 0.0]])
+    store.upsert('app/corta.md', [[0.7, 0.7, 0.0, 0.0]])
+
+    results = store.query(unit(0), k=5)
+
+    assert [key for key, _score in results] == ['app/larga.md', 'app/corta.md']
+    assert results[0][1] == pytest.approx(1.0)
+
+
+def test_upsert_replaces_and_remove_forgets(tmp_path):
+    store = VectorStore(tmp_path)
+    store.upsert('app/a.md', [unit(0), unit(1)], content_hash='v1')
+    store.upsert('app/a.md', [unit(2)], content_hash='v2')
+
+    assert store.content_hash('app/a.md') == 'v2'
+    assert store.query(unit(0), k=1, min_score=0.5) == []
+    assert store.query(unit(2), k=1)[0][0] == 'app/a.md'
+
+    store.remove('app/a.md')
+
+    assert len(store) == 0
+    assert store.content_hash('app/a.md') is None
+    assert store.query(unit(2)) == []
+
+
+def test_rows_and_ids_stay_consistent_after_remove_and_reopen(tmp_path):
+    store = VectorStore(tmp_path)
+    store.upsert('app/a.md', [unit(0)], content_hash='a')
+    store.upsert('app/b.md', [unit(1), unit(2)], content_hash='b')
+    store.upsert('app/c.md', [unit(3)], content_hash='c')
+    store.remove('app/b.md')
+    # Reutiliza una de las filas libres de 'b'
+    store.upsert('app/d.md', [[0.0, 0.6, 0.8, 0.0]], content_hash='d')
+
+    reopened = VectorStore(tmp_path)
+
+    with open(tmp_path / 'ids.json', encoding='utf-8') as f:
+        meta = json.load(f)
+    assert meta['dim'] == 4
+    assert sorted(key for key in meta['rows'] if key) == ['app/a.md', 'app/c.md', 'app/d.md']
+    assert meta['rows'].count(None) == 1
+    assert (tmp_path / 'vectors.f32').stat().st_size >= len(meta['rows']) * 4 * 4
+
+    assert sorted(reopened.keys()) == ['app/a.md', 'app/c.md', 'app/d.md']
+    assert reopened.content_hash('app/d.md') == 'd'
+    for key, vector in [('app/a.md', unit(0)), ('app/c.md', unit(3)), ('app/d.md', [0.0, 0.6, 0.8, 0.0])]:
+        best_key, score = reopened.query(vector, k=1)[0]
+        assert best_key == key and score == pytest.approx(1.0, rel=1e-5)
+
+    # Las filas libres se vuelven a usar tras reabrir y no salen en las consultas
+    reopened.upsert('app/e.md', [unit(1)])
+    assert len(json.loads((tmp_path / 'ids.json').read_text(encoding='utf-8'))['rows']) == len(meta['rows'])
+    assert [key for key, _score in reopened.query(unit(1), k=5, min_score=0.01)] == ['app/e.md', 'app/d.md']
+
+
+def test_dimension_change_resets_store(tmp_path):
+    store = VectorStore(tmp_path)
+    store.upsert('app/a.md', [unit(0)])
+    store.upsert('app/b.md', [[1.0, 0.0]])
+
+    assert store.keys() == ['app/b.md']
+    assert store.dim == 2
+    assert VectorStore(tmp_path).keys() == ['app/b.md']